@@ -1,8 +1,18 @@
+import os
 import json
-import requests
 import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import JsonIO
+from Telemetry import get_telemetry
 current_timestamp = int(time.time() * 1000)
-def load_accounts():
+STATUS_PATH = os.path.join('BuffStats', 'AccountStatus.json')
+CONFIG_ACCOUNT = 'config账号'   # config.json，API采集器使用
+AUTH_ACCOUNT = 'auth账号'       # auth.json，浏览器采集器使用
+
+
+def load_accounts(verbose=True):
     accounts = []
 
     # 加载config.json账号
@@ -10,12 +20,13 @@ def load_accounts():
         with open('config.json', 'r', encoding='utf-8') as f:
             config = json.load(f)
             accounts.append({
-                'name': 'config账号',
+                'name': CONFIG_ACCOUNT,
                 'cookie': config['cookie'],
                 'csrf_token': config['csrf_token']
             })
     except Exception as e:
-        print(f"加载config.json失败: {str(e)}")
+        if verbose:
+            print(f"加载config.json失败: {str(e)}")
 
     # 加载auth.json账号
     try:
@@ -30,22 +41,29 @@ def load_accounts():
             csrf_token = next((e['value'] for e in auth['cookies'] if e['name'] == 'csrf_token'), None)
 
             accounts.append({
-                'name': 'auth账号',
+                'name': AUTH_ACCOUNT,
                 'cookie': cookie_str,
                 'csrf_token': csrf_token
             })
     except Exception as e:
-        print(f"加载auth.json失败: {str(e)}")
+        if verbose:
+            print(f"加载auth.json失败: {str(e)}")
 
     return accounts
 
 
-def check_frozen_status(account):
+def probe_account(account):
+    """请求一次商品接口判断账号状态，返回 {name, status, detail, checked_at, raw}
+
+    status: ok / frozen / forbidden / error
+    """
+    import requests  # 菜单启动时不加载，首次检测时才导入
+
     url = "https://buff.163.com/api/market/goods"
     params = {
         "game": "csgo",
         "use_suggestion": 0,
-        "_": current_timestamp
+        "_": int(time.time() * 1000)
     }
 
     headers = {
@@ -54,29 +72,171 @@ def check_frozen_status(account):
         "X-CSRFToken": account['csrf_token']
     }
 
+    probe = {'name': account['name'], 'status': 'error', 'detail': '', 'checked_at': time.time(), 'raw': None}
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        with get_telemetry().request('AccountProbe', account['name'], '', 'goods') as call:
+            response = requests.get(url, headers=headers, params=params, timeout=10)
+            call['code'], call['bytes'] = response.status_code, len(response.content)
         response.raise_for_status()
 
         result = response.json()
-        print(f"\n{account['name']}检测结果:")
-        print("原始响应:", result)
-
+        probe['raw'] = result
         if result.get('code') == "User Frozen":
-            print(" 状态: 账号冻结（User Frozen）")
-            print("详细信息:", result.get('error', '无附加信息'))
+            probe.update(status='frozen', detail=result.get('error', '无附加信息'))
         elif result.get('code') == "Action Forbidden":
-            print(" 状态: 功能限制（Action Forbidden）")
-            print("详细信息:", result.get('error', '无附加信息'))
+            probe.update(status='forbidden', detail=result.get('error', '无附加信息'))
         else:
-            print(" 状态: 账号正常")
-            if 'data' in result:
-                print("检测到有效商品数据，接口访问正常")
+            probe.update(status='ok', detail='接口访问正常' if 'data' in result else '')
 
     except requests.exceptions.RequestException as e:
-        print(f"?请求异常: {str(e)}")
+        probe['detail'] = f"请求异常: {str(e)}"
     except json.JSONDecodeError:
-        print("响应不是有效的JSON格式")
+        probe['detail'] = "响应不是有效的JSON格式"
+    except Exception as e:
+        probe['detail'] = f"检测异常: {str(e)}"
+    return probe
+
+
+def check_frozen_status(account):
+    probe = probe_account(account)
+    if probe['raw'] is None:
+        print(f"?{probe['detail']}")
+        return probe
+
+    print(f"\n{account['name']}检测结果:")
+    print("原始响应:", probe['raw'])
+    if probe['status'] == 'frozen':
+        print(" 状态: 账号冻结（User Frozen）")
+        print("详细信息:", probe['detail'])
+    elif probe['status'] == 'forbidden':
+        print(" 状态: 功能限制（Action Forbidden）")
+        print("详细信息:", probe['detail'])
+    else:
+        print(" 状态: 账号正常")
+        if probe['detail']:
+            print("检测到有效商品数据，接口访问正常")
+    return probe
+
+
+STATUS_LABELS = {'ok': '正常', 'frozen': '冻结', 'forbidden': '功能限制', 'error': '检测失败'}
+
+
+class AccountStatusCache:
+    """账号状态缓存：超过TTL后在后台线程并发刷新，菜单直接读取缓存
+
+    状态持久化到 BuffStats/AccountStatus.json，重启后首屏即可显示上次结果；
+    采集器遇到403时调用 invalidate() 触发重新检测。
+    """
+
+    def __init__(self, ttl=300, status_path=STATUS_PATH):
+        self.ttl = ttl
+        self.status_path = status_path
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()   # 同步刷新与后台刷新互斥，避免重复检测与并发写文件
+        self.statuses = {}
+        self.refreshed_at = 0.0
+        self.invalidated = False
+        self.thread = None
+        self._load()
+
+    def is_stale(self):
+        return self.invalidated or time.time() - self.refreshed_at >= self.ttl
+
+    def snapshot(self):
+        with self.lock:
+            return {name: dict(status) for name, status in self.statuses.items()}
+
+    def refresh(self, force=False):
+        """阻塞刷新（仅在过期或强制时发请求），返回最新状态"""
+        if force or self.is_stale():
+            self._refresh(force)
+        return self.snapshot()
+
+    def refresh_async(self, force=False):
+        """后台刷新，已有刷新线程在运行时不重复启动"""
+        with self.lock:
+            if not (force or self.is_stale()) or (self.thread and self.thread.is_alive()):
+                return
+            self.thread = threading.Thread(target=self._refresh, args=(force,), name='account-status', daemon=True)
+            self.thread.start()
+
+    def ensure_fresh(self):
+        """采集前调用：过期则同步检测，等待正在进行的后台刷新"""
+        thread = self.thread
+        if thread and thread.is_alive():
+            thread.join()
+        return self.refresh()
+
+    def invalidate(self):
+        """认证失效（403）后标记过期并在后台重新检测"""
+        with self.lock:
+            self.invalidated = True
+        self.refresh_async(force=True)
+
+    def summary_line(self):
+        statuses = self.snapshot()
+        if not statuses:
+            return "账户状态：检测中..." if self.thread and self.thread.is_alive() else "账户状态：无可用账号配置"
+        parts = [f"{name} {STATUS_LABELS.get(s['status'], s['status'])}" for name, s in statuses.items()]
+        age = int(time.time() - self.refreshed_at)
+        suffix = "，刷新中" if self.thread and self.thread.is_alive() else ""
+        return f"账户状态：{'，'.join(parts)}（{age}秒前检测{suffix}）"
+
+    def _refresh(self, force=False):
+        """检测全部账号；等待其他刷新结束后若状态已是最新则直接返回。出错时保留上次状态"""
+        with self.refresh_lock:
+            if not (force or self.is_stale()):
+                return
+            try:
+                accounts = load_accounts(verbose=False)
+                if accounts:
+                    with ThreadPoolExecutor(max_workers=len(accounts)) as pool:
+                        probes = list(pool.map(probe_account, accounts))
+                else:
+                    probes = []
+            except Exception as e:
+                print(f"账号状态刷新失败: {str(e)}")
+                return
+            with self.lock:
+                self.statuses = {p['name']: {k: v for k, v in p.items() if k != 'raw'} for p in probes}
+                self.refreshed_at = time.time()
+                self.invalidated = False
+            self._save()
+
+    def _load(self):
+        if not os.path.exists(self.status_path):
+            return
+        try:
+            with open(self.status_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.statuses = data['accounts']
+            self.refreshed_at = data['refreshed_at']
+        except Exception:
+            self.statuses, self.refreshed_at = {}, 0.0
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.status_path) or '.', exist_ok=True)
+            with self.lock:
+                data = {'refreshed_at': self.refreshed_at,
+                        'updated': datetime.fromtimestamp(self.refreshed_at).isoformat(),
+                        'accounts': self.statuses}
+            JsonIO.dump(data, self.status_path, pretty=True, fsync=False)
+        except Exception as e:
+            print(f"账号状态保存失败: {str(e)}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_account_cache():
+    """进程内共享的账号状态缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AccountStatusCache()
+        return _cache
 
 
 def main():
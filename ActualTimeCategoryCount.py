@@ -1,9 +1,12 @@
 import json
-import time
 import os
-import requests
 from datetime import datetime
 from colorama import Fore, Style, init
+from Account_Freeze_Judgment import get_account_cache, CONFIG_ACCOUNT
+from Telemetry import get_telemetry
+from PipelineStatus import record_stage
+import JsonIO
+from Profiling import profiled, enable_from_argv
 
 init(autoreset=True)
 
@@ -11,6 +14,7 @@ init(autoreset=True)
 class BuffCategoryCounter:
     def __init__(self, request_interval=4):
         self.base_url = "https://buff.163.com"
+        import requests
         self.session = requests.Session()
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
@@ -32,6 +36,8 @@ class BuffCategoryCounter:
         self.max_retries = 3
         self.final_retry = 2
         self.retry_interval = 5
+        self.request_count = 0
+        self.telemetry = get_telemetry()
 
     def _load_config(self):
         """从config.json加载凭证配置"""
@@ -125,19 +131,23 @@ class BuffCategoryCounter:
 
         while retries > 0:
             try:
-                response = self.session.get(
-                    f"{self.base_url}/api/market/goods",
-                    params={
-                        'game': 'csgo',
-                        'page_num': 1,
-                        'page_size': 1,
-                        'category': category_value
-                    },
-                    headers=self.headers,
-                    timeout=15
-                )
+                self.request_count += 1
+                with self.telemetry.request('BuffCategoryCounter', CONFIG_ACCOUNT, category_value, 'goods') as call:
+                    response = self.session.get(
+                        f"{self.base_url}/api/market/goods",
+                        params={
+                            'game': 'csgo',
+                            'page_num': 1,
+                            'page_size': 1,
+                            'category': category_value
+                        },
+                        headers=self.headers,
+                        timeout=15
+                    )
+                    call['code'], call['bytes'] = response.status_code, len(response.content)
 
                 if response.status_code == 403:
+                    get_account_cache().invalidate()
                     return -1
 
                 data = response.json().get('data', {})
@@ -147,12 +157,14 @@ class BuffCategoryCounter:
 
             except Exception as e:
                 retries -= 1
-                time.sleep(2)
+                self.telemetry.retry('BuffCategoryCounter', CONFIG_ACCOUNT, category_value, type(e).__name__)
+                self.telemetry.wait(2, 'BuffCategoryCounter', CONFIG_ACCOUNT, category_value, 'backoff')
             finally:
-                time.sleep(self.request_interval)
+                self.telemetry.wait(self.request_interval, 'BuffCategoryCounter', CONFIG_ACCOUNT, category_value)
 
         return last_count if retries > 0 else -2
 
+    @profiled('actual_count')
     def process_categories(self, categories: list, full_update=False):
         output_path = os.path.join(self.output_dir, "ActualCategoryCount.json")
         report = self._load_existing_report() if not full_update else {}
@@ -182,7 +194,7 @@ class BuffCategoryCounter:
                 stats['failed'] += 1
                 print(f"{Fore.RED} ✗ 失败")
 
-            time.sleep(self.request_interval)
+            self.telemetry.wait(self.request_interval, 'BuffCategoryCounter', CONFIG_ACCOUNT, cat)
 
         if retry_candidates:
             print(f"\n{Fore.YELLOW} 开始重试 {len(retry_candidates)} 个空分类")
@@ -192,6 +204,7 @@ class BuffCategoryCounter:
 
                 for cat in retry_candidates:
                     print(f"   重试: {cat.ljust(30)}", end='')
+                    self.telemetry.retry('BuffCategoryCounter', CONFIG_ACCOUNT, cat, 'empty')
                     count = self.get_category_total(cat)
 
                     if count > 0:
@@ -207,7 +220,7 @@ class BuffCategoryCounter:
                         stats['failed'] += 1
                         print(f"{Fore.RED} ✗ 失败")
 
-                    time.sleep(self.retry_interval)
+                    self.telemetry.wait(self.retry_interval, 'BuffCategoryCounter', CONFIG_ACCOUNT, cat, 'retry')
 
                 retry_candidates = temp_retry
                 if not retry_candidates:
@@ -215,6 +228,13 @@ class BuffCategoryCounter:
 
         self._save_final_report(report)
 
+    def merge_counts(self, counts, full_update=False):
+        """把外部获取的分类数量合并进统计报告（只写入数量>0的分类），返回数量为0需重试的分类"""
+        report = {} if full_update else self._load_existing_report()
+        report.update({c: n for c, n in counts.items() if n > 0})
+        self._save_final_report(report)
+        return [c for c, n in counts.items() if n == 0]
+
     def _load_existing_report(self):
         output_path = os.path.join(self.output_dir, "ActualCategoryCount.json")
         if os.path.exists(output_path):
@@ -235,8 +255,7 @@ class BuffCategoryCounter:
         full_report["Sum"] = current_sum
         full_report["更新日期"] = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(full_report, f, indent=2, ensure_ascii=False)
+        JsonIO.dump(full_report, output_path, pretty=True)
 
     def _save_final_report(self, report):
         output_path = os.path.join(self.output_dir, "ActualCategoryCount.json")
@@ -247,8 +266,8 @@ class BuffCategoryCounter:
         final_report["Sum"] = sum(v for k, v in final_report.items() if k not in ("Sum", "更新日期"))
         final_report["更新日期"] = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(final_report, f, indent=2, ensure_ascii=False)
+        JsonIO.dump(final_report, output_path, pretty=True)
+        record_stage('actual_count', items=final_report['Sum'], categories=len(final_report) - 2)
 
         print(f"\n{Fore.GREEN} 统计完成！")
         print(f" 处理分类数: {len(report)}")
@@ -388,4 +407,5 @@ def main():
 
 
 if __name__ == "__main__":
+    enable_from_argv()
     main()
\ No newline at end of file
@@ -2,17 +2,26 @@ import json
 import os
 import sys
 import time
-import requests
 from datetime import datetime
+from Account_Freeze_Judgment import get_account_cache, CONFIG_ACCOUNT
+from Telemetry import get_telemetry
+from PipelineStatus import record_stage
+from Snapshots import snapshot_collection
+import JsonIO
+from Profiling import profiled, enable_from_argv
 ######################
 
 class BuffCollector:
     def __init__(self):
         self.base_url = "https://buff.163.com"
+        import requests
         self.session = requests.Session()
         self.headers = self.setup_headers()
         self.page_size = 20
         self.request_interval = 10
+        self.request_count = 0
+        self.collected_total = 0
+        self.telemetry = get_telemetry()
         self.output_dir = "BuffData"
         self.state_file = os.path.join(self.output_dir, "collector.state")
 
@@ -238,9 +247,16 @@ class BuffCollector:
             except ValueError:
                 print("请输入数字")
 
+    @profiled('api_collect')
     def start_collection(self):
         """启动采集流程"""
+        started = time.perf_counter()
         try:
+            # 账号状态过期时才重新检测
+            abnormal = [name for name, s in get_account_cache().ensure_fresh().items() if s['status'] != 'ok']
+            if abnormal:
+                print(f"警告：账号状态异常（{', '.join(abnormal)}），采集可能失败")
+
             total = len(self.current_task['targets'])
             start_idx = self.current_task['progress']
 
@@ -253,6 +269,9 @@ class BuffCollector:
                 self.process_category(category)
 
             print("\n所有任务已完成！")
+            record_stage('api_collect', items=self.collected_total, duration=time.perf_counter() - started,
+                         categories=total)
+            snapshot_collection('api_collect')
             self.clear_state()
         except KeyboardInterrupt:
             self.handle_interrupt()
@@ -306,6 +325,40 @@ class BuffCollector:
         except Exception as e:
             print(f"采集失败: {str(e)}")
 
+    def process_pages(self, category, pages):
+        """只补采指定页面（如对账报告中的缺失页），合并进现有分类文件
+
+        原有条目（包括API分页漂移产生的重复条目）原样保留，只追加文件中尚未出现的商品ID。
+        """
+        try:
+            path = os.path.join(self.output_dir, f"{category}.json")
+            items = []
+            total_count = 0
+            if os.path.exists(path):
+                data = JsonIO.load(path)
+                items = data.get('items', [])
+                total_count = data.get('meta', {}).get('total_count', 0)
+            seen = {item['id'] for item in items}
+
+            added = 0
+            for idx, page in enumerate(sorted(set(pages)), 1):
+                page_data = self.fetch_page(category, page)
+                if not page_data or not page_data.get('items'):
+                    continue
+                total_count = page_data.get('total_count', total_count)
+                for item in self._format_items(page_data['items']):
+                    if item['id'] not in seen:
+                        seen.add(item['id'])
+                        items.append(item)
+                        added += 1
+                print(f"已补采第 {page} 页（{idx}/{len(set(pages))}）")
+
+            self.save_data(category, items, total_count)
+            return added
+        except Exception as e:
+            print(f"补采失败: {str(e)}")
+            return 0
+
     def _format_items(self, items):
         """标准化数据格式"""
         formatted = []
@@ -331,15 +384,19 @@ class BuffCollector:
                 '_': int(time.time() * 1000)
             }
 
-            resp = self.session.get(
-                f"{self.base_url}/api/market/goods",
-                params=params,
-                headers=self.headers,
-                timeout=20
-            )
+            self.request_count += 1
+            with self.telemetry.request('BuffCollector', CONFIG_ACCOUNT, category, 'goods') as call:
+                resp = self.session.get(
+                    f"{self.base_url}/api/market/goods",
+                    params=params,
+                    headers=self.headers,
+                    timeout=20
+                )
+                call['code'], call['bytes'] = resp.status_code, len(resp.content)
 
             if resp.status_code == 403:
                 print("认证失效，请更新cookies")
+                get_account_cache().invalidate()
                 return None
 
             resp.raise_for_status()
@@ -348,7 +405,7 @@ class BuffCollector:
             print(f"请求失败: {str(e)}")
             return None
         finally:
-            time.sleep(self.request_interval)
+            self.telemetry.wait(self.request_interval, 'BuffCollector', CONFIG_ACCOUNT, category)
 
     def save_data(self, category, items, total_count):
         """保存标准化JSON数据"""
@@ -371,8 +428,8 @@ class BuffCollector:
                 result['meta']['collected'] = total_count
                 result['meta']['success_rate'] = "100.00%"
 
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+            JsonIO.dump(result, path)
+            self.collected_total += len(result['items'])
             print(f"数据已保存: {category}")
 
         except Exception as e:
@@ -381,8 +438,7 @@ class BuffCollector:
     def save_state(self):
         """保存状态"""
         try:
-            with open(self.state_file, 'w', encoding='utf-8') as f:
-                json.dump(self.current_task, f)
+            JsonIO.dump(self.current_task, self.state_file, fsync=False)
         except Exception as e:
             print(f"状态保存失败: {str(e)}")
 
@@ -422,4 +478,5 @@ def main():
             input("\n按 Enter 键退出...")
 
 if __name__ == "__main__":
+    enable_from_argv()
     main()
\ No newline at end of file
@@ -1,36 +1,11 @@
 #生成category_mapping.json，最开始的文件
-from bs4 import BeautifulSoup
 import json
+from CategoryTree import parse_category_tree
+import JsonIO
 
 def extract_categories(html_content):
-    """从HTML中提取所有分类名称和值"""
-    soup = BeautifulSoup(html_content, 'lxml')
-    categories = []
-
-    # 定位主分类容器
-    main_container = soup.find('div', {'id': 'j_h1z1-selType'})
-
-    # 遍历每个主分类
-    for category_div in main_container.find_all('div', class_='item'):
-        # 获取主分类名称
-        main_category = category_div.p.text.strip()
-
-        # 遍历子分类
-        sub_items = []
-        sub_ul = category_div.find('ul', class_='cols') or category_div.find('ul')
-        if sub_ul:
-            for li in sub_ul.find_all('li'):
-                sub_items.append({
-                    "name": li.text.strip(),
-                    "value": li['value']
-                })
-
-        categories.append({
-            "main_category": main_category,
-            "sub_categories": sub_items
-        })
-
-    return categories
+    """从HTML中提取所有分类名称和值（只解析 #j_h1z1-selType 子树）"""
+    return parse_category_tree(html_content)
 
 
 if __name__ == "__main__":
@@ -41,9 +16,8 @@ if __name__ == "__main__":
     # 执行提取
     result = extract_categories(html)
 
-    # 保存结果
-    with open('category_mapping.json', 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    # 保存结果（原子写入，中断时不会留下半个分类文件）
+    JsonIO.dump(result, 'category_mapping.json', pretty=True)
 
     # 打印统计信息
     total_main = len(result)
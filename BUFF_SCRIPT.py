@@ -2,7 +2,6 @@ import os
 import json
 import sys
 from pathlib import Path
-from bs4 import BeautifulSoup
 import sys
 import os
 
@@ -83,16 +82,43 @@ def execute_html_pipeline():
     except Exception as e:
         print(f" 处理失败: {str(e)}")
         return False
+def build_category_file(html_path=None, use_browser=None):
+    """生成category_mapping.json并返回校验结果
+
+    指定html_path时解析本地保存的页面，否则自动获取（请求页面，失败时回退无头浏览器）。
+    两种方式都只解析 #j_h1z1-selType 子树，内容未变化时不重写分类文件。
+    """
+    from CategoryTree import load_html_file, fetch_category_tree, save_categories, print_changes
+    from PipelineStatus import record_stage
+
+    if html_path:
+        categories, source = load_html_file(html_path), 'html'
+    else:
+        categories, source = fetch_category_tree(use_browser=use_browser)
+
+    info = save_categories(categories, source)
+    print_changes(info)
+    result = validate_category_file()
+    result.update(version=info['version'], changed=info['changed'], changes=info['changes'])
+    record_stage('categories', items=result['total_sub'], ok=result['valid'], version=info['version'][:12])
+    return result
+
+
 def generate_category_file():
     """生成分类文件主流程"""
     print("\n? 分类文件生成流程")
     print("="*40)
 
-    # 强制删除旧文件
-    category_file = Path("category_mapping.json")
-    if category_file.exists():
-        category_file.unlink()
-        print(" 已清除旧分类文件")
+    # 优先自动获取，失败时再走手动保存页面的流程
+    try:
+        print(" 正在自动获取分类...")
+        validation = build_category_file()
+        print(f"\n 分类文件：{Path('category_mapping.json').absolute()}")
+        print(validation["message"])
+        return True
+    except Exception as e:
+        print(f" 自动获取失败：{str(e)}")
+        print(" 改为手动保存页面")
 
     # 显示操作指南
     print(" 操作步骤：")
@@ -140,33 +166,9 @@ def generate_category_file():
     try:
         html_path = get_html_path()
         print(f"\n 正在解析：{html_path.name}")
+        validation = build_category_file(html_path)
 
-        with open(html_path, 'r', encoding='utf-8') as f:
-            soup = BeautifulSoup(f.read(), 'lxml')
-
-        container = soup.find('div', {'id': 'j_h1z1-selType'})
-        if not container:
-            raise ValueError("页面结构异常，请确认保存完整页面")
-
-        categories = []
-        for div in container.find_all('div', class_='item'):
-            main_cat = div.p.text.strip()
-            sub_cats = [{
-                "name": li.text.strip().replace('\xa0', ' '),
-                "value": li.get('value', '')
-            } for li in div.find_all('li')]
-
-            categories.append({
-                "main_category": main_cat,
-                "sub_categories": sub_cats
-            })
-
-        # 保存数据
-        with open("category_mapping.json", 'w', encoding='utf-8') as f:
-            json.dump(categories, f, ensure_ascii=False, indent=2)
-
-        print(f"\n 文件已更新：{Path('category_mapping.json').absolute()}")
-        validation = validate_category_file()
+        print(f"\n 分类文件：{Path('category_mapping.json').absolute()}")
         print(validation["message"])
         return True
     except Exception as e:
@@ -243,14 +245,11 @@ def execute_api_pipeline():
 def execute_metadata_pipeline():
     """元数据处理流水线"""
     try:
-        from Buff_MetaData import merge_buffdata
-        from ExtractSummaryDataduplicates import extract_duplicate_names
+        from IncrementalSummary import refresh_summary
 
-        print("\n 正在合并数据...")
-        merge_buffdata("BuffData", "SummaryData")
-
-        print("\n 正在提取重复项...")
-        extract_duplicate_names()
+        # 只重新处理有变化的分类文件，同时更新duplicates.txt
+        print("\n 正在增量合并数据...")
+        refresh_summary("BuffData", "SummaryData")
 
         print("\n 数据处理完成")
         print("生成文件：")
@@ -269,7 +268,10 @@ def execute_metadata_pipeline():
 # --------------------------
 
 def cleanup_system():
-    """清除生成文件"""
+    """清除生成文件（清除前为采集数据创建快照，可通过 Snapshots.py restore 恢复）"""
+    from Snapshots import snapshot_collection
+    snapshot_collection('cleanup')
+
     targets = [
         "category_mapping.json",
         "duplicates.txt",
@@ -278,6 +280,7 @@ def cleanup_system():
         Path("BuffDataByExtractHTML"),  # 新增HTML数据目录
         Path("HtmlAnalysis"),           # 新增分析结果目录
         Path("FinalExtract"),
+        Path("Catalog"),                # 商品目录库
         Path("BuffStats"),
         "diff_categories_count.txt"
     ]
@@ -323,13 +326,35 @@ def execute_actual_count_pipeline():
         print(f" 统计失败: {str(e)}")
         return False
 
-def system_status():
-    """获取系统状态"""
-    status = []
+def status_report():
+    """各阶段产物状态（项目 -> 状态），供菜单与命令行共用
+
+    读取各阶段结束时写入的 BuffStats/StageStatus.json，只读一个小文件，清单中没有的阶段显示"未执行"；
+    清单还不存在（升级前的数据目录，尚未运行过任何阶段）时才回退到逐目录扫描。
+    """
+    from PipelineStatus import STAGES, load_status, describe
+
+    stages = load_status()
+    if stages is None:
+        return _scan_status()
+
+    status = {label: describe(stages[stage]) if stage in stages else "未执行" for stage, label in STAGES.items()}
+    status["Cookie配置"] = "已配置" if Path("config.json").exists() else "未配置"
+    if Path("duplicates.txt").exists():
+        duplicates = stages.get('summary', {}).get('duplicates')
+        status["重复记录"] = f"已生成（{duplicates} 个重复ID）" if duplicates is not None else "已生成"
+    else:
+        status["重复记录"] = "未生成"
+    return status
+
+
+def _scan_status():
+    """旧版状态检查：逐个目录扫描产物是否存在"""
+    status = {}
 
     # 分类文件状态
     cat_validation = validate_category_file()
-    status.append(f"分类文件：{cat_validation['message']}")
+    status["分类文件"] = cat_validation['message'].strip()
 
     # 数据目录状态
     data_dirs = {
@@ -338,37 +363,31 @@ def system_status():
     }
     for dirname, desc in data_dirs.items():
         path = Path(dirname)
-        if path.exists() and any(path.iterdir()):
-            status.append(f"{desc}： 已存在")
-        else:
-            status.append(f"{desc}： 未生成")
-    config_status = " 已配置" if Path("config.json").exists() else " 未配置"
-    status.append(f"Cookie配置：{config_status}")
+        status[desc] = "已存在" if path.exists() and any(path.iterdir()) else "未生成"
+    status["Cookie配置"] = "已配置" if Path("config.json").exists() else "未配置"
     # 重复文件
-    dup_file = Path("duplicates.txt")
-    status.append(f"重复记录：{' 已生成' if dup_file.exists() else ' 未生成'}")
+    status["重复记录"] = "已生成" if Path("duplicates.txt").exists() else "未生成"
     # HTML数据状态
     html_data = Path("BuffDataByExtractHTML")
     if html_data.exists() and any(html_data.glob("*.json")):
-        status.append("HTML数据： 已采集")
-        analysis_dir = Path("SummaryDataByHtml")
-        status.append(f"HTML分析：{' 已完成' if analysis_dir.exists() else ' 未分析'}")
+        status["HTML数据"] = "已采集"
+        status["HTML分析"] = "已完成" if Path("SummaryDataByHtml").exists() else "未分析"
     else:
-        status.append("HTML数据： 未采集")
+        status["HTML数据"] = "未采集"
     final_data = Path("FinalExtract")
     if final_data.exists() and any(final_data.glob("*.json")):
-        status.append("合并数据： 已生成")
-        count_file = Path("BuffStats/FinalCount.json")
-        status.append(f"最终统计：{' 已完成' if count_file.exists() else ' 未生成'}")
+        status["合并数据"] = "已生成"
+        status["最终统计"] = "已完成" if Path("BuffStats/FinalCount.json").exists() else "未生成"
     else:
-        status.append("合并数据： 未生成")
-    actual_file = Path("BuffStats/ActualCategoryCount.json")
-    diff_file = Path("diff_categories_count.txt")
-    status.extend([
-        f"实时统计：{' 已完成' if actual_file.exists() else ' 未执行'}",
-        f"差异分析：{' 已生成' if diff_file.exists() else ' 未分析'}"
-    ])
-    return "\n".join(status)
+        status["合并数据"] = "未生成"
+    status["实时统计"] = "已完成" if Path("BuffStats/ActualCategoryCount.json").exists() else "未执行"
+    status["差异分析"] = "已生成" if Path("diff_categories_count.txt").exists() else "未分析"
+    return status
+
+
+def system_status():
+    """获取系统状态"""
+    return "\n".join(f"{name}： {value}" for name, value in status_report().items())
 
 
 
@@ -438,11 +457,12 @@ def main():
     """主程序入口"""
     try:
         while True:
-            # 直接调用检测模块
-            print("\n正在检查账户状态...")
+            # 账户状态读取缓存，过期时在后台并发刷新，不阻塞菜单
             try:
-                from Account_Freeze_Judgment import main as check_accounts
-                check_accounts()  # 直接执行检测函数
+                from Account_Freeze_Judgment import get_account_cache
+                account_cache = get_account_cache()
+                account_cache.refresh_async()
+                print("\n" + account_cache.summary_line())
             except ImportError:
                 print(" 账户检测模块加载失败")
                 sys.exit(1)
@@ -0,0 +1,209 @@
+import sys
+import mmap
+import json
+import struct
+from array import array
+from bisect import bisect_left
+import JsonIO
+
+# 文件布局（小端，各段按8字节对齐）：
+#   header   MAGIC + 各段偏移
+#   ids      int64[n]          升序商品ID
+#   offsets  uint32[2n+1]      字符串表偏移：第i个商品 hashname=[2i,2i+1) shortname=[2i+1,2i+2)
+#   bitmap   uint8[n*width]    分类归属位图，每个商品 width 字节
+#   strings  UTF-8字符串表
+#   meta     JSON（分类名列表与导出meta）
+MAGIC = b'BUFFCAT1'
+HEADER = struct.Struct('<8sQIIQQQQQQ')
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class BinaryCatalogWriter:
+    """流式写入二进制目录（与CatalogExport其他写入器接口一致）
+
+    商品总数与分类列表取自meta，因此字符串表可以直接写到最终位置，
+    ID/偏移/位图以紧凑数组暂存，finish 时回填；publish 时原子替换目标文件，
+    已mmap旧文件的读取进程不受影响。
+    """
+
+    def __init__(self, path, meta):
+        if sys.byteorder != 'little':
+            raise RuntimeError("二进制目录仅支持小端平台")
+        self.path = path
+        self.meta = meta
+        self.count = meta['total_items']
+        self.categories = sorted(meta['categories'])
+        self.category_bits = {name: idx for idx, name in enumerate(self.categories)}
+        self.width = max(1, (len(self.categories) + 7) // 8)
+
+        self.ids_off = HEADER.size
+        self.offsets_off = _align(self.ids_off + 8 * self.count)
+        self.bitmap_off = _align(self.offsets_off + 4 * (2 * self.count + 1))
+        self.strings_off = _align(self.bitmap_off + self.width * self.count)
+
+        self.ids = array('q')
+        self.offsets = array('I', [0])
+        self.bitmap = bytearray(self.width * self.count)
+        self.strings_len = 0
+
+        self.tmp_path = JsonIO.temp_path(path)
+        self.f = open(self.tmp_path, 'wb')
+        self.f.seek(self.strings_off)
+
+    def write(self, goods_id, shortname, categories, hashname=None):
+        idx = len(self.ids)
+        if idx >= self.count:
+            raise ValueError("写入条目数超过meta中的total_items")
+        if idx and goods_id <= self.ids[-1]:
+            raise ValueError("二进制目录要求goods_id严格升序写入")
+        self.ids.append(goods_id)
+        for value in (hashname, shortname):
+            encoded = (value or '').encode('utf-8')
+            self.f.write(encoded)
+            self.strings_len += len(encoded)
+            self.offsets.append(self.strings_len)
+        base = idx * self.width
+        for category in categories:
+            bit = self.category_bits[category]
+            self.bitmap[base + bit // 8] |= 1 << (bit % 8)
+
+    def close(self):
+        self.finish()
+        self.publish()
+
+    def finish(self):
+        """回填各段并关闭临时文件，目标文件尚未替换"""
+        if len(self.ids) != self.count:
+            self.abort()
+            raise ValueError(f"写入条目数 {len(self.ids)} 与meta中的 {self.count} 不一致")
+
+        meta_off = _align(self.strings_off + self.strings_len)
+        meta_bytes = json.dumps({'categories': self.categories, 'meta': self.meta},
+                                ensure_ascii=False).encode('utf-8')
+        self.f.seek(meta_off)
+        self.f.write(meta_bytes)
+
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, self.count, len(self.categories), self.width,
+                                 self.offsets_off, self.bitmap_off, self.strings_off, self.strings_len,
+                                 meta_off, len(meta_bytes)))
+        self.f.seek(self.ids_off)
+        self.ids.tofile(self.f)
+        self.f.seek(self.offsets_off)
+        self.offsets.tofile(self.f)
+        self.f.seek(self.bitmap_off)
+        self.f.write(self.bitmap)
+        self.f.close()
+
+    def publish(self):
+        JsonIO.replace_file(self.tmp_path, self.path)
+
+    def abort(self):
+        """丢弃临时文件，目标文件保持原样（已关闭时什么也不做）"""
+        self.f.close()
+        JsonIO.discard_file(self.tmp_path)
+
+
+class BinaryCatalog:
+    """mmap只读打开二进制目录：无解析步骤，打开耗时与目录大小无关
+
+    ID查找为对mmap上int64数组的二分查找（O(log n)），多个进程打开同一文件时共享页缓存。
+    """
+
+    def __init__(self, path='id.bin'):
+        self.f = open(path, 'rb')
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.count, n_categories, self.width, offsets_off, bitmap_off,
+         strings_off, strings_len, meta_off, meta_len) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"不是有效的二进制目录文件: {path}")
+
+        view = memoryview(self.mm)
+        self.ids = view[HEADER.size:HEADER.size + 8 * self.count].cast('q')
+        self.offsets = view[offsets_off:offsets_off + 4 * (2 * self.count + 1)].cast('I')
+        self.bitmap = view[bitmap_off:bitmap_off + self.width * self.count]
+        self.strings = view[strings_off:strings_off + strings_len]
+
+        trailer = json.loads(bytes(view[meta_off:meta_off + meta_len]).decode('utf-8'))
+        self.categories = trailer['categories']
+        self.meta = trailer['meta']
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, goods_id):
+        return self.index(goods_id) is not None
+
+    def __iter__(self):
+        for idx in range(self.count):
+            yield self.item(idx)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        for attr in ('ids', 'offsets', 'bitmap', 'strings'):
+            view = self.__dict__.pop(attr, None)
+            if view is not None:
+                view.release()
+        self.mm.close()
+        self.f.close()
+
+    # 查询 ------------------------------------
+
+    def index(self, goods_id):
+        """goods_id在ID数组中的位置，不存在返回None"""
+        goods_id = int(goods_id)
+        idx = bisect_left(self.ids, goods_id)
+        if idx < self.count and self.ids[idx] == goods_id:
+            return idx
+        return None
+
+    def get(self, goods_id):
+        idx = self.index(goods_id)
+        return None if idx is None else self.item(idx)
+
+    def item(self, idx):
+        return {
+            'goods_id': str(self.ids[idx]),
+            'hashname': self._string(2 * idx) or None,
+            'shortname': self._string(2 * idx + 1),
+            'categories': self.item_categories(idx)
+        }
+
+    def item_categories(self, idx):
+        names = []
+        base = idx * self.width
+        for byte_idx, value in enumerate(self.bitmap[base:base + self.width]):
+            while value:
+                low = value & -value
+                names.append(self.categories[byte_idx * 8 + low.bit_length() - 1])
+                value ^= low
+        return names
+
+    def category_ids(self, category):
+        """某分类下全部商品ID（按位图扫描）"""
+        bit = self.categories.index(category)
+        byte, mask = bit // 8, 1 << (bit % 8)
+        width = self.width
+        return [self.ids[idx] for idx in range(self.count) if self.bitmap[idx * width + byte] & mask]
+
+    def _string(self, slot):
+        return bytes(self.strings[self.offsets[slot]:self.offsets[slot + 1]]).decode('utf-8')
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python BinaryCatalog.py <goods_id> [id.bin]")
+        sys.exit(2)
+    with BinaryCatalog(sys.argv[2] if len(sys.argv) > 2 else 'id.bin') as catalog:
+        found = catalog.get(sys.argv[1])
+        print(json.dumps(found, ensure_ascii=False, indent=2) if found else f"未找到商品ID {sys.argv[1]}")
+        sys.exit(0 if found else 1)
@@ -0,0 +1,411 @@
+"""非交互式命令行：各阶段通过参数指定目标，过程输出写到stderr，stdout只输出JSON摘要
+
+退出码：0 成功；1 执行失败（diff 子命令表示存在差异）；2 参数错误
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+import contextlib
+from time import perf_counter
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# 同一账号的并行请求上限；各线程共用一份Cookie，并行只用于重叠网络延迟，不提高请求频率
+MAX_JOBS = 4
+
+
+def _read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _all_categories():
+    with open('category_mapping.json', 'r', encoding='utf-8') as f:
+        return [sub['value'] for cat in json.load(f) for sub in cat['sub_categories']]
+
+
+def _targets(args, default_file=None):
+    """按 --category / --from-file / --all 解析目标分类"""
+    if args.category:
+        return args.category
+    if args.from_file:
+        return _read_lines(args.from_file)
+    if getattr(args, 'changed', False):
+        from CategoryTree import changed_categories
+        return changed_categories()
+    if args.all or not default_file:
+        return _all_categories()
+    return _read_lines(default_file)
+
+
+def _per_thread(factory):
+    """每个工作线程一个采集器实例（各自的Session）"""
+    local = threading.local()
+    instances = []
+
+    def get():
+        if not hasattr(local, 'instance'):
+            local.instance = factory()
+            instances.append(local.instance)
+        return local.instance
+    return get, instances
+
+
+def _jobs(args):
+    """并行数限制在 1..MAX_JOBS"""
+    jobs = max(1, args.jobs)
+    if jobs > MAX_JOBS:
+        print(f"并行数 {jobs} 超过上限，按 {MAX_JOBS} 执行")
+        jobs = MAX_JOBS
+    return jobs
+
+
+def _worker_interval(interval, jobs):
+    """各线程共享同一账号的请求频率：每个线程的间隔放大 jobs 倍，总频率仍为每 interval 秒一次"""
+    return interval * jobs
+
+
+# --------------------------
+# 子命令
+# --------------------------
+
+def cmd_categories(args):
+    from BUFF_SCRIPT import build_category_file, validate_category_file
+    if args.html or args.fetch:
+        result = build_category_file(args.html, use_browser=True if args.browser else None)
+    else:
+        result = validate_category_file()
+    return result['valid'], result
+
+
+def cmd_collect(args):
+    from BUFF_GET_ALL_ITEMS_DETAILS import BuffCollector
+    from IncrementalSummary import refresh_summary
+    from Telemetry import get_telemetry
+    from Snapshots import snapshot_collection
+
+    targets = _targets(args)
+    jobs = _jobs(args)
+
+    def factory():
+        collector = BuffCollector()
+        if args.interval is not None:
+            collector.request_interval = args.interval
+        collector.request_interval = _worker_interval(collector.request_interval, jobs)
+        return collector
+
+    get_collector, collectors = _per_thread(factory)
+
+    def work(category):
+        if args.pages:
+            get_collector().process_pages(category, args.pages)
+        else:
+            get_collector().process_category(category)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(work, targets))
+
+    stats = refresh_summary("BuffData", "SummaryData")
+    snapshot = snapshot_collection('cli_collect') if not args.no_snapshot else None
+    return True, {
+        'categories': len(targets),
+        'requests': sum(c.request_count for c in collectors),
+        'summary': stats,
+        'snapshot': snapshot and snapshot['id'],
+        'telemetry': get_telemetry().summary()
+    }
+
+
+def cmd_count(args):
+    from ActualTimeCategoryCount import BuffCategoryCounter
+    from Telemetry import get_telemetry
+
+    targets = _targets(args)
+    interval = args.interval if args.interval is not None else 4
+    counter = BuffCategoryCounter(interval)
+    jobs = _jobs(args)
+    if jobs == 1:
+        counter.process_categories(targets, full_update=args.full)
+        requests = counter.request_count
+    else:
+        # 并行只获取数量，结果统一写入；空分类再按原逻辑顺序重试
+        worker_interval = _worker_interval(counter.request_interval, jobs)
+        get_counter, counters = _per_thread(lambda: BuffCategoryCounter(worker_interval))
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            counts = dict(zip(targets, pool.map(lambda c: get_counter().get_category_total(c), targets)))
+        retry = counter.merge_counts(counts, full_update=args.full)
+        if retry:
+            counter.process_categories(retry)
+        requests = counter.request_count + sum(c.request_count for c in counters)
+
+    with open(os.path.join('BuffStats', 'ActualCategoryCount.json'), 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    missing = [c for c in targets if c not in report]
+    return not missing, {'categories': len(targets), 'failed': missing, 'sum': report.get('Sum'),
+                         'requests': requests, 'telemetry': get_telemetry().summary()}
+
+
+def cmd_html(args):
+    from GET_ITEMS_DetailsByHtml import BuffHTMLCollector
+    from Buff_MetaDataByHtml import process_summary
+
+    if not os.path.exists('auth.json'):
+        print("缺少 auth.json 登录凭证，请先通过交互模式登录一次")
+        return False, {'error': 'auth.json 不存在'}
+
+    targets = _targets(args, default_file='duplicates.txt')
+    collector = BuffHTMLCollector()
+    collector.headless = not args.headed
+    if args.delay is not None:
+        collector.delay = args.delay
+    collector.current_task = {'mode': 'file', 'targets': targets, 'progress': 0, 'file_name': 'cli'}
+    collector.start_collection()
+    process_summary()
+    return True, {'categories': len(targets), 'requests': collector.request_count,
+                  'telemetry': collector.telemetry.summary()}
+
+
+def cmd_merge(args):
+    from TwoBuffDataExtract import IncrementalMerger
+    merger = IncrementalMerger()
+    if args.backfill_api:
+        merger.backfill_hashnames_via_api()
+    targets = _targets(args) if (args.category or args.from_file or args.changed) else merger._get_all_categories()
+    stats = merger.process_categories(targets)
+    return stats['errors'] == 0, stats
+
+
+def cmd_diff(args):
+    from RecordFinalExtractCount import count_goods_ids
+    from Find_Count_Not_Equal_Category import compare_category_counts
+    if not args.no_recount:
+        count_goods_ids()
+    diff = compare_category_counts()
+    return not diff, {'diff_categories': diff}
+
+
+def cmd_ids(args):
+    from GOODS_ID import process_final_extract
+    formats = tuple(dict.fromkeys(args.format or ['json', 'bin']))
+    ok = process_final_extract(args.output, formats=formats)
+    return ok, {'output': args.output, 'formats': list(formats)}
+
+
+def cmd_dupes(args):
+    from FindDuplicates import analyze_catalog, analyze_folder
+    if args.folder:
+        report = analyze_folder(args.folder, args.check_hashname, args.jobs, verbose=False)
+        return not report['errors'], report
+    report = analyze_catalog()
+    return report is not None, report
+
+
+def cmd_snapshot(args):
+    from Snapshots import SnapshotStore, RETENTION
+    store = SnapshotStore()
+    if args.action == 'create':
+        manifest = store.create(label=args.label or 'cli')
+        return manifest is not None, manifest and {'id': manifest['id'], 'stats': manifest['stats']}
+    if args.action == 'list':
+        runs = [{'id': r['id'], 'created_at': r['created_at'], 'label': r['label'], 'stats': r['stats']}
+                for r in store.list()]
+        return True, {'snapshots': runs, 'usage': store.usage()}
+    if args.action == 'restore':
+        if not args.run_id:
+            print("restore 需要指定快照ID")
+            return False, {'error': '缺少快照ID'}
+        return True, store.restore(args.run_id)
+    keep_last = RETENTION['keep_last'] if args.keep_last is None else args.keep_last
+    keep_daily = RETENTION['keep_daily'] if args.keep_daily is None else args.keep_daily
+    return True, store.prune(keep_last, keep_daily, dry_run=args.dry_run)
+
+
+def cmd_changes(args):
+    from ChangeFeed import read_changes
+    events = [e for e in read_changes(args.since, category=args.category)
+              if args.type is None or e['type'] == args.type]
+    counts = {}
+    for event in events:
+        counts[event['type']] = counts.get(event['type'], 0) + 1
+    summary = {'since': args.since, 'last_seq': events[-1]['seq'] if events else args.since, 'counts': counts}
+    if not args.summary_only:
+        summary['events'] = events
+    return True, summary
+
+
+def cmd_status(args):
+    from BUFF_SCRIPT import status_report
+    return True, status_report()
+
+
+def cmd_build(args):
+    from PipelineDAG import build_default_pipeline
+    dag = build_default_pipeline(check=args.check)
+    results = dag.run(args.targets or ['id.json'], jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    return 'failed' not in results.values(), results
+
+
+def cmd_converge(args):
+    from ConvergenceDriver import ConvergenceDriver
+    driver = ConvergenceDriver(
+        max_rounds=args.rounds,
+        max_requests=args.max_requests,
+        max_seconds=args.max_minutes * 60 if args.max_minutes else None,
+        use_html=args.html,
+        request_interval=args.interval if args.interval is not None else 4
+    )
+    stats = driver.run(args.category or None)
+    return stats['status'] == 'converged', stats
+
+
+# --------------------------
+# 参数解析
+# --------------------------
+
+def _add_targets(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('-c', '--category', action='append', help="分类名，可重复指定")
+    group.add_argument('--from-file', help="从文件读取分类列表（每行一个）")
+    group.add_argument('--all', action='store_true', help="全部分类")
+    group.add_argument('--changed', action='store_true', help="最近一次分类更新中新增或变化的分类")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='BuffCLI', description="BUFF数据管道非交互式命令行")
+    parser.add_argument('--profile', action='store_true', help="剖析子命令（cProfile），输出到 Profiles/")
+    parser.add_argument('--profile-flame', action='store_true', help="同 --profile，并用 py-spy 生成火焰图")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="同 --profile，并用 tracemalloc 统计峰值内存（耗时会包含其开销）")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('categories', help="生成/校验分类文件")
+    p.add_argument('--html', help="解析已保存的市场页面HTML")
+    p.add_argument('--fetch', action='store_true', help="自动获取分类（不指定 --html/--fetch 则只校验）")
+    p.add_argument('--browser', action='store_true', help="自动获取时直接使用无头浏览器")
+    p.set_defaults(func=cmd_categories)
+
+    p = sub.add_parser('collect', help="API采集并增量更新汇总")
+    _add_targets(p)
+    p.add_argument('--pages', type=int, nargs='+', help="只补采指定页码")
+    p.add_argument('--interval', type=float, help="请求间隔秒数")
+    p.add_argument('-j', '--jobs', type=int, default=1,
+                   help=f"并行分类数（最多{MAX_JOBS}，共用账号的请求频率，每 --interval 秒一次）")
+    p.add_argument('--no-snapshot', action='store_true', help="采集后不创建快照")
+    p.set_defaults(func=cmd_collect)
+
+    p = sub.add_parser('count', help="实时统计各分类数量")
+    _add_targets(p)
+    p.add_argument('--interval', type=int, help="请求间隔秒数（最小4）")
+    p.add_argument('--full', action='store_true', help="丢弃已有统计重新生成")
+    p.add_argument('-j', '--jobs', type=int, default=1,
+                   help=f"并行请求数（最多{MAX_JOBS}，共用账号的请求频率，每 --interval 秒一次）")
+    p.set_defaults(func=cmd_count)
+
+    p = sub.add_parser('html', help="HTML采集并分析（默认目标 duplicates.txt）")
+    _add_targets(p)
+    p.add_argument('--delay', type=float, help="页面间隔秒数")
+    p.add_argument('--headed', action='store_true', help="显示浏览器窗口")
+    p.set_defaults(func=cmd_html)
+
+    p = sub.add_parser('merge', help="合并数据源到FinalExtract（默认全部分类）")
+    _add_targets(p)
+    p.add_argument('--backfill-api', action='store_true', help="合并前通过API补全缺失hashname")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser('diff', help="对比实时统计与FinalExtract数量（有差异时退出码为1）")
+    p.add_argument('--no-recount', action='store_true', help="不重新生成FinalCount.json")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser('ids', help="生成去重ID列表")
+    p.add_argument('-o', '--output', default='id.json')
+    p.add_argument('-f', '--format', action='append', help="导出格式，可重复指定")
+    p.set_defaults(func=cmd_ids)
+
+    p = sub.add_parser('dupes', help="重复ID分析（默认查询目录库）")
+    p.add_argument('folder', nargs='?', help="JSON文件夹路径")
+    p.add_argument('--check-hashname', action='store_true')
+    p.add_argument('-j', '--jobs', type=int, default=None, help="并行进程数")
+    p.set_defaults(func=cmd_dupes)
+
+    p = sub.add_parser('snapshot', help="采集数据快照：创建/列出/恢复/清理")
+    p.add_argument('action', choices=['create', 'list', 'restore', 'prune'])
+    p.add_argument('run_id', nargs='?', help="restore 的快照ID")
+    p.add_argument('--label')
+    p.add_argument('--keep-last', type=int, help="保留最近的快照数（默认200）")
+    p.add_argument('--keep-daily', type=int, help="按天保留的天数（默认90）")
+    p.add_argument('--dry-run', action='store_true')
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser('changes', help="读取合并变更日志（新增/下架/改名）")
+    p.add_argument('--since', type=int, default=0, help="只返回 seq 大于该值的事件")
+    p.add_argument('-c', '--category', help="只返回指定分类")
+    p.add_argument('--type', choices=['added', 'removed', 'reappeared', 'renamed'])
+    p.add_argument('--summary-only', action='store_true', help="只输出各类型计数")
+    p.set_defaults(func=cmd_changes)
+
+    p = sub.add_parser('status', help="各阶段产物状态")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser('build', help="按依赖图只重建过期阶段")
+    p.add_argument('targets', nargs='*', help="阶段名或输出文件，默认 id.json")
+    p.add_argument('-j', '--jobs', type=int, default=4)
+    p.add_argument('--force', action='store_true')
+    p.add_argument('--dry-run', action='store_true')
+    p.add_argument('--check', choices=['hash', 'mtime'], default='hash')
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser('converge', help="循环重采合并直到数量一致")
+    p.add_argument('-c', '--category', action='append', help="首轮检查的分类，默认全部")
+    p.add_argument('--rounds', type=int, default=5)
+    p.add_argument('--max-requests', type=int)
+    p.add_argument('--max-minutes', type=float)
+    p.add_argument('--html', action='store_true')
+    p.add_argument('--interval', type=int)
+    p.set_defaults(func=cmd_converge)
+    return parser
+
+
+def run(argv=None):
+    """执行子命令，返回 (退出码, JSON摘要)"""
+    args = build_parser().parse_args(argv)
+    start = perf_counter()
+    summary = {'command': args.command, 'started_at': datetime.now().isoformat()}
+
+    import Profiling
+    if args.profile or args.profile_flame or args.profile_memory:
+        Profiling.enable(flame=args.profile_flame, memory=args.profile_memory)
+
+    # 各模块的过程输出全部转到stderr，stdout保留给JSON摘要
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            with Profiling.profile_stage(args.command):
+                ok, result = args.func(args)
+            summary['ok'] = bool(ok)
+            summary['result'] = result
+            code = 0 if ok else 1
+        except SystemExit as e:
+            summary['ok'] = False
+            summary['error'] = f"模块退出（{e.code}）"
+            code = 1
+        except Exception as e:
+            summary['ok'] = False
+            summary['error'] = str(e)
+            code = 1
+
+    if Profiling.enabled():
+        summary['profile'] = Profiling.get_run().path
+    summary['elapsed'] = round(perf_counter() - start, 3)
+    return code, summary
+
+
+def main(argv=None):
+    code, summary = run(argv)
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=2, default=str)
+    sys.stdout.write('\n')
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
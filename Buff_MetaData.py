@@ -1,104 +1,108 @@
 import os
-import json
 from datetime import datetime
-from collections import defaultdict
+import numpy as np
+import JsonIO
+from Profiling import profiled, enable_from_argv
 
 
+def _load_items(filepath):
+    """读取单个分类文件，返回 (total_count, items)"""
+    data = JsonIO.load(filepath)
+    return data.get('meta', {}).get('total_count', 0), data.get('items', [])
+
+
+@profiled('summary')
 def merge_buffdata(source_dir, output_dir):
     # 初始化数据
     total_count = 0
-    collected_ids = set()
-    all_items = []
-    processed_files = 0
-    duplicates = defaultdict(list)
-    id_records = defaultdict(lambda: {'count': 0, 'files': set(), 'sample': None})
+    file_names = []
+    id_chunks = []
+    file_chunks = []
+    first_items = {}   # goods_id -> 首次出现的条目（汇总输出只需要这些）
 
     # 创建输出目录
     os.makedirs(output_dir, exist_ok=True)
 
-    # 遍历源目录
+    # 单遍读取：ID与文件编号存为紧凑数组，只保留每个ID首次出现的条目
     for filename in os.listdir(source_dir):
         if not filename.lower().endswith('.json'):
             continue
 
         filepath = os.path.join(source_dir, filename)
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                processed_files += 1
-
-                # 统计总量
-                total_count += data.get('meta', {}).get('total_count', 0)
-
-                # 处理items
-                for item in data.get('items', []):
-                    if 'id' not in item:
-                        continue
-
-                    item_id = item['id']
-                    if item_id in collected_ids:
-                        # 记录重复信息
-                        id_records[item_id]['count'] += 1
-                        id_records[item_id]['files'].add(filename)
-                        duplicates[item_id].append(item)
-                    else:
-                        # 记录新ID
-                        collected_ids.add(item_id)
-                        id_records[item_id] = {
-                            'count': 1,
-                            'files': {filename},
-                            'sample': item
-                        }
-                        all_items.append(item)
-
+            file_total, items = _load_items(filepath)
+            positions = [i for i, item in enumerate(items) if 'id' in item]
+            ids = np.fromiter((int(items[i]['id']) for i in positions), dtype=np.int64, count=len(positions))
         except Exception as e:
             print(f"跳过文件 {filename}，原因: {str(e)}")
             continue
 
+        file_idx = len(file_names)
+        file_names.append(filename)
+        total_count += file_total
+        id_chunks.append(ids)
+        file_chunks.append(np.full(len(positions), file_idx, dtype=np.int32))
+        for goods_id, i in zip(ids.tolist(), positions):
+            first_items.setdefault(goods_id, items[i])
+        del items
+
+    ids = np.concatenate(id_chunks) if id_chunks else np.empty(0, dtype=np.int64)
+    files = np.concatenate(file_chunks) if file_chunks else np.empty(0, dtype=np.int32)
+    del id_chunks, file_chunks
+
+    # 排序+去重：稳定排序保证每个ID的首个位置就是最早出现的文件
+    order = np.argsort(ids, kind='stable')
+    unique_ids, first, counts = np.unique(ids[order], return_index=True, return_counts=True)
+    dup_ranks = np.flatnonzero(counts > 1)
+    sorted_files = files[order]
+
+    # 汇总输出按ID有序
+    summary_items = [first_items[goods_id] for goods_id in unique_ids.tolist()]
+    del first_items
+
     # 构建汇总数据
+    collected = len(unique_ids)
     result = {
         "meta": {
             "generated_time": datetime.now().isoformat(),
             "total_count": total_count,
-            "collected": len(collected_ids),
-            "success_rate": f"{(len(collected_ids) / total_count * 100):.2f}%" if total_count else "0.00%",
-            "duplicate_count": len(duplicates)
+            "collected": collected,
+            "success_rate": f"{(collected / total_count * 100):.2f}%" if total_count else "0.00%",
+            "duplicate_count": len(dup_ranks)
         },
-        "items": sorted(all_items, key=lambda x: x['id'])
+        "items": summary_items
     }
 
     # 生成重复报告
     duplicate_report = []
-    for item_id, info in id_records.items():
-        if info['count'] > 1:
-            duplicate_report.append({
-                "id": item_id,
-                "count": info['count'],
-                "files": list(info['files']),
-                "sample_item": info['sample']
-            })
+    for rank in dup_ranks:
+        start = first[rank]
+        occurrence_files = np.unique(sorted_files[start:start + counts[rank]])
+        duplicate_report.append({
+            "id": summary_items[rank]['id'],
+            "count": int(counts[rank]),
+            "files": [file_names[i] for i in occurrence_files],
+            "sample_item": summary_items[rank]
+        })
 
     # 定义固定文件名
     summary_file = os.path.join(output_dir, "summary.json")
     report_file = os.path.join(output_dir, "duplicates.json")
 
     # 写入文件（覆盖原有文件）
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
-
-    with open(report_file, 'w', encoding='utf-8') as f:
-        json.dump(duplicate_report, f, ensure_ascii=False, indent=2)
+    JsonIO.dump(result, summary_file)
+    JsonIO.dump(duplicate_report, report_file)
 
     print(f"\n合并完成！")
-    print(f"处理文件数: {processed_files}")
+    print(f"处理文件数: {len(file_names)}")
     print(f"总物品数: {total_count}")
-    print(f"成功收集: {len(collected_ids)}")
-    print(f"发现重复: {len(duplicates)}")
+    print(f"成功收集: {collected}")
+    print(f"发现重复: {len(dup_ranks)}")
     print(f"汇总文件: {os.path.basename(summary_file)}")
     print(f"重复报告: {os.path.basename(report_file)}")
 
-
 if __name__ == "__main__":
+    enable_from_argv()
     BUFFDATA_DIR = "BuffData"
     OUTPUT_DIR = "SummaryData"
 
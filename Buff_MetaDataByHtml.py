@@ -1,80 +1,101 @@
 import os
-import json
+from array import array
+from time import perf_counter
 from datetime import datetime
-from collections import defaultdict
+from PipelineStatus import record_stage
+import JsonIO
+from Profiling import profiled, enable_from_argv
 
 INPUT_DIR = 'BuffDataByExtractHTML'
 OUTPUT_DIR = 'SummaryDataByHtml'
 
 
-def process_summary():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+@profiled('html_summary')
+def process_summary(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR):
+    started = perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
 
-    all_items = []
-    item_registry = defaultdict(list)
+    file_names = []
+    summary_data = []          # 首次出现的条目（保持出现顺序）
+    first_index = {}           # goods_id -> summary_data下标
+    first_file = array('I')    # 与summary_data对齐的来源文件编号
+    dup_files = {}             # goods_id -> 来源文件编号列表（仅重复ID）
+    raw_count = 0
 
-    # 读取并合并所有数据
-    for filename in os.listdir(INPUT_DIR):
+    # 单次流式遍历（按文件名顺序）：只保留首次出现的条目和紧凑的重复信息
+    for filename in sorted(os.listdir(input_dir)):
         if not filename.endswith('.json'):
             continue
 
-        filepath = os.path.join(INPUT_DIR, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-                items = data['data']
-                all_items.extend(items)
-
-                # 记录商品来源信息
-                for item in items:
-                    item_registry[item['goods_id']].append({
-                        "file": filename,
-                        "item": item
-                    })
-            except Exception as e:
-                print(f"解析文件 {filename} 失败: {str(e)}")
-                continue
+        filepath = os.path.join(input_dir, filename)
+        file_idx = len(file_names)
+        mark = len(summary_data)
+        touched = []
+        count = 0
+        try:
+            for item in JsonIO.iter_array(filepath, 'data'):
+                goods_id = item['goods_id']
+                count += 1
+                index = first_index.get(goods_id)
+                if index is None:
+                    first_index[goods_id] = len(summary_data)
+                    summary_data.append(item)
+                    first_file.append(file_idx)
+                    continue
+                touched.append(goods_id)
+                if goods_id in dup_files:
+                    dup_files[goods_id].append(file_idx)
+                else:
+                    dup_files[goods_id] = [first_file[index], file_idx]
+        except Exception as e:
+            # 文件中途解析失败：撤销该文件已计入的条目，整个文件跳过
+            print(f"解析文件 {filename} 失败: {str(e)}")
+            for goods_id in touched:
+                files = dup_files.get(goods_id)
+                while files and files[-1] == file_idx:
+                    files.pop()
+                if files is not None and len(files) < 2:
+                    del dup_files[goods_id]
+            for item in summary_data[mark:]:
+                del first_index[item['goods_id']]
+            del summary_data[mark:]
+            del first_file[mark:]
+            continue
 
-    # 去重逻辑：保留每个goods_id的第一个出现项
-    seen_ids = {}
-    summary_data = []
-    for item in all_items:
-        goods_id = item['goods_id']
-        if goods_id not in seen_ids:
-            seen_ids[goods_id] = True
-            summary_data.append(item)
+        file_names.append(filename)
+        raw_count += count
 
-    # 检测重复项
+    # 检测重复项（按首次出现顺序输出）
     duplicates = []
-    for goods_id, records in item_registry.items():
-        if len(records) > 1:
-            duplicates.append({
-                "goods_id": goods_id,
-                "count": len(records),
-                "files": [r['file'] for r in records],
-                "sample_item": records[0]['item']
-            })
+    for goods_id in sorted(dup_files, key=first_index.get):
+        files = dup_files[goods_id]
+        duplicates.append({
+            "goods_id": goods_id,
+            "count": len(files),
+            "files": [file_names[i] for i in files],
+            "sample_item": summary_data[first_index[goods_id]]
+        })
 
     # 生成最终文件
     for filename, data in [('summary.json', summary_data), ('duplicates.json', duplicates)]:
-        output_path = os.path.join(OUTPUT_DIR, filename)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                "meta": {
-                    "generated_time": datetime.now().isoformat(),
-                    "total_items": len(data),
-                    "duplicate_count": len(duplicates)
-                },
-                "data": data
-            }, f, ensure_ascii=False, indent=2)
+        JsonIO.dump({
+            "meta": {
+                "generated_time": datetime.now().isoformat(),
+                "total_items": len(data),
+                "duplicate_count": len(duplicates)
+            },
+            "data": data
+        }, os.path.join(output_dir, filename))
 
     # 打印统计信息
     print(f"生成文件：")
-    print(f"- 主文件：{os.path.join(OUTPUT_DIR, 'summary.json')}")
-    print(f"- 重复记录：{os.path.join(OUTPUT_DIR, 'duplicates.json')}")
+    print(f"- 主文件：{os.path.join(output_dir, 'summary.json')}")
+    print(f"- 重复记录：{os.path.join(output_dir, 'duplicates.json')}")
     print(
-        f"统计：共处理 {len(all_items)} 条原始数据，去重后保留 {len(summary_data)} 条，发现 {len(duplicates)} 个重复商品ID")
-
+        f"统计：共处理 {raw_count} 条原始数据，去重后保留 {len(summary_data)} 条，发现 {len(duplicates)} 个重复商品ID")
+    record_stage('html_summary', items=len(summary_data), duration=perf_counter() - started,
+                 duplicates=len(duplicates))
 
 if __name__ == "__main__":
+    enable_from_argv()
     process_summary()
\ No newline at end of file
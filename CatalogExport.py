@@ -0,0 +1,206 @@
+import csv
+import json
+import JsonIO
+
+# 格式 -> 文件后缀
+FORMATS = {
+    'json': '.json',
+    'ndjson': '.ndjson',
+    'csv': '.csv',
+    'msgpack': '.msgpack',
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+    'bin': '.bin'
+}
+
+
+class _StagedWriter:
+    """导出写入器先写临时文件：finish 写完临时文件，publish 原子替换目标，close 依次执行两者
+
+    同时导出多种格式时，全部写入器 finish 成功后再逐个 publish，任一格式失败都不会留下新旧混合的导出。
+    """
+
+    def close(self):
+        self.finish()
+        self.publish()
+
+    def finish(self):
+        self.f.finish()
+
+    def publish(self):
+        self.f.publish()
+
+    def abort(self):
+        self.f.abort()
+
+
+class JsonWriter(_StagedWriter):
+    """兼容旧版id.json结构（meta + data），逐条写入"""
+
+    def __init__(self, path, meta):
+        self.f = JsonIO.AtomicWriter(path)
+        self.f.write(b'{\n  "meta": ' + JsonIO.dumps(meta, pretty=False) + b',\n  "data": [')
+        self.count = 0
+
+    def write(self, goods_id, shortname, categories, hashname=None):
+        entry = {"goods_id": str(goods_id), "shortname": shortname, "categories": categories}
+        self.f.write((b'\n    ' if self.count == 0 else b',\n    ') + JsonIO.dumps(entry, pretty=False))
+        self.count += 1
+
+    def finish(self):
+        self.f.write(b'\n  ]\n}\n')
+        self.f.finish()
+
+
+class NdjsonWriter(_StagedWriter):
+    """每行一个商品，便于流式读取"""
+
+    def __init__(self, path, meta):
+        self.f = JsonIO.AtomicWriter(path)
+
+    def write(self, goods_id, shortname, categories, hashname=None):
+        self.f.write(JsonIO.dumps({"goods_id": goods_id, "shortname": shortname, "categories": categories},
+                                  pretty=False) + b'\n')
+
+
+class _Utf8Sink:
+    """csv.writer 写入文本，AtomicWriter 接收字节"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, text):
+        self.f.write(text.encode('utf-8'))
+
+
+class CsvWriter(_StagedWriter):
+    """goods_id,shortname,categories（分类以 | 分隔）"""
+
+    def __init__(self, path, meta):
+        self.f = JsonIO.AtomicWriter(path)
+        self.writer = csv.writer(_Utf8Sink(self.f))
+        self.writer.writerow(['goods_id', 'shortname', 'categories'])
+
+    def write(self, goods_id, shortname, categories, hashname=None):
+        self.writer.writerow([goods_id, shortname, '|'.join(categories)])
+
+
+class MsgpackWriter(_StagedWriter):
+    """连续的msgpack map流"""
+
+    def __init__(self, path, meta):
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError("导出msgpack需要安装 msgpack：pip install msgpack")
+        self.packer = msgpack.Packer(use_bin_type=True)
+        self.f = JsonIO.AtomicWriter(path)
+
+    def write(self, goods_id, shortname, categories, hashname=None):
+        self.f.write(self.packer.pack({"goods_id": goods_id, "shortname": shortname, "categories": categories}))
+
+
+class ArrowWriter(_StagedWriter):
+    """列式导出（Parquet或Arrow IPC），按批写入避免整表驻留内存
+
+    pyarrow自行打开文件，因此写到 JsonIO.temp_path 分配的临时文件，publish 时再原子替换目标。
+    """
+
+    batch_size = 65536
+
+    def __init__(self, path, meta, file_format):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(f"导出{file_format}需要安装 pyarrow：pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema(
+            [('goods_id', pa.int64()), ('shortname', pa.string()), ('categories', pa.list_(pa.string()))],
+            metadata={'meta': json.dumps(meta, ensure_ascii=False)}
+        )
+        self.path = path
+        self.tmp_path = JsonIO.temp_path(path)
+        try:
+            if file_format == 'parquet':
+                self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.tmp_path, self.schema)
+        except BaseException:
+            JsonIO.discard_file(self.tmp_path)
+            raise
+        self.columns = ([], [], [])
+
+    def write(self, goods_id, shortname, categories, hashname=None):
+        self.columns[0].append(goods_id)
+        self.columns[1].append(shortname)
+        self.columns[2].append(categories)
+        if len(self.columns[0]) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.columns[0]:
+            self.writer.write_batch(self.pa.record_batch(list(self.columns), schema=self.schema))
+            self.columns = ([], [], [])
+
+    def finish(self):
+        self._flush()
+        self.writer.close()
+
+    def publish(self):
+        JsonIO.replace_file(self.tmp_path, self.path)
+
+    def abort(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        JsonIO.discard_file(self.tmp_path)
+
+
+def open_writer(file_format, path, meta):
+    if file_format == 'json':
+        return JsonWriter(path, meta)
+    if file_format == 'ndjson':
+        return NdjsonWriter(path, meta)
+    if file_format == 'csv':
+        return CsvWriter(path, meta)
+    if file_format == 'msgpack':
+        return MsgpackWriter(path, meta)
+    if file_format in ('parquet', 'arrow'):
+        return ArrowWriter(path, meta, file_format)
+    if file_format == 'bin':
+        from BinaryCatalog import BinaryCatalogWriter
+        return BinaryCatalogWriter(path, meta)
+    raise ValueError(f"不支持的导出格式: {file_format}")
+
+
+def export_path(base_path, file_format):
+    """id.json + parquet -> id.parquet"""
+    stem = base_path[:-len('.json')] if base_path.endswith('.json') else base_path
+    return stem + FORMATS[file_format]
+
+
+# --------------------------
+# 下游读取工具
+# --------------------------
+
+def iter_ndjson(path):
+    """逐行读取NDJSON导出"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield JsonIO.loads(line)
+
+
+def iter_msgpack(path):
+    """流式读取msgpack导出"""
+    import msgpack
+    with open(path, 'rb') as f:
+        yield from msgpack.Unpacker(f, raw=False)
+
+
+def open_arrow(path):
+    """以内存映射方式打开Arrow IPC导出，返回pyarrow.Table（零拷贝）"""
+    import pyarrow as pa
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from datetime import datetime
+from html.parser import HTMLParser
+import JsonIO
+
+MARKET_URL = "https://buff.163.com/market/csgo"
+CONTAINER_ID = "j_h1z1-selType"
+MAPPING_PATH = "category_mapping.json"
+VERSION_PATH = os.path.join('BuffStats', 'CategoryVersion.json')
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36")
+
+
+def _clean(parts):
+    return ''.join(parts).strip().replace('\xa0', ' ')
+
+
+class _SelTypeParser(HTMLParser):
+    """只解析 #j_h1z1-selType 子树：div.item 内第一个 <p> 为主分类，<li value> 为子分类
+
+    容器闭合后置 done，调用方可停止继续读取页面。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.categories = []
+        self.done = False
+        self._depth = 0          # 容器内的div层级，0表示尚未进入容器
+        self._item_depth = None
+        self._current = None
+        self._text = None
+        self._target = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        if self._depth == 0:
+            if tag == 'div' and attrs.get('id') == CONTAINER_ID:
+                self._depth = 1
+            return
+
+        if tag == 'div':
+            self._depth += 1
+            if self._current is None and 'item' in (attrs.get('class') or '').split():
+                self._current = {"main_category": "", "sub_categories": []}
+                self._item_depth = self._depth
+        elif self._current is not None:
+            if tag == 'li':
+                self._flush_li()        # 兼容省略 </li> 的写法
+                self._text, self._target = [], ('li', attrs.get('value') or '')
+            elif tag == 'p' and not self._current['main_category'] and self._target is None:
+                self._text, self._target = [], 'p'
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if self.done or self._depth == 0:
+            return
+        if tag == 'p' and self._target == 'p':
+            self._current['main_category'] = _clean(self._text)
+            self._text = self._target = None
+        elif tag in ('li', 'ul'):
+            self._flush_li()
+        elif tag == 'div':
+            if self._depth == self._item_depth:
+                self._flush_li()
+                self.categories.append(self._current)
+                self._current = self._item_depth = None
+            self._depth -= 1
+            if self._depth == 0:
+                self.done = True
+
+    def _flush_li(self):
+        if isinstance(self._target, tuple):
+            self._current['sub_categories'].append({"name": _clean(self._text), "value": self._target[1]})
+            self._text = self._target = None
+
+
+def parse_category_tree(source, chunk_keep=1024):
+    """从HTML文本或文本块迭代器中提取分类树
+
+    只在找到容器标记后才开始解析，容器闭合即停止读取，不构建整页DOM。
+    """
+    if isinstance(source, str):
+        source = (source,)
+
+    parser = _SelTypeParser()
+    pending = ''
+    started = False
+    for chunk in source:
+        if not chunk:
+            continue
+        if not started:
+            pending += chunk
+            idx = pending.find(CONTAINER_ID)
+            if idx == -1:
+                pending = pending[-chunk_keep:]
+                continue
+            start = pending.rfind('<div', 0, idx)
+            chunk, started = pending[max(start, 0):], True
+        parser.feed(chunk)
+        if parser.done:
+            break
+
+    if not parser.categories:
+        raise ValueError("页面结构异常，未找到分类容器 #" + CONTAINER_ID)
+    return parser.categories
+
+
+# --------------------------
+# 获取页面
+# --------------------------
+
+def _config_cookie():
+    try:
+        with open('config.json', 'r', encoding='utf-8') as f:
+            return json.load(f).get('cookie')
+    except Exception:
+        return None
+
+
+def fetch_via_requests(url=MARKET_URL, timeout=15):
+    """流式下载市场页面，解析到分类容器结束即断开连接"""
+    import requests  # 网络依赖只在实际获取时加载
+
+    headers = {"User-Agent": USER_AGENT}
+    cookie = _config_cookie()
+    if cookie:
+        headers["Cookie"] = cookie
+    with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        # 未声明charset时requests按HTTP规范回退为ISO-8859-1，会把中文分类名解成乱码；
+        # apparent_encoding 需要读完整个响应，与流式解析冲突，因此直接按页面实际编码UTF-8解码
+        if 'charset=' not in response.headers.get('Content-Type', '').lower():
+            response.encoding = 'utf-8'
+        return parse_category_tree(response.iter_content(chunk_size=64 * 1024, decode_unicode=True))
+
+
+def fetch_via_browser(url=MARKET_URL, timeout=30):
+    """无头浏览器加载页面，只取分类容器的outerHTML解析"""
+    from playwright.sync_api import sync_playwright  # 浏览器依赖只在回退时加载
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            context = browser.new_context(
+                user_agent=USER_AGENT,
+                storage_state="auth.json" if os.path.exists("auth.json") else None
+            )
+            page = context.new_page()
+            page.goto(url, timeout=timeout * 1000)
+            page.wait_for_selector(f"#{CONTAINER_ID}", state='attached', timeout=timeout * 1000)
+            html = page.eval_on_selector(f"#{CONTAINER_ID}", "el => el.outerHTML")
+        finally:
+            browser.close()
+    return parse_category_tree(html)
+
+
+def fetch_category_tree(url=MARKET_URL, use_browser=None):
+    """自动获取分类树，返回 (分类列表, 来源)
+
+    use_browser: None 先请求页面、失败时回退无头浏览器；True 只用浏览器；False 只用请求
+    """
+    if use_browser is not True:
+        try:
+            return fetch_via_requests(url), 'requests'
+        except Exception as e:
+            if use_browser is False:
+                raise
+            print(f"直接请求分类页面失败（{str(e)}），改用无头浏览器")
+    return fetch_via_browser(url), 'browser'
+
+
+def load_html_file(html_path):
+    """解析本地保存的市场页面HTML"""
+    with open(html_path, 'r', encoding='utf-8') as f:
+        return parse_category_tree(iter(lambda: f.read(64 * 1024), ''))
+
+
+# --------------------------
+# 版本与变更
+# --------------------------
+
+def category_version(categories):
+    """分类树内容哈希，与JSON格式和文件换行无关"""
+    canonical = json.dumps(categories, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def _flatten(categories):
+    return {sub['value']: (cat['main_category'], sub['name'])
+            for cat in categories for sub in cat['sub_categories']}
+
+
+def diff_categories(old, new):
+    """按子分类value比较：新增、删除、名称或所属主分类变化"""
+    old_map, new_map = _flatten(old), _flatten(new)
+    return {
+        'added': sorted(set(new_map) - set(old_map)),
+        'removed': sorted(set(old_map) - set(new_map)),
+        'renamed': sorted(v for v in set(old_map) & set(new_map) if old_map[v] != new_map[v])
+    }
+
+
+def load_version(version_path=VERSION_PATH):
+    if not os.path.exists(version_path):
+        return None
+    try:
+        with open(version_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def changed_categories(version_path=VERSION_PATH):
+    """最近一次更新中新增或变化的子分类，下游据此只重采受影响的分类"""
+    info = load_version(version_path)
+    if not info:
+        return []
+    return info['changes']['added'] + info['changes']['renamed']
+
+
+def save_categories(categories, source, mapping_path=MAPPING_PATH, version_path=VERSION_PATH):
+    """内容变化时才重写分类文件（保持下游输入指纹不变），并记录版本与变更"""
+    old = []
+    if os.path.exists(mapping_path):
+        try:
+            with open(mapping_path, 'r', encoding='utf-8') as f:
+                old = json.load(f)
+        except Exception:
+            old = []
+
+    version = category_version(categories)
+    previous = category_version(old) if old else None
+    changed = version != previous
+    now = datetime.now().isoformat(timespec='seconds')
+
+    if changed:
+        JsonIO.dump(categories, mapping_path, pretty=True)
+
+    info = load_version(version_path) or {}
+    info.update({
+        'version': version,
+        'previous_version': previous if changed else info.get('previous_version'),
+        'source': source,
+        'checked_at': now,
+        'updated_at': now if changed else info.get('updated_at', now),
+        'total_main': len(categories),
+        'total_sub': sum(len(cat['sub_categories']) for cat in categories),
+        # 只记录本次检查相对上一版本的变更，未变化时为空
+        'changes': diff_categories(old, categories) if changed else {'added': [], 'removed': [], 'renamed': []}
+    })
+    JsonIO.dump(info, version_path, pretty=True)
+
+    info['changed'] = changed
+    return info
+
+
+def print_changes(info):
+    if not info['changed']:
+        print(f"分类未变化（版本 {info['version'][:12]}），分类文件保持不变")
+        return
+    changes = info['changes']
+    print(f"分类已更新：版本 {info['version'][:12]}，主分类 {info['total_main']} 个，子分类 {info['total_sub']} 个")
+    for key, label in (('added', '新增'), ('removed', '删除'), ('renamed', '变化')):
+        if changes[key]:
+            print(f"  {label} {len(changes[key])} 个: {', '.join(changes[key][:10])}"
+                  f"{' ...' if len(changes[key]) > 10 else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自动获取BUFF分类树，内容变化时才更新category_mapping.json")
+    parser.add_argument('--html', help="改为解析本地保存的市场页面HTML")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--browser', action='store_true', help="只用无头浏览器获取")
+    group.add_argument('--no-browser', action='store_true', help="只直接请求页面，不回退浏览器")
+    args = parser.parse_args()
+
+    try:
+        if args.html:
+            categories, source = load_html_file(args.html), 'html'
+        else:
+            categories, source = fetch_category_tree(
+                use_browser=True if args.browser else (False if args.no_browser else None))
+    except Exception as e:
+        print(f"获取分类失败: {str(e)}")
+        return 1
+    print_changes(save_categories(categories, source))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+import sys
+import argparse
+from datetime import datetime
+import JsonIO
+from GoodsCatalog import parse_goods_id
+
+FEED_PATH = os.path.join('BuffStats', 'ChangeFeed.ndjson')
+STATE_PATH = os.path.join('BuffStats', 'ChangeFeedState.json')
+NAME_FIELDS = ('hashname', 'shortname')
+
+
+class ChangeFeed:
+    """合并时产生的增量变更日志（NDJSON，只追加），每行一个事件：
+
+      added      新收录的商品
+      removed    完整采集中已不存在的商品（FinalExtract中仍保留）
+      reappeared 之前报告为removed、又重新出现的商品
+      renamed    hashname/shortname 变化，附 old/new
+
+    每个事件带递增 seq，下游记住最后处理的 seq 即可只读取新增部分。
+    """
+
+    def __init__(self, feed_path=FEED_PATH, state_path=STATE_PATH):
+        self.feed_path = feed_path
+        self.state_path = state_path
+        self.run_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            try:
+                return JsonIO.load(self.state_path)
+            except Exception as e:
+                print(f"变更日志状态加载失败，将重新开始记录缺失商品: {str(e)}")
+        return {'last_seq': 0, 'missing': {}}
+
+    def record(self, category, added, renamed, live_ids=None, final_ids=()):
+        """记录单个分类的变更，返回 {类型: 数量}
+
+        live_ids 为本次数据源中出现的ID集合，只有数据源被判定为完整采集时才传入，
+        否则无法区分"下架"与"未采集到"，不产生 removed 事件。
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        events = []
+
+        for item in added:
+            events.append({'type': 'added', 'goods_id': item['goods_id'],
+                           'hashname': item.get('hashname'), 'shortname': item.get('shortname'),
+                           'source': item.get('source')})
+        for change in renamed:
+            events.append({'type': 'renamed', **change})
+
+        if live_ids is not None:
+            previous = set(self.state['missing'].get(category, []))
+            # 旧版FinalExtract可能含 'None' 等非数字ID，不参与下架判定
+            missing = {goods_id for goods_id in final_ids
+                       if goods_id not in live_ids and parse_goods_id(goods_id) is not None}
+            for goods_id in sorted(missing - previous, key=int):
+                events.append({'type': 'removed', 'goods_id': goods_id})
+            for goods_id in sorted(previous - missing, key=int):
+                events.append({'type': 'reappeared', 'goods_id': goods_id})
+            if missing:
+                self.state['missing'][category] = sorted(missing, key=int)
+            else:
+                self.state['missing'].pop(category, None)
+
+        counts = {}
+        if events:
+            lines = []
+            for event in events:
+                self.state['last_seq'] += 1
+                event = {'seq': self.state['last_seq'], 'run': self.run_id, 'ts': now,
+                         'category': category, **event}
+                lines.append(JsonIO.dumps(event, pretty=False) + b'\n')
+                counts[event['type']] = counts.get(event['type'], 0) + 1
+            os.makedirs(os.path.dirname(self.feed_path) or '.', exist_ok=True)
+            with open(self.feed_path, 'ab') as f:
+                f.write(b''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+        if events or live_ids is not None:
+            JsonIO.dump(self.state, self.state_path, pretty=False)
+        return counts
+
+
+def read_changes(since_seq=0, feed_path=FEED_PATH, category=None):
+    """流式读取 seq 大于 since_seq 的事件"""
+    if not os.path.exists(feed_path):
+        return
+    with open(feed_path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = JsonIO.loads(line)
+            if event['seq'] > since_seq and (category is None or event['category'] == category):
+                yield event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="输出合并变更日志中的事件（NDJSON）")
+    parser.add_argument('--since', type=int, default=0, help="只输出 seq 大于该值的事件")
+    parser.add_argument('--category', help="只输出指定分类")
+    parser.add_argument('--type', choices=['added', 'removed', 'reappeared', 'renamed'], help="只输出指定类型")
+    args = parser.parse_args()
+
+    out = sys.stdout.buffer
+    for event in read_changes(args.since, category=args.category):
+        if args.type is None or event['type'] == args.type:
+            out.write(JsonIO.dumps(event, pretty=False) + b'\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import os
+import sys
+import hashlib
+from datetime import datetime
+from collections import defaultdict
+import JsonIO
+
+INDEX_PATH = os.path.join('BuffStats', 'ConflictIndex.json')
+REPORT_PATH = os.path.join('BuffStats', 'ConflictReport.json')
+
+# 数据源目录 -> 条目列表字段、ID字段
+SOURCES = {
+    'BuffData': ('items', 'id'),
+    'BuffDataByExtractHTML': ('data', 'goods_id'),
+    'FinalExtract': ('data', 'goods_id')
+}
+FIELDS = ('hashname', 'shortname')
+
+
+def _digest(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ConflictIndex:
+    """跨数据源商品元数据冲突索引（按字段哈希比较，只重读有变化的文件）"""
+
+    def __init__(self, index_path=INDEX_PATH, report_path=REPORT_PATH, sources=SOURCES):
+        self.index_path = index_path
+        self.report_path = report_path
+        self.sources = sources
+        self.files = {}      # 路径 -> {signature, entries: {goods_id: [各字段摘要]}}
+        self.values = {}     # 摘要 -> 原始值
+        self.conflicts = {}
+        self._load()
+
+    def refresh(self):
+        """同步数据源变化，只重新检查受影响的ID，返回 (变化文件数, 冲突ID数)"""
+        current = self._scan_sources()
+        touched = set()
+
+        for path in [p for p in self.files if p not in current]:
+            touched.update(self.files.pop(path)['entries'])
+
+        changed = [p for p, sig in current.items() if self.files.get(p, {}).get('signature') != sig]
+        for path in changed:
+            old = self.files.get(path, {}).get('entries', {})
+            entries = self._read_entries(path)
+            if entries is None:
+                continue
+            touched.update(old)
+            touched.update(entries)
+            self.files[path] = {'signature': current[path], 'entries': entries}
+
+        if touched:
+            self._recheck(touched)
+            self._save()
+        return len(changed), len(self.conflicts)
+
+    def rebuild(self):
+        """丢弃索引全量重建"""
+        self.files = {}
+        self.values = {}
+        self.conflicts = {}
+        return self.refresh()
+
+    # 冲突计算 ------------------------------------
+
+    def _recheck(self, goods_ids):
+        variants = defaultdict(lambda: [defaultdict(list) for _ in FIELDS])
+        for path, record in self.files.items():
+            entries = record['entries']
+            if len(goods_ids) < len(entries):
+                pairs = ((g, entries[g]) for g in goods_ids if g in entries)
+            else:
+                pairs = ((g, d) for g, d in entries.items() if g in goods_ids)
+            for goods_id, digests in pairs:
+                for field_idx, digest in enumerate(digests):
+                    if digest is not None:
+                        variants[goods_id][field_idx][digest].append(path)
+
+        for goods_id in goods_ids:
+            report = {}
+            for field_idx, by_digest in enumerate(variants.get(goods_id, ())):
+                if len(by_digest) > 1:
+                    report[FIELDS[field_idx]] = [
+                        {'value': self.values.get(digest), 'files': sorted(paths)}
+                        for digest, paths in sorted(by_digest.items(), key=lambda kv: -len(kv[1]))
+                    ]
+            if report:
+                self.conflicts[goods_id] = report
+            else:
+                self.conflicts.pop(goods_id, None)
+
+    # 工具方法 ------------------------------------
+
+    def _read_entries(self, path):
+        list_key, id_key = self.sources[os.path.basename(os.path.dirname(path))]
+        try:
+            items = JsonIO.load(path).get(list_key, [])
+        except Exception as e:
+            print(f"冲突索引跳过文件 {path}: {str(e)}")
+            return None
+
+        entries = {}
+        for item in items:
+            if id_key not in item:
+                continue
+            digests = []
+            for field in FIELDS:
+                digest = _digest(item.get(field))
+                if digest is not None:
+                    self.values.setdefault(digest, str(item[field]).strip())
+                digests.append(digest)
+            entries[str(item[id_key])] = digests
+        return entries
+
+    def _scan_sources(self):
+        signatures = {}
+        for source_dir in self.sources:
+            if not os.path.isdir(source_dir):
+                continue
+            for name in os.listdir(source_dir):
+                if name.endswith('.json'):
+                    path = os.path.join(source_dir, name)
+                    stat = os.stat(path)
+                    signatures[path] = [stat.st_mtime_ns, stat.st_size]
+        return signatures
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            data = JsonIO.load(self.index_path)
+            self.files = data['files']
+            self.values = data['values']
+            self.conflicts = data['conflicts']
+        except Exception as e:
+            print(f"冲突索引加载失败，将全量重建: {str(e)}")
+            self.files, self.values, self.conflicts = {}, {}, {}
+
+    def _save(self):
+        # 只保留仍被引用的值，避免字符串表无限增长
+        referenced = {d for r in self.files.values() for digests in r['entries'].values() for d in digests}
+        self.values = {d: v for d, v in self.values.items() if d in referenced}
+
+        JsonIO.dump({'files': self.files, 'values': self.values, 'conflicts': self.conflicts},
+                    self.index_path, pretty=False)
+        JsonIO.dump({
+            'generated_at': datetime.now().isoformat(),
+            'total_conflicts': len(self.conflicts),
+            'conflicts': dict(sorted(self.conflicts.items(), key=lambda kv: int(kv[0]) if kv[0].isdigit() else 0))
+        }, self.report_path, pretty=True)
+
+
+def check_conflicts(full=False):
+    """检查跨数据源冲突并打印摘要"""
+    index = ConflictIndex()
+    changed, total = index.rebuild() if full else index.refresh()
+    print(f"冲突检查：重新读取 {changed} 个文件，发现 {total} 个冲突商品ID")
+    if total:
+        print(f"冲突详情：{REPORT_PATH}")
+    return index.conflicts
+
+
+if __name__ == "__main__":
+    check_conflicts(full='--full' in sys.argv)
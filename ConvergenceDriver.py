@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import math
+import argparse
+from time import perf_counter
+from datetime import datetime
+import JsonIO
+
+STATS_PATH = os.path.join('BuffStats', 'Convergence.json')
+ACTUAL_PATH = os.path.join('BuffStats', 'ActualCategoryCount.json')
+FINAL_PATH = os.path.join('BuffStats', 'FinalCount.json')
+EXCLUDE_FIELDS = {"Sum", "更新日期"}
+
+
+def _load_counts(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return {k: v for k, v in json.load(f).items() if k not in EXCLUDE_FIELDS}
+
+
+class ConvergenceDriver:
+    """无人值守的闭环补全：实时统计 -> 对比 -> 重采差异分类 -> (HTML) -> 合并，直到数量一致
+
+    相当于手动循环菜单 5 -> 2(文件模式) -> 3 -> 4 -> 5；每轮只处理仍有差异的分类，
+    在收敛、达到轮数/请求数/时间预算或连续两轮没有进展时停止。
+    """
+
+    def __init__(self, max_rounds=5, max_requests=None, max_seconds=None, use_html=False,
+                 request_interval=4, stats_path=STATS_PATH):
+        self.max_rounds = max_rounds
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.use_html = use_html
+        self.request_interval = request_interval
+        self.stats_path = stats_path
+
+        self._counter = None
+        self._collector = None
+        self._html_collector = None
+        self._merger = None
+        self.start = None
+        self.stats = None
+
+    # 采集器按需创建（需要config.json/浏览器）------------------
+
+    @property
+    def counter(self):
+        if self._counter is None:
+            from ActualTimeCategoryCount import BuffCategoryCounter
+            self._counter = BuffCategoryCounter(self.request_interval)
+        return self._counter
+
+    @property
+    def collector(self):
+        if self._collector is None:
+            from BUFF_GET_ALL_ITEMS_DETAILS import BuffCollector
+            self._collector = BuffCollector()
+        return self._collector
+
+    @property
+    def html_collector(self):
+        if self._html_collector is None:
+            from GET_ITEMS_DetailsByHtml import BuffHTMLCollector
+            self._html_collector = BuffHTMLCollector()
+            self._html_collector.headless = True
+        return self._html_collector
+
+    @property
+    def merger(self):
+        if self._merger is None:
+            from TwoBuffDataExtract import IncrementalMerger
+            self._merger = IncrementalMerger()
+        return self._merger
+
+    def requests_used(self):
+        return sum(c.request_count for c in (self._counter, self._collector, self._html_collector) if c)
+
+    def budget_left(self, needed=0):
+        """剩余预算是否足够再发出 needed 个请求"""
+        if self.max_seconds is not None and perf_counter() - self.start >= self.max_seconds:
+            return False
+        if self.max_requests is not None and self.requests_used() + needed > self.max_requests:
+            return False
+        return True
+
+    # 主循环 ------------------------------------
+
+    def run(self, categories=None):
+        from RecordFinalExtractCount import count_goods_ids
+        from Find_Count_Not_Equal_Category import compare_category_counts
+
+        self.start = perf_counter()
+        self.stats = {
+            'started_at': datetime.now().isoformat(),
+            'budget': {'max_rounds': self.max_rounds, 'max_requests': self.max_requests,
+                       'max_seconds': self.max_seconds},
+            'rounds': [],
+            'status': 'running'
+        }
+        # HTML采集依赖浏览器登录凭证，缺失时在发出任何请求前退出（无人值守时不会弹出登录）
+        if self.use_html and not os.path.exists('auth.json'):
+            print("缺少 auth.json 登录凭证，请先通过交互模式登录一次")
+            self.stats.update(status='missing_auth', error='auth.json 不存在',
+                              finished_at=datetime.now().isoformat())
+            self._save()
+            return self.stats
+        targets = categories or self.counter._get_all_categories()
+        previous_gap = None
+
+        for round_no in range(1, self.max_rounds + 1):
+            round_start = perf_counter()
+            requests_before = self.requests_used()
+            print(f"\n===== 第 {round_no} 轮：检查 {len(targets)} 个分类 =====")
+
+            if not self.budget_left(len(targets)):
+                self.stats['status'] = 'budget_exhausted'
+                break
+
+            count_goods_ids()
+            self.counter.process_categories(targets)
+            diff = compare_category_counts()
+            gap = self._gap()
+            record = {
+                'round': round_no,
+                'checked': len(targets),
+                'diff_categories': len(diff),
+                'missing_items': gap['missing'],
+                'extra_items': gap['extra'],
+                'completeness': gap['completeness']
+            }
+
+            if not diff:
+                record.update(requests=self.requests_used() - requests_before,
+                              elapsed=round(perf_counter() - round_start, 2))
+                self.stats['rounds'].append(record)
+                self.stats['status'] = 'converged'
+                break
+            if previous_gap == (sorted(diff), gap['missing'], gap['extra']):
+                record.update(requests=self.requests_used() - requests_before,
+                              elapsed=round(perf_counter() - round_start, 2))
+                self.stats['rounds'].append(record)
+                self.stats['status'] = 'stalled'
+                print("连续两轮差异未变化（可能是线上下架的商品），停止循环")
+                break
+            previous_gap = (sorted(diff), gap['missing'], gap['extra'])
+
+            collected = self._recollect(diff)
+            if self.use_html and collected and self.budget_left():
+                self._collect_html(collected)
+            if collected:
+                # 与菜单合并相同：记录合并阶段状态、重新导出更名商品所在分类并刷新统计与冲突检查
+                self.merger.process_categories(collected)
+
+            record.update(recollected=len(collected),
+                          requests=self.requests_used() - requests_before,
+                          elapsed=round(perf_counter() - round_start, 2))
+            self.stats['rounds'].append(record)
+            self._save()
+            print(f"第 {round_no} 轮完成：差异 {len(diff)} 个分类，重采 {len(collected)} 个，"
+                  f"完整度 {gap['completeness']:.2%}")
+
+            targets = diff
+            if len(collected) < len(diff):
+                self.stats['status'] = 'budget_exhausted'
+                break
+        else:
+            self.stats['status'] = 'max_rounds'
+
+        count_goods_ids()
+        self.stats['requests'] = self.requests_used()
+        self.stats['elapsed'] = round(perf_counter() - self.start, 2)
+        self.stats['finished_at'] = datetime.now().isoformat()
+        self._save()
+        print(f"\n收敛结束：{self.stats['status']}，共 {len(self.stats['rounds'])} 轮，"
+              f"{self.stats['requests']} 次请求，耗时 {self.stats['elapsed']}s")
+        return self.stats
+
+    def _recollect(self, categories):
+        """按预估页数在预算内重采差异分类，返回实际重采的分类"""
+        actual = _load_counts(ACTUAL_PATH)
+        collected = []
+        for category in categories:
+            pages = max(1, math.ceil(actual.get(category, 0) / self.collector.page_size))
+            if not self.budget_left(pages):
+                print(f"预算不足，跳过 {category}（约 {pages} 次请求）")
+                continue
+            print(f"\n重采 {category}（约 {pages} 页）")
+            self.collector.process_category(category)
+            collected.append(category)
+        # 重采后刷新汇总与duplicates.txt，HTML采集据此工作
+        from IncrementalSummary import refresh_summary
+        refresh_summary("BuffData", "SummaryData")
+        return collected
+
+    def _collect_html(self, categories):
+        with open('duplicates.txt', 'r', encoding='utf-8') as f:
+            duplicated = {line.strip() for line in f if line.strip()}
+        targets = [c for c in categories if c in duplicated]
+        if not targets:
+            return
+        self.html_collector.current_task = {'mode': 'file', 'targets': targets, 'progress': 0,
+                                            'file_name': 'convergence'}
+        self.html_collector.start_collection()
+
+    def _gap(self):
+        actual = _load_counts(ACTUAL_PATH)
+        final = _load_counts(FINAL_PATH)
+        missing = sum(max(0, v - final.get(k, 0)) for k, v in actual.items())
+        extra = sum(max(0, v - actual.get(k, 0)) for k, v in final.items())
+        total = sum(actual.values())
+        return {
+            'missing': missing,
+            'extra': extra,
+            'completeness': round(1 - missing / total, 6) if total else 0.0
+        }
+
+    def _save(self):
+        JsonIO.dump(self.stats, self.stats_path, pretty=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自动循环对比/重采/合并，直到实时数量与FinalExtract一致")
+    parser.add_argument('categories', nargs='*', help="首轮检查的分类，默认全部")
+    parser.add_argument('--rounds', type=int, default=5, help="最大轮数")
+    parser.add_argument('--max-requests', type=int, help="请求数预算")
+    parser.add_argument('--max-minutes', type=float, help="时间预算（分钟）")
+    parser.add_argument('--html', action='store_true', help="对重复分类执行HTML采集（需要浏览器登录）")
+    parser.add_argument('--interval', type=int, default=4, help="实时统计请求间隔秒数")
+    args = parser.parse_args()
+
+    driver = ConvergenceDriver(
+        max_rounds=args.rounds,
+        max_requests=args.max_requests,
+        max_seconds=args.max_minutes * 60 if args.max_minutes else None,
+        use_html=args.html,
+        request_interval=args.interval
+    )
+    stats = driver.run(args.categories or None)
+    return 0 if stats['status'] == 'converged' else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import os
+import re
+import hashlib
+from datetime import datetime
+import JsonIO
+
+MANIFEST_PATH = os.path.join('BuffStats', 'FinalManifest.json')
+
+# 条目中的 "goods_id": 键；前面带反斜杠的是字符串值里的转义引号，不计入
+GOODS_ID_KEY = re.compile(rb'(?<!\\)"goods_id"\s*:')
+CHUNK_SIZE = 1 << 20
+CHUNK_OVERLAP = 64
+
+
+class FinalManifest:
+    """FinalExtract分类文件清单：记录每个分类的条目数、文件签名与内容哈希
+
+    由IncrementalMerger在导出分类文件时更新，统计时签名一致即直接使用记录的数量。
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path = manifest_path
+        self.categories = self._load()
+
+    def record(self, category, path, total_items):
+        """记录刚写出的分类文件并保存清单"""
+        stat = os.stat(path)
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                sha1.update(chunk)
+        self.categories[category] = {
+            'file': os.path.basename(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': sha1.hexdigest(),
+            'total_items': total_items
+        }
+        self._save()
+
+    def lookup(self, path):
+        """文件签名与清单一致时返回记录的条目数，否则返回None"""
+        category = os.path.splitext(os.path.basename(path))[0]
+        entry = self.categories.get(category)
+        if not entry:
+            return None
+        stat = os.stat(path)
+        if entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            return None
+        return entry['total_items']
+
+    def _load(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            return JsonIO.load(self.manifest_path)['categories']
+        except Exception as e:
+            print(f"FinalExtract清单加载失败，将使用流式统计: {str(e)}")
+            return {}
+
+    def _save(self):
+        JsonIO.dump({'updated_at': datetime.now().isoformat(), 'categories': self.categories},
+                    self.manifest_path, pretty=True)
+
+
+def stream_count(path):
+    """不解析条目内容，按块扫描 "goods_id" 键统计条目数
+
+    相邻块保留少量重叠字节，跨块边界的键不会漏计或重复计数；
+    重叠区多保留的首字节只用于反斜杠判断，起点在该字节的匹配已在上一块计过。
+    """
+    count = 0
+    tail = b''
+    skip = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            buffer = tail + chunk
+            # 起点落在重叠区的匹配留给下一块处理
+            limit = len(buffer) if not chunk else max(skip, len(buffer) - CHUNK_OVERLAP)
+            for match in GOODS_ID_KEY.finditer(buffer):
+                if skip <= match.start() < limit:
+                    count += 1
+            if not chunk:
+                return count
+            tail = buffer[limit - 1:] if limit else buffer
+            skip = 1 if limit else 0
@@ -1,10 +1,178 @@
 import os
+import sys
 import json
-from collections import defaultdict
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from GoodsCatalog import GoodsCatalog, CATALOG_PATH
+import JsonIO
+from Profiling import profiled, enable_from_argv
+
+
+@profiled('analyze_catalog')
+def analyze_catalog():
+    """直接查询目录库中的跨分类重复与缺失hashname"""
+    if not os.path.exists(CATALOG_PATH):
+        print(f"错误：目录库 {CATALOG_PATH} 不存在，请先执行合并")
+        return None
+
+    with GoodsCatalog() as catalog:
+        duplicates = catalog.duplicate_ids()
+        missing = catalog.missing_hashname()
+        total = len(catalog.goods_ids())
+
+    for goods_id, categories in duplicates:
+        print(f"  ID {goods_id} 出现在 {len(categories)} 个分类：{', '.join(categories)}")
+
+    if missing:
+        output_file = "ShouldFindHashname.txt"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(f"{goods_id} | {shortname or '未知名称'}" for goods_id, shortname in missing))
+        print(f"\n发现 {len(missing)} 条缺失hashname的记录，已保存到 {output_file}")
+
+    print("\n" + "=" * 50)
+    print("目录库统计：")
+    print(f"全局唯一ID数量：{total}")
+    print(f"存在重复的ID数量（跨分类）：{len(duplicates)}")
+    return {
+        'total_unique': total,
+        'cross_category_duplicates': {goods_id: categories for goods_id, categories in duplicates},
+        'missing_hashname': len(missing)
+    }
+
+
+def _scan_file(file_path, check_hashname=False):
+    """解析单个JSON文件，返回该文件的统计与ID计数（在子进程中执行）"""
+    filename = os.path.basename(file_path)
+    try:
+        data = JsonIO.load(file_path)
+
+        # 提取所有可能的ID字段（兼容混合结构）
+        if 'data' in data:  # 提取第一种结构
+            items = data['data']
+        elif 'items' in data:  # 提取第二种结构
+            items = data['items']
+        else:
+            raise ValueError("未找到data/items字段")
+
+        counter = Counter()
+        missing = []
+        for item in items:
+            # 检测缺失hashname的情况
+            if check_hashname and 'hashname' not in item:
+                item_id = str(item.get('goods_id') or item.get('id', '未知ID')).strip()
+                shortname = item.get('shortname', '未知名称').strip()
+                missing.append(f"{item_id} | {shortname}")
+
+            for id_key in ['id', 'goods_id']:
+                if id_key in item:
+                    counter[str(item[id_key]).strip()] += 1
+
+        total = sum(counter.values())
+        return {
+            'filename': filename,
+            'total': total,
+            'unique': len(counter),
+            'duplicates': total - len(counter),
+            'duplicate_details': {k: v for k, v in counter.items() if v > 1},
+            'counter': counter,
+            'missing_hashname': missing
+        }
+    except Exception as e:
+        return {'filename': filename, 'error': str(e)}
+
+
+@profiled('analyze_ids')
+def analyze_folder(folder_path, check_hashname=False, workers=None, verbose=False):
+    """多进程分析文件夹内所有JSON文件，返回结构化报告
+
+    各文件在子进程中计数，主进程只合并计数器，内存占用与唯一ID数量成正比。
+    """
+    if not os.path.isdir(folder_path):
+        raise NotADirectoryError(f"路径不存在或不是文件夹: {folder_path}")
+
+    paths = [os.path.join(folder_path, f) for f in sorted(os.listdir(folder_path)) if f.endswith('.json')]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+
+    total_counter = Counter()
+    file_stats_list = []
+    errors = []
+    missing_hashname = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for stats in pool.map(_scan_file, paths, [check_hashname] * len(paths), chunksize=4):
+            if 'error' in stats:
+                errors.append(stats)
+                if verbose:
+                    print(f"\n处理文件 {stats['filename']} 时出错：{stats['error']}")
+                continue
+
+            total_counter.update(stats.pop('counter'))
+            missing_hashname.extend(stats.pop('missing_hashname'))
+            file_stats_list.append(stats)
+            if verbose:
+                _print_file_stats(stats)
+
+    total_ids = sum(total_counter.values())
+    report = {
+        'folder': os.path.abspath(folder_path),
+        'files': file_stats_list,
+        'errors': errors,
+        'global': {
+            'files': len(file_stats_list),
+            'total_ids': total_ids,
+            'unique_ids': len(total_counter),
+            'repeat_total': total_ids - len(total_counter),
+            'duplicated_ids': sum(1 for count in total_counter.values() if count > 1)
+        },
+        'cross_file_duplicates': {k: v for k, v in total_counter.items() if v > 1}
+    }
+    if check_hashname:
+        report['missing_hashname'] = missing_hashname
+    return report
+
+
+def _print_file_stats(file_stats):
+    print(f"\n文件：{file_stats['filename']}")
+    print(f"总ID数量：{file_stats['total']}")
+    print(f"唯一ID数量：{file_stats['unique']}")
+    print(f"重复数量：{file_stats['duplicates']}")
+
+    if file_stats['duplicates'] > 0:
+        print("重复明细：")
+        for id, count in file_stats['duplicate_details'].items():
+            print(f"  ID {id} 重复 {count} 次")
+
+
+def _print_global(report):
+    stats = report['global']
+    print("\n" + "=" * 50)
+    print("全局统计：")
+    print(f"处理文件总数：{stats['files']}")
+    print(f"总ID数量：{stats['total_ids']}")
+    print(f"全局唯一ID数量：{stats['unique_ids']}")
+    print(f"总重复次数（包含跨文件）：{stats['repeat_total']}")
+    print(f"存在重复的ID数量（跨文件）：{stats['duplicated_ids']}")
+
+
+def _save_missing_hashname(missing_hashname):
+    """保存缺失hashname的记录"""
+    if missing_hashname:
+        output_file = "ShouldFindHashname.txt"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(missing_hashname))
+        print(f"\n发现 {len(missing_hashname)} 条缺失hashname的记录，已保存到 {output_file}")
+    else:
+        print("\n所有条目均包含hashname字段")
+
 
 def analyze_ids():
     # 获取用户输入路径
-    folder_path = input("请输入JSON文件夹路径：").strip()
+    folder_path = input("请输入JSON文件夹路径（直接回车查询目录库）：").strip()
+
+    if not folder_path:
+        analyze_catalog()
+        return
 
     # 验证路径有效性
     if not os.path.isdir(folder_path):
@@ -14,111 +182,53 @@ def analyze_ids():
     # 询问是否启用缺失hashname检测
     enable_check = input("是否检测缺失hashname的条目？(Y/N): ").strip().upper() == 'Y'
 
-    # 初始化统计数据
-    total_counter = defaultdict(int)
-    file_stats_list = []
-    global_ids = []
-    missing_hashname = []  # 存储缺失hashname的记录
-
-    # 处理每个JSON文件
-    for filename in os.listdir(folder_path):
-        if not filename.endswith('.json'):
-            continue
-
-        file_path = os.path.join(folder_path, filename)
-        file_ids = []
-
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-                # 提取所有可能的ID字段（兼容混合结构）
-                items = []
-                if 'data' in data:  # 提取第一种结构
-                    items = data['data']
-                elif 'items' in data:  # 提取第二种结构
-                    items = data['items']
-                else:
-                    raise ValueError("未找到data/items字段")
-
-                # 遍历所有条目
-                for item in items:
-                    # 检测缺失hashname的情况
-                    if enable_check and 'hashname' not in item:
-                        # 获取ID（优先goods_id，其次id）
-                        item_id = str(item.get('goods_id') or item.get('id', '未知ID')).strip()
-                        # 获取shortname
-                        shortname = item.get('shortname', '未知名称').strip()
-                        # 记录缺失条目
-                        missing_hashname.append(f"{item_id} | {shortname}")
-
-                    # 处理ID统计逻辑
-                    for id_key in ['id', 'goods_id']:
-                        if id_key in item:
-                            # 统一转换为字符串并去除空格
-                            raw_value = item[id_key]
-                            item_id = str(raw_value).strip()
-
-                            # 记录ID
-                            file_ids.append(item_id)
-                            global_ids.append(item_id)
-                            total_counter[item_id] += 1
-
-                # 统计当前文件
-                unique_ids = set(file_ids)
-                duplicates = len(file_ids) - len(unique_ids)
-
-                file_stats = {
-                    'filename': filename,
-                    'total': len(file_ids),
-                    'unique': len(unique_ids),
-                    'duplicates': duplicates,
-                    'duplicate_details': defaultdict(int)
-                }
-
-                # 记录文件内重复情况
-                counter = defaultdict(int)
-                for item_id in file_ids:
-                    counter[item_id] += 1
-                for k, v in counter.items():
-                    if v > 1:
-                        file_stats['duplicate_details'][k] = v
-
-                file_stats_list.append(file_stats)
-
-                # 打印当前文件结果
-                print(f"\n文件：{filename}")
-                print(f"总ID数量：{file_stats['total']}")
-                print(f"唯一ID数量：{file_stats['unique']}")
-                print(f"重复数量：{file_stats['duplicates']}")
-
-                if file_stats['duplicates'] > 0:
-                    print("重复明细：")
-                    for id, count in file_stats['duplicate_details'].items():
-                        print(f"  ID {id} 重复 {count} 次")
-
-        except Exception as e:
-            print(f"\n处理文件 {filename} 时出错：{str(e)}")
-            continue
-
-    # 保存缺失hashname的记录（如果启用）
+    report = analyze_folder(folder_path, check_hashname=enable_check, verbose=True)
     if enable_check:
-        if missing_hashname:
-            output_file = "ShouldFindHashname.txt"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write("\n".join(missing_hashname))
-            print(f"\n发现 {len(missing_hashname)} 条缺失hashname的记录，已保存到 {output_file}")
-        else:
-            print("\n所有条目均包含hashname字段")
+        _save_missing_hashname(report['missing_hashname'])
+    _print_global(report)
+    return report
+
+
+def main():
+    if len(sys.argv) == 1:
+        analyze_ids()
+        return 0
+
+    parser = argparse.ArgumentParser(description="统计JSON文件夹中的重复ID")
+    parser.add_argument('folder', nargs='?', help="JSON文件夹路径")
+    parser.add_argument('--catalog', action='store_true', help="直接查询目录库")
+    parser.add_argument('--check-hashname', action='store_true', help="检测缺失hashname的条目")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="并行进程数")
+    parser.add_argument('--report', help="JSON报告输出路径，'-' 表示标准输出")
+    parser.add_argument('-q', '--quiet', action='store_true', help="不打印逐文件结果")
+    args = parser.parse_args()
+
+    if args.catalog:
+        analyze_catalog()
+        return 0
+    if not args.folder:
+        parser.error("需要指定文件夹或 --catalog")
+
+    try:
+        report = analyze_folder(args.folder, args.check_hashname, args.workers,
+                                verbose=not args.quiet and args.report != '-')
+    except NotADirectoryError as e:
+        print(f"错误：{str(e)}", file=sys.stderr)
+        return 2
+
+    if args.report == '-':
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        if args.check_hashname:
+            _save_missing_hashname(report['missing_hashname'])
+        _print_global(report)
+        if args.report:
+            JsonIO.dump(report, args.report, pretty=True)
+            print(f"报告已保存到 {args.report}")
+    return 1 if report['errors'] else 0
 
-    # 打印全局统计
-    print("\n" + "=" * 50)
-    print("全局统计：")
-    print(f"处理文件总数：{len(file_stats_list)}")
-    print(f"总ID数量：{len(global_ids)}")
-    print(f"全局唯一ID数量：{len(set(global_ids))}")
-    print(f"总重复次数（包含跨文件）：{len(global_ids) - len(set(global_ids))}")
-    print(f"存在重复的ID数量（跨文件）：{sum(1 for count in total_counter.values() if count > 1)}")
 
 if __name__ == "__main__":
-    analyze_ids()
\ No newline at end of file
+    enable_from_argv()
+    sys.exit(main())
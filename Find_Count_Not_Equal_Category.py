@@ -1,4 +1,5 @@
 import json
+from PipelineStatus import record_stage
 
 
 def load_json_data(file_path):
@@ -48,6 +49,7 @@ def compare_category_counts():
         print(f"发现 {len(diff_categories)} 个差异分类，已写入 {output_path}")
     else:
         print("没有发现差异分类")
+    record_stage('diff', items=len(diff_categories))
 
     return diff_categories
 
@@ -4,8 +4,12 @@ import math
 import sys
 import re
 import time
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from PipelineStatus import record_stage
+from Account_Freeze_Judgment import AUTH_ACCOUNT
+from Telemetry import get_telemetry
+from Snapshots import snapshot_collection
+import JsonIO
+from Profiling import profiled, enable_from_argv
 
 OUTPUT_DIR = 'BuffDataByExtractHTML'
 
@@ -23,6 +27,10 @@ class BuffHTMLCollector:
         }
         self.delay = 3
         self.headless = False
+        self.request_count = 0
+        self.collected_total = 0
+        self.telemetry = get_telemetry()
+        self.current_category = ''
         os.makedirs(self.OUTPUT_DIR, exist_ok=True)
         self.load_state()
 
@@ -275,8 +283,12 @@ class BuffHTMLCollector:
         if os.path.exists(self.state_file):
             os.remove(self.state_file)
             print("已清除任务状态")
+    @profiled('html_collect')
     def start_collection(self):
         """增强的采集流程"""
+        from playwright.sync_api import sync_playwright  # 浏览器依赖只在实际采集时加载
+
+        started = time.perf_counter()
         try:
             with sync_playwright() as p:
                 browser = p.chromium.launch(
@@ -288,6 +300,7 @@ class BuffHTMLCollector:
                     storage_state="auth.json" if os.path.exists("auth.json") else None
                 )
                 page = context.new_page()
+                page.on('response', self._record_api_response)
 
                 if not self.login_check(page):
                     print("登录失败，终止采集")
@@ -308,6 +321,9 @@ class BuffHTMLCollector:
                         print(f"跳过分类 {category}")
 
                 print("\n所有任务完成！")
+                record_stage('html_collect', items=self.collected_total,
+                             duration=time.perf_counter() - started, categories=total)
+                snapshot_collection('html_collect')
                 self.clear_state()
 
         except KeyboardInterrupt:
@@ -319,11 +335,29 @@ class BuffHTMLCollector:
             print(f"发生错误: {str(e)}")
             self.save_state()
 
+    def _record_api_response(self, response):
+        """页面内发起的商品接口请求（XHR）：状态码、响应字节与首字节延迟"""
+        if '/api/market/goods' not in response.url:
+            return
+        try:
+            ttfb = response.request.timing.get('responseStart', -1)
+            size = int(response.headers.get('content-length') or 0)
+        except Exception:
+            ttfb, size = -1, 0
+        self.telemetry.observe('BuffHTMLCollector', AUTH_ACCOUNT, self.current_category, 'goods_xhr',
+                               ttfb / 1000 if ttfb >= 0 else None, response.status, size)
+
+    def _goto(self, page, url, endpoint, **kwargs):
+        """带计时的页面跳转（同文档的hash跳转没有响应对象，状态记为 same_document）"""
+        with self.telemetry.request('BuffHTMLCollector', AUTH_ACCOUNT, self.current_category, endpoint) as call:
+            response = page.goto(url, **kwargs)
+            call['code'] = response.status if response else 'same_document'
+        return response
+
     def save_state(self):
         """保存当前进度到状态文件"""
         try:
-            with open(self.state_file, 'w', encoding='utf-8') as f:
-                json.dump(self.current_task, f, indent=2)
+            JsonIO.dump(self.current_task, self.state_file, pretty=True, fsync=False)
         except Exception as e:
             print(f"\n状态保存失败: {str(e)}")
 
@@ -333,8 +367,10 @@ class BuffHTMLCollector:
         retry_count = 0
 
         while retry_count < max_retries:
+            if retry_count:
+                self.telemetry.retry('BuffHTMLCollector', AUTH_ACCOUNT, '', 'login')
             # 访问市场页面检测登录状态
-            page.goto("https://buff.163.com/market/csgo", timeout=60000)
+            self._goto(page, "https://buff.163.com/market/csgo", 'market', timeout=60000)
 
             # 检测登录按钮是否存在
             login_selector = "a[onclick='loginModule.showLogin()']"
@@ -352,14 +388,14 @@ class BuffHTMLCollector:
 
             # 需要登录流程
             print("需要登录...")
-            page.goto("https://buff.163.com/account/login", timeout=30000)
+            self._goto(page, "https://buff.163.com/account/login", 'login', timeout=30000)
             input("请手动完成登录后按 Enter 继续...")
 
             # 保存登录状态
             page.context.storage_state(path="auth.json")
 
             # 二次登录验证
-            page.goto("https://buff.163.com/market/csgo")
+            self._goto(page, "https://buff.163.com/market/csgo", 'market')
             if page.locator(login_selector).count() > 0:
                 print("登录验证失败")
                 retry_count += 1
@@ -382,7 +418,10 @@ class BuffHTMLCollector:
 
         try:
             # 使用当前页面上下文发送API请求
-            response = page.context.request.get(api_url)
+            with self.telemetry.request('BuffHTMLCollector', AUTH_ACCOUNT, '', 'goods_probe') as call:
+                response = page.context.request.get(api_url)
+                call['code'] = response.status
+                call['bytes'] = int(response.headers.get('content-length') or 0)
             if not response.ok:
                 print(f"状态检测请求失败，状态码：{response.status}")
                 return False
@@ -411,7 +450,7 @@ class BuffHTMLCollector:
     def force_logout(self, page):
         """强制登出并清理凭证"""
         print("执行强制登出...")
-        page.goto("https://buff.163.com/account/logout")
+        self._goto(page, "https://buff.163.com/account/logout", 'logout')
 
         # 清理登录凭证
         if os.path.exists("auth.json"):
@@ -429,27 +468,32 @@ class BuffHTMLCollector:
             return False
 
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                total = data['meta']['total_count']
-                pages = math.ceil(total / 20)
+            total = JsonIO.load(json_path)['meta']['total_count']
+            pages = math.ceil(total / 20)
         except Exception as e:
             print(f"文件读取失败: {str(e)}")
             return False
 
         print(f"总页数: {pages}")
         category_items = []
+        self.current_category = category
 
         for page_num in range(1, pages + 1):
             print(f"正在处理第 {page_num}/{pages} 页", end='\r')
             try:
                 url = f"https://buff.163.com/market/csgo#game=csgo&page_num={page_num}&category={category}"
-                page.goto(url, timeout=30000)
-                self.wait_for_loading(page)
+                self.request_count += 1
+                # 只计时跳转与等待商品卡片出现，滚动触发懒加载的固定休眠不计入请求延迟
+                with self.telemetry.request('BuffHTMLCollector', AUTH_ACCOUNT, category, 'market_page') as call:
+                    response = page.goto(url, timeout=30000)
+                    loaded = self.wait_for_loading(page)
+                    call['code'] = response.status if response else ('loaded' if loaded else 'load_timeout')
+                if loaded:
+                    self.scroll_to_bottom(page)
                 html = page.content()
                 items = self.parse_html(html)
                 category_items.extend(items)
-                time.sleep(self.delay)
+                self.telemetry.wait(self.delay, 'BuffHTMLCollector', AUTH_ACCOUNT, category)
             except Exception as e:
                 print(f"\n页面 {page_num} 处理失败: {str(e)}")
                 continue
@@ -457,9 +501,17 @@ class BuffHTMLCollector:
         return self.save_category_data(category, category_items, pages)
 
     def wait_for_loading(self, page):
-        """等待页面加载完成"""
+        """等待页面加载完成（商品卡片出现）"""
         try:
             page.wait_for_selector('ul.card_csgo li', state='attached', timeout=20000)
+            return True
+        except Exception as e:
+            print(f"⚠加载异常: {str(e)}")
+            return False
+
+    def scroll_to_bottom(self, page):
+        """滚动到底部，等待懒加载的商品渲染"""
+        try:
             for _ in range(2):
                 page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
                 time.sleep(1)
@@ -470,15 +522,15 @@ class BuffHTMLCollector:
         """保存分类数据"""
         output_path = os.path.join(OUTPUT_DIR, f'{category}.json')
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "meta": {
-                        "category": category,
-                        "total_pages": total_pages,
-                        "total_items": len(items)
-                    },
-                    "data": items
-                }, f, ensure_ascii=False, indent=2)
+            JsonIO.dump({
+                "meta": {
+                    "category": category,
+                    "total_pages": total_pages,
+                    "total_items": len(items)
+                },
+                "data": items
+            }, output_path)
+            self.collected_total += len(items)
             print(f"\n成功保存 {len(items)} 条数据到 {output_path}")
             return True
         except Exception as e:
@@ -486,8 +538,10 @@ class BuffHTMLCollector:
             return False
 
     @staticmethod
+    @profiled('parse_html')
     def parse_html(html):
         """解析商品数据"""
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html, 'html.parser')
         items = []
 
@@ -532,4 +586,5 @@ def main():
                 input("\n按 Enter 键退出...")
 
 if __name__ == "__main__":
+    enable_from_argv()
     main()
\ No newline at end of file
@@ -1,6 +1,15 @@
-import json
+import sys
+import heapq
+import argparse
+import contextlib
 from pathlib import Path
+from time import perf_counter
 from datetime import datetime
+from GoodsCatalog import GoodsCatalog, CATALOG_PATH, parse_goods_id
+from CatalogExport import FORMATS, open_writer, export_path
+from PipelineStatus import record_stage
+import JsonIO
+from Profiling import profiled, enable_from_argv
 
 # 颜色配置
 COLORS = {
@@ -11,70 +20,168 @@ COLORS = {
 }
 
 
-def process_final_extract():
-    """精确处理数据并生成指定格式"""
+def _sort_items(category, items):
+    """FinalExtract条目 -> 按ID升序的 (goods_id, shortname, hashname) 列表，跳过非数字ID"""
+    run = []
+    for item in items:
+        goods_id = parse_goods_id(item.get('goods_id'))
+        if goods_id is None:
+            print(f"{category}: 跳过无效商品ID {item.get('goods_id')!r}")
+            continue
+        run.append((goods_id, item.get('shortname', ''), item.get('hashname') or ''))
+    return sorted(run)
+
+
+@contextlib.contextmanager
+def _open_runs(extract_path):
+    """产出 (runs, total_items)
+
+    runs 为 分类 -> (条目数, 按ID升序的 (goods_id, shortname, hashname) 序列)：
+    目录库中的分类按 ORDER BY goods_id 流式读取，不在内存中排序；
+    未导入目录库的FinalExtract分类（如手动放入的文件）读入内存排序。
+    total_items 为去重后的商品数，由目录库计数得到，不需要为计数额外归并一遍。
+    """
+    catalog = GoodsCatalog() if Path(CATALOG_PATH).exists() else None
+    if catalog is None and not extract_path.exists():
+        raise FileNotFoundError("FinalExtract目录不存在")
+    try:
+        runs = {}
+        if catalog is not None:
+            for category, count in catalog.category_counts().items():
+                runs[category] = (count, catalog.iter_sorted(category))
+
+        extra = {}
+        for json_file in sorted(extract_path.glob("*.json")) if extract_path.exists() else ():
+            if json_file.stem in runs:
+                continue
+            data = JsonIO.load(json_file)
+            category = data['meta']['category']
+            extra[category] = _sort_items(category, data['data'])
+
+        extra_ids = {goods_id for run in extra.values() for goods_id, _, _ in run}
+        total_items = len(extra_ids)
+        if catalog is not None:
+            total_items += catalog.distinct_goods_count() - len(catalog.known_goods(extra_ids))
+        runs.update((category, (len(run), run)) for category, run in extra.items())
+        yield runs, total_items
+    finally:
+        if catalog is not None:
+            catalog.close()
+
+
+def _merge_runs(runs):
+    """k路归并各分类的有序序列，去重并汇总分类归属
+
+    产出 (goods_id, shortname, [分类...], hashname)，按ID升序
+    """
+    def tag(category, run):
+        for goods_id, shortname, hashname in run:
+            yield goods_id, category, shortname, hashname
+
+    streams = [tag(category, run) for category, (_, run) in sorted(runs.items())]
+    current = None
+    for goods_id, category, shortname, hashname in heapq.merge(*streams):
+        if current is not None and current[0] == goods_id:
+            if current[2][-1] != category:
+                current[2].append(category)
+            if hashname and not current[3]:
+                current = current[:3] + (hashname,)
+            continue
+        if current is not None:
+            yield current
+        current = (goods_id, shortname, [category], hashname)
+    if current is not None:
+        yield current
+
+
+def _print_item(goods_id, shortname, categories):
+    print(
+        f"{COLORS['id']}{goods_id}{COLORS['reset']} | "
+        f"{COLORS['name']}{shortname}{COLORS['reset']} | "
+        f"{COLORS['category']}{', '.join(categories)}{COLORS['reset']}"
+    )
+    print("-" * 80)
+
+
+@profiled('ids')
+def process_final_extract(output_path="id.json", verbose=False, progress_step=10, formats=("json", "bin")):
+    """k路归并生成去重的ID列表，直接流式写入磁盘
+
+    verbose=True 时逐条输出（旧行为）；否则只按 progress_step 百分比输出进度与汇总。
+    formats 可同时选择多种导出格式（见 CatalogExport.FORMATS），单次归并同时写入；
+    默认额外生成可mmap直接打开的二进制目录 id.bin（见 BinaryCatalog）。
+    """
+    started = perf_counter()
     print("\n\033[1m开始处理FinalExtract数据...\033[0m")
     print("=" * 40)
 
-    # 初始化数据结构
-    result = {
-        "meta": {
-            "generated_at": datetime.now().isoformat(),
-            "total_items": 0,
-            "total_categories": 0,
-            "categories": {}
-        },
-        "data": []
-    }
-
     try:
-        extract_path = Path("FinalExtract")
-        if not extract_path.exists():
-            raise FileNotFoundError("FinalExtract目录不存在")
+        with _open_runs(Path("FinalExtract")) as (runs, total_items):
+            categories = {category: count for category, (count, _) in sorted(runs.items())}
+            memberships = sum(categories.values())
 
-        # 遍历所有JSON文件
-        for json_file in extract_path.glob("*.json"):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # 去重数量已预先统计，meta写在data之前
+            meta = {
+                "generated_at": datetime.now().isoformat(),
+                "total_items": total_items,
+                "total_memberships": memberships,
+                "total_categories": len(categories),
+                "categories": categories
+            }
 
-            # 提取关键数据
-            category = data['meta']['category']
-            items = data['data']
-
-            # 更新统计
-            result['meta']['categories'][category] = len(items)
-            result['meta']['total_items'] += len(items)
-            result['meta']['total_categories'] = len(result['meta']['categories'])
-
-            # 构建data条目并输出到控制台
-            for item in items:
-                entry = {
-                    "goods_id": item['goods_id'],
-                    "shortname": item['shortname']
-                }
-                result['data'].append(entry)
-
-                # 带颜色控制台输出
-                print(
-                    f"{COLORS['id']}{item['goods_id']}{COLORS['reset']} | "
-                    f"{COLORS['name']}{item['shortname']}{COLORS['reset']} | "
-                    f"{COLORS['category']}{category}{COLORS['reset']}"
-                )
-                print("-" * 80)
-
-        # 保存文件
-        with open("id.json", 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
-
-        print("\n\033[1m处理完成！生成文件：id.json\033[0m")
-        print(f"总分类数：{result['meta']['total_categories']}")
-        print(f"总物品数：{result['meta']['total_items']}")
+            writers = []
+            written = 0
+            try:
+                for file_format in formats:
+                    writers.append(open_writer(file_format, export_path(output_path, file_format), meta))
+
+                next_report = progress_step
+                for written, (goods_id, shortname, cats, hashname) in enumerate(_merge_runs(runs), 1):
+                    for writer in writers:
+                        writer.write(goods_id, shortname, cats, hashname=hashname or None)
+
+                    if verbose:
+                        _print_item(goods_id, shortname, cats)
+                    elif progress_step and written * 100 >= next_report * total_items:
+                        print(f"进度：{written}/{total_items}（{written * 100 // total_items}%）")
+                        next_report += progress_step
+                if written != total_items:
+                    raise ValueError(f"归并结果 {written} 条与目录库计数 {total_items} 条不一致")
+                # 全部格式都写完临时文件后才替换目标，任一格式失败时所有导出文件保持原样
+                for writer in writers:
+                    writer.finish()
+                for writer in writers:
+                    writer.publish()
+            except BaseException:
+                # 中途失败时丢弃尚未替换的临时文件，已有的导出文件保持原样
+                for writer in writers:
+                    writer.abort()
+                raise
+
+        generated = ', '.join(export_path(output_path, fmt) for fmt in formats)
+        print(f"\n\033[1m处理完成！生成文件：{generated}\033[0m")
+        print(f"总分类数：{len(categories)}")
+        print(f"总物品数：{total_items}（分类归属 {memberships} 条，跨分类重复 {memberships - total_items} 条）")
+        record_stage('ids', items=total_items, duration=perf_counter() - started, formats=list(formats))
         return True
 
     except Exception as e:
         print(f"\n\033[91m处理失败：{str(e)}\033[0m")
+        record_stage('ids', ok=False, duration=perf_counter() - started, error=str(e))
         return False
 
 
+def main():
+    parser = argparse.ArgumentParser(description="从FinalExtract生成去重的商品ID列表")
+    parser.add_argument('-o', '--output', default="id.json", help="输出文件路径")
+    parser.add_argument('-v', '--verbose', action='store_true', help="逐条输出商品信息")
+    parser.add_argument('-f', '--format', action='append', choices=list(FORMATS), dest='formats',
+                        help="导出格式，可重复指定（默认 json + bin）")
+    args = parser.parse_args()
+    formats = tuple(dict.fromkeys(args.formats or ['json', 'bin']))
+    return 0 if process_final_extract(args.output, verbose=args.verbose, formats=formats) else 1
+
+
 if __name__ == "__main__":
-    process_final_extract()
\ No newline at end of file
+    enable_from_argv()
+    sys.exit(main())
@@ -0,0 +1,298 @@
+import os
+import sqlite3
+from datetime import datetime
+import JsonIO
+
+CATALOG_DIR = 'Catalog'
+CATALOG_PATH = os.path.join(CATALOG_DIR, 'goods_catalog.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS goods (
+    goods_id   INTEGER PRIMARY KEY,
+    hashname   TEXT,
+    shortname  TEXT,
+    source     TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS category_goods (
+    category   TEXT NOT NULL,
+    goods_id   INTEGER NOT NULL,
+    source     TEXT,
+    created_at TEXT,
+    UNIQUE (category, goods_id)
+);
+CREATE INDEX IF NOT EXISTS idx_category_goods_goods ON category_goods (goods_id);
+CREATE TABLE IF NOT EXISTS goods_sources (
+    goods_id INTEGER NOT NULL,
+    source   TEXT NOT NULL,
+    category TEXT NOT NULL,
+    seen_at  TEXT,
+    PRIMARY KEY (goods_id, source, category)
+) WITHOUT ROWID;
+"""
+
+
+def parse_goods_id(value):
+    """商品ID转为整数；旧版合并可能写入 'None' 等非数字ID，返回None由调用方跳过"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class GoodsCatalog:
+    """商品目录库（SQLite/WAL），FinalExtract的规范存储
+
+    新建目录库时一次性导入 import_dir 中已有的FinalExtract分类，之后以目录库为准。
+    """
+
+    def __init__(self, db_path=CATALOG_PATH, import_dir='FinalExtract'):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        created = not os.path.exists(db_path)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if created and import_dir and os.path.isdir(import_dir):
+            imported = self.import_final_extract(import_dir)
+            if imported:
+                print(f"目录库新建，已导入 {imported} 个FinalExtract分类")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # 写入 ------------------------------------
+
+    def upsert_category(self, category, items):
+        """写入单个分类的全部条目（items为 goods_id -> 条目 的字典）"""
+        now = datetime.now().isoformat()
+        goods_rows = []
+        member_rows = []
+        source_rows = []
+        skipped = 0
+        for item in items.values():
+            goods_id = parse_goods_id(item.get('goods_id'))
+            if goods_id is None:
+                skipped += 1
+                continue
+            source = item.get('source')
+            created_at = item.get('created_at') or now
+            goods_rows.append((goods_id, item.get('hashname'), item.get('shortname'), source, created_at, now))
+            member_rows.append((category, goods_id, source, created_at))
+            source_rows.append((goods_id, source, category, now))
+        if skipped:
+            print(f"{category}: 跳过 {skipped} 个无效商品ID")
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO goods (goods_id, hashname, shortname, source, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(goods_id) DO UPDATE SET
+                    hashname = COALESCE(excluded.hashname, goods.hashname),
+                    shortname = COALESCE(excluded.shortname, goods.shortname),
+                    updated_at = excluded.updated_at
+            """, goods_rows)
+            self.conn.executemany("""
+                INSERT INTO category_goods (category, goods_id, source, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(category, goods_id) DO NOTHING
+            """, member_rows)
+            self.conn.executemany("""
+                INSERT INTO goods_sources (goods_id, source, category, seen_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(goods_id, source, category) DO UPDATE SET seen_at = excluded.seen_at
+            """, source_rows)
+
+    def set_hashnames(self, mapping):
+        """补写hashname，返回受影响的分类"""
+        now = datetime.now().isoformat()
+        rows = [(hashname, now, parse_goods_id(goods_id)) for goods_id, hashname in mapping.items()
+                if hashname and parse_goods_id(goods_id) is not None]
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE goods SET hashname = ?, updated_at = ? WHERE goods_id = ? AND hashname IS NULL", rows
+            )
+        return self.categories_of(r[2] for r in rows)
+
+    # 查询 ------------------------------------
+
+    def has_category(self, category):
+        row = self.conn.execute(
+            "SELECT 1 FROM category_goods WHERE category = ? LIMIT 1", (category,)
+        ).fetchone()
+        return row is not None
+
+    def categories_of(self, goods_ids):
+        """包含任一指定商品的分类"""
+        goods_ids = [g for g in (parse_goods_id(g) for g in goods_ids) if g is not None]
+        categories = set()
+        for start in range(0, len(goods_ids), 500):
+            chunk = goods_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            categories.update(r[0] for r in self.conn.execute(
+                f"SELECT DISTINCT category FROM category_goods WHERE goods_id IN ({placeholders})", chunk
+            ))
+        return sorted(categories)
+
+    def categories(self):
+        return [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT category FROM category_goods ORDER BY category"
+        )]
+
+    def load_category(self, category):
+        """按FinalExtract条目格式加载分类（goods_id -> 条目）"""
+        rows = self.conn.execute("""
+            SELECT c.goods_id, g.hashname, g.shortname, c.source, c.created_at
+            FROM category_goods c JOIN goods g ON g.goods_id = c.goods_id
+            WHERE c.category = ?
+            ORDER BY c.rowid
+        """, (category,))
+        return {str(r['goods_id']): self._row_to_item(r) for r in rows}
+
+    def category_counts(self):
+        """各分类商品数量"""
+        return {r[0]: r[1] for r in self.conn.execute(
+            "SELECT category, COUNT(*) FROM category_goods GROUP BY category ORDER BY category"
+        )}
+
+    def iter_sorted(self, category):
+        """按ID升序流式产出分类的 (goods_id, shortname, hashname)，用于k路归并"""
+        cursor = self.conn.execute("""
+            SELECT c.goods_id, g.shortname, g.hashname
+            FROM category_goods c JOIN goods g ON g.goods_id = c.goods_id
+            WHERE c.category = ?
+            ORDER BY c.goods_id
+        """, (category,))
+        for goods_id, shortname, hashname in cursor:
+            yield goods_id, shortname or '', hashname or ''
+
+    def distinct_goods_count(self):
+        """有分类归属的去重商品数"""
+        return self.conn.execute("SELECT COUNT(DISTINCT goods_id) FROM category_goods").fetchone()[0]
+
+    def known_goods(self, goods_ids):
+        """goods_ids 中已有分类归属的商品ID（整数集合）"""
+        goods_ids = list(goods_ids)
+        known = set()
+        for start in range(0, len(goods_ids), 500):
+            chunk = goods_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            known.update(r[0] for r in self.conn.execute(
+                f"SELECT DISTINCT goods_id FROM category_goods WHERE goods_id IN ({placeholders})", chunk
+            ))
+        return known
+
+    def goods_ids(self, category=None):
+        """有序商品ID列表（指定分类或全部）"""
+        if category is None:
+            cursor = self.conn.execute("SELECT goods_id FROM goods ORDER BY goods_id")
+        else:
+            cursor = self.conn.execute(
+                "SELECT goods_id FROM category_goods WHERE category = ? ORDER BY goods_id", (category,)
+            )
+        return [str(r[0]) for r in cursor]
+
+    def duplicate_ids(self):
+        """出现在多个分类中的商品 [(goods_id, [分类...]), ...]"""
+        rows = self.conn.execute("""
+            SELECT goods_id, GROUP_CONCAT(category, char(31))
+            FROM category_goods
+            GROUP BY goods_id
+            HAVING COUNT(*) > 1
+            ORDER BY goods_id
+        """)
+        return [(str(r[0]), sorted(r[1].split('\x1f'))) for r in rows]
+
+    def iter_goods_with_categories(self):
+        """流式产出全部商品及其所属分类（无分类归属的商品 categories 为空列表）"""
+        cursor = self.conn.execute("""
+            SELECT g.goods_id, g.hashname, g.shortname, GROUP_CONCAT(c.category, char(31))
+            FROM goods g LEFT JOIN category_goods c ON c.goods_id = g.goods_id
+            GROUP BY g.goods_id
+            ORDER BY g.goods_id
+        """)
+        for goods_id, hashname, shortname, categories in cursor:
+            yield {
+                'goods_id': str(goods_id),
+                'hashname': hashname,
+                'shortname': shortname,
+                'categories': sorted(categories.split('\x1f')) if categories else []
+            }
+
+    def missing_hashname(self):
+        """缺失hashname的商品"""
+        rows = self.conn.execute(
+            "SELECT goods_id, shortname FROM goods WHERE hashname IS NULL ORDER BY goods_id"
+        )
+        return [(str(r[0]), r[1]) for r in rows]
+
+    # 导出 ------------------------------------
+
+    def export_category(self, category, output_dir='FinalExtract'):
+        """导出单个分类为FinalExtract JSON（兼容旧格式），返回 (文件路径, 导出条目数)"""
+        os.makedirs(output_dir, exist_ok=True)
+        data = list(self.load_category(category).values())
+        output = {
+            "meta": {
+                "category": category,
+                "stats": {
+                    "total_items": len(data),
+                    "buff_items": sum(1 for v in data if v['source'] == 'BuffData'),
+                    "extract_items": sum(1 for v in data if v['source'] == 'ExtractHTML')
+                },
+                "last_updated": datetime.now().isoformat()
+            },
+            "data": data
+        }
+
+        output_path = os.path.join(output_dir, f"{category}.json")
+        JsonIO.dump(output, output_path)
+        return output_path, len(data)
+
+    def export_all(self, output_dir='FinalExtract'):
+        """导出全部分类"""
+        return [self.export_category(c, output_dir)[0] for c in self.categories()]
+
+    def import_final_extract(self, final_dir='FinalExtract'):
+        """将已有FinalExtract JSON导入目录库（仅导入库中不存在的分类），返回导入的分类数"""
+        imported = 0
+        if not os.path.exists(final_dir):
+            return imported
+        for filename in sorted(os.listdir(final_dir)):
+            if not filename.endswith('.json'):
+                continue
+            category = os.path.splitext(filename)[0]
+            if self.has_category(category):
+                continue
+            items = JsonIO.iter_array(os.path.join(final_dir, filename), 'data')
+            self.upsert_category(category, {item['goods_id']: item for item in items})
+            imported += 1
+        return imported
+
+    @staticmethod
+    def _row_to_item(row):
+        item = {'goods_id': str(row['goods_id'])}
+        if row['hashname'] is not None:
+            item['hashname'] = row['hashname']
+        item['shortname'] = row['shortname']
+        item['source'] = row['source']
+        item['created_at'] = row['created_at']
+        return item
+
+
+if __name__ == "__main__":
+    with GoodsCatalog() as catalog:
+        count = catalog.import_final_extract()
+        print(f"已导入 {count} 个分类到 {CATALOG_PATH}")
+        counts = catalog.category_counts()
+        print(f"分类数：{len(counts)}，商品数：{len(catalog.goods_ids())}")
+        print(f"跨分类重复商品：{len(catalog.duplicate_ids())}")
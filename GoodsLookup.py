@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import argparse
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from GoodsCatalog import GoodsCatalog, CATALOG_PATH
+import JsonIO
+
+MAX_LIMIT = 1000
+
+
+def _normalize(text):
+    return ''.join(str(text).lower().split())
+
+
+def _grams(text, n=2):
+    """字符n-gram（中文无需分词），过短的文本退化为单字"""
+    text = _normalize(text)
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class GoodsLookup:
+    """hashname/shortname <-> goods_id 内存查询索引
+
+    - 精确匹配：哈希表
+    - 前缀查询：有序键列表 + 二分查找
+    - 模糊查询：字符二元组倒排索引（适用于中文shortname）
+    """
+
+    def __init__(self, records, max_df=0.05):
+        self.records = {}
+        self.by_hashname = {}
+        self.by_shortname = defaultdict(list)
+        self.postings = defaultdict(list)
+        keys = []
+
+        for record in records:
+            goods_id = str(record['goods_id'])
+            self.records[goods_id] = record
+            hashname, shortname = record.get('hashname'), record.get('shortname')
+            for value in (hashname, shortname):
+                if value:
+                    keys.append((_normalize(value), goods_id))
+            # 每条记录每个gram只记一次，两字段共有的gram不会让召回计数翻倍
+            for gram in _grams(hashname or '') | _grams(shortname or ''):
+                self.postings[gram].append(goods_id)
+            if hashname:
+                self.by_hashname[_normalize(hashname)] = goods_id
+            if shortname:
+                self.by_shortname[_normalize(shortname)].append(goods_id)
+
+        keys.sort()
+        self.prefix_keys = [k for k, _ in keys]
+        self.prefix_ids = [g for _, g in keys]
+        self.max_postings = max(1, int(len(self.records) * max_df))
+
+    # 构建 ------------------------------------
+
+    @classmethod
+    def from_catalog(cls, db_path=CATALOG_PATH):
+        with GoodsCatalog(db_path) as catalog:
+            return cls(catalog.iter_goods_with_categories())
+
+    @classmethod
+    def from_files(cls, id_path='id.json', final_dir='FinalExtract'):
+        """无目录库时从id.json与FinalExtract构建（后者补充hashname）"""
+        hashnames = {}
+        if os.path.isdir(final_dir):
+            for name in os.listdir(final_dir):
+                if name.endswith('.json'):
+                    for item in JsonIO.iter_array(os.path.join(final_dir, name), 'data'):
+                        if item.get('hashname'):
+                            hashnames[str(item['goods_id'])] = item['hashname']
+        data = list(JsonIO.iter_array(id_path, 'data'))
+        for record in data:
+            record['hashname'] = hashnames.get(str(record['goods_id']))
+        return cls(data)
+
+    @classmethod
+    def load(cls):
+        if os.path.exists(CATALOG_PATH):
+            return cls.from_catalog()
+        return cls.from_files()
+
+    # 查询 ------------------------------------
+
+    def get(self, goods_id):
+        return self.records.get(str(goods_id))
+
+    def by_hash(self, hashname):
+        goods_id = self.by_hashname.get(_normalize(hashname))
+        return self.records[goods_id] if goods_id else None
+
+    def by_short(self, shortname):
+        return [self.records[g] for g in self.by_shortname.get(_normalize(shortname), [])]
+
+    def prefix(self, query, limit=20):
+        query = _normalize(query)
+        results = []
+        seen = set()
+        idx = bisect_left(self.prefix_keys, query)
+        while idx < len(self.prefix_keys) and self.prefix_keys[idx].startswith(query) and len(results) < limit:
+            goods_id = self.prefix_ids[idx]
+            if goods_id not in seen:
+                seen.add(goods_id)
+                results.append(self.records[goods_id])
+            idx += 1
+        return results
+
+    def fuzzy(self, query, limit=10):
+        """按二元组Jaccard相似度排序；过于常见的gram不参与召回"""
+        query_grams = _grams(query)
+        if not query_grams:
+            return []
+        usable = [g for g in query_grams if 0 < len(self.postings.get(g, ())) <= self.max_postings]
+        if not usable:
+            usable = sorted((g for g in query_grams if g in self.postings),
+                            key=lambda g: len(self.postings[g]))[:1]
+
+        hits = Counter()
+        for gram in usable:
+            hits.update(self.postings[gram])
+
+        scored = []
+        for goods_id, _ in hits.most_common(limit * 5):
+            record = self.records[goods_id]
+            best = 0.0
+            for field in ('shortname', 'hashname'):
+                if record.get(field):
+                    grams = _grams(record[field])
+                    overlap = len(query_grams & grams)
+                    best = max(best, overlap / len(query_grams | grams))
+            scored.append((best, goods_id))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [dict(self.records[g], score=round(s, 4)) for s, g in scored[:limit]]
+
+
+# --------------------------
+# 本地HTTP查询服务
+# --------------------------
+
+def make_handler(lookup):
+    class LookupHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            query = params.get('q', [''])[0]
+            try:
+                limit = int(params.get('limit', ['20'])[0])
+            except ValueError:
+                limit = 0
+            if not 1 <= limit <= MAX_LIMIT:
+                return self._send(400, {'error': f'limit 须为 1-{MAX_LIMIT} 的整数'})
+            parts = [p for p in url.path.split('/') if p]
+
+            if parts[:1] == ['goods'] and len(parts) == 2:
+                result = lookup.get(parts[1])
+            elif parts == ['hashname']:
+                result = lookup.by_hash(query)
+            elif parts == ['shortname']:
+                result = lookup.by_short(query)
+            elif parts == ['prefix']:
+                result = lookup.prefix(query, limit)
+            elif parts == ['fuzzy']:
+                result = lookup.fuzzy(query, limit)
+            elif parts == ['health']:
+                result = {'status': 'ok', 'goods': len(lookup.records)}
+            else:
+                return self._send(404, {'error': '未知路径'})
+
+            if result is None:
+                return self._send(404, {'error': '未找到'})
+            self._send(200, result)
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return LookupHandler
+
+
+def serve(lookup, host='127.0.0.1', port=8765):
+    server = ThreadingHTTPServer((host, port), make_handler(lookup))
+    print(f"商品查询服务已启动：http://{host}:{port}  （共 {len(lookup.records)} 个商品）")
+    print("接口：/goods/<id>  /hashname?q=  /shortname?q=  /prefix?q=&limit=  /fuzzy?q=&limit=")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n服务已停止")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="商品ID查询索引与本地HTTP服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--query', help="不启动服务，直接执行一次模糊查询")
+    args = parser.parse_args()
+
+    lookup = GoodsLookup.load()
+    if args.query:
+        print(json.dumps(lookup.fuzzy(args.query), ensure_ascii=False, indent=2))
+        return 0
+    serve(lookup, args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
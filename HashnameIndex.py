@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import JsonIO
+
+INDEX_PATH = os.path.join('BuffStats', 'HashnameIndex.json')
+SOURCE_DIR = 'BuffData'
+SUMMARY_FILE = os.path.join('SummaryData', 'summary.json')
+# 逐个查询每次最多补全的商品数（按3秒间隔约2.5分钟），其余留待下次合并
+API_LOOKUP_LIMIT = 50
+
+
+class HashnameIndex:
+    """全局 goods_id -> hashname 索引（跨分类、跨数据源，增量更新）"""
+
+    def __init__(self, index_path=INDEX_PATH, source_dir=SOURCE_DIR, summary_file=SUMMARY_FILE):
+        self.index_path = index_path
+        self.source_dir = source_dir
+        self.summary_file = summary_file
+        self.hashnames = {}
+        self.files = {}
+        self._dirty = False
+        self._load()
+
+    def get(self, goods_id):
+        return self.hashnames.get(str(goods_id))
+
+    def update(self, mapping):
+        """写入外部获取的hashname"""
+        for goods_id, hashname in mapping.items():
+            if hashname:
+                self.hashnames[str(goods_id)] = hashname
+                self._dirty = True
+
+    def refresh(self):
+        """仅重新读取有变化的源文件，返回更新的文件数"""
+        changed = 0
+        for path in self._source_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = [stat.st_mtime_ns, stat.st_size]
+            if self.files.get(path) == signature:
+                continue
+
+            try:
+                items = JsonIO.load(path).get('items', [])
+            except Exception as e:
+                print(f"索引跳过文件 {path}: {str(e)}")
+                continue
+
+            for item in items:
+                hashname = item.get('hashname')
+                if 'id' in item and hashname:
+                    self.hashnames[str(item['id'])] = hashname
+            self.files[path] = signature
+            changed += 1
+
+        if changed:
+            self._dirty = True
+        self.save()
+        return changed
+
+    def save(self):
+        if not self._dirty:
+            return
+        JsonIO.dump({"files": self.files, "hashnames": self.hashnames}, self.index_path, pretty=False)
+        self._dirty = False
+
+    def lookup_missing_per_id(self, goods_ids, request_interval=3, limit=API_LOOKUP_LIMIT):
+        """索引中没有的hashname的限速兜底：逐个商品请求在售列表接口补全
+
+        BUFF没有按商品ID批量查询的接口，因此每个请求间隔 request_interval 秒，
+        每次最多查询 limit 个（None为不限）。
+        """
+        import requests
+
+        pending = [str(g) for g in goods_ids if str(g) not in self.hashnames]
+        if not pending:
+            return {}
+        if limit is not None and len(pending) > limit:
+            print(f"缺失hashname {len(pending)} 个，本次只查询前 {limit} 个，其余下次补全")
+            pending = pending[:limit]
+
+        with open('config.json', 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        session = requests.Session()
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+            "Referer": "https://buff.163.com/market/csgo",
+            "X-Requested-With": "XMLHttpRequest",
+            "Cookie": config['cookie'],
+            "X-CSRFToken": config['csrf_token']
+        }
+
+        found = {}
+        for idx, goods_id in enumerate(pending, 1):
+            if idx > 1:
+                time.sleep(request_interval)
+            try:
+                resp = session.get(
+                    "https://buff.163.com/api/market/goods/sell_order",
+                    params={
+                        'game': 'csgo',
+                        'goods_id': goods_id,
+                        'page_num': 1,
+                        'page_size': 1,
+                        '_': int(time.time() * 1000)
+                    },
+                    headers=headers,
+                    timeout=20
+                )
+                if resp.status_code == 403:
+                    print("认证失效，请更新cookies")
+                    break
+                resp.raise_for_status()
+                info = resp.json().get('data', {}).get('goods_infos', {}).get(goods_id, {})
+                if info.get('market_hash_name'):
+                    found[goods_id] = info['market_hash_name']
+                print(f"[{idx}/{len(pending)}] {goods_id} -> {found.get(goods_id, '未找到')}")
+            except Exception as e:
+                print(f"[{idx}/{len(pending)}] {goods_id} 查询失败: {str(e)}")
+
+        self.update(found)
+        self.save()
+        return found
+
+    def _source_files(self):
+        files = []
+        if os.path.isdir(self.source_dir):
+            files.extend(
+                os.path.join(self.source_dir, f)
+                for f in sorted(os.listdir(self.source_dir))
+                if f.endswith('.json')
+            )
+        if os.path.exists(self.summary_file):
+            files.append(self.summary_file)
+        return files
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            data = JsonIO.load(self.index_path)
+            self.files = data.get('files', {})
+            self.hashnames = data.get('hashnames', {})
+        except Exception as e:
+            print(f"hashname索引加载失败，将重新构建: {str(e)}")
+            self.files = {}
+            self.hashnames = {}
+
+
+if __name__ == "__main__":
+    index = HashnameIndex()
+    changed = index.refresh()
+    print(f"已更新 {changed} 个源文件，索引共 {len(index.hashnames)} 条hashname")
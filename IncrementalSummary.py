@@ -0,0 +1,252 @@
+import os
+from time import perf_counter
+from datetime import datetime
+from collections import Counter, defaultdict
+from PipelineStatus import record_stage
+import JsonIO
+from Profiling import profiled, enable_from_argv
+
+
+class IncrementalSummarizer:
+    """SummaryData增量维护：只撤销/应用有变化的分类文件
+
+    持久化索引记录每个分类文件的签名、total_count与ID列表，
+    据此在内存中还原 ID -> 文件 映射，不必重新解析未变化的BuffData文件。
+    每个ID的样本条目取自文件名排序最靠前的那个文件。
+    没有文件变化时只读取索引，不解析 summary.json。
+    """
+
+    def __init__(self, source_dir='BuffData', output_dir='SummaryData', duplicates_txt='duplicates.txt'):
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.duplicates_txt = duplicates_txt
+        self.index_path = os.path.join(output_dir, 'summary_index.json')
+        self.summary_path = os.path.join(output_dir, 'summary.json')
+        self.report_path = os.path.join(output_dir, 'duplicates.json')
+
+        self.files = {}                       # 文件名 -> {signature, total_count, ids}
+        self.counts = None                    # 索引中记录的 {collected, duplicates}
+        self.items = {}                       # ID -> 样本条目
+        self.id_files = defaultdict(Counter)  # ID -> {文件名: 出现次数}
+        self.dup_ids = set()
+        self.loaded = False                   # items/id_files/dup_ids 是否已还原
+        self._load()
+
+    @property
+    def collected(self):
+        return len(self.items) if self.loaded else self.counts['collected']
+
+    @property
+    def duplicate_count(self):
+        return len(self.dup_ids) if self.loaded else self.counts['duplicates']
+
+    def refresh(self):
+        """同步源目录变化并更新输出文件，返回变化统计"""
+        current = self._scan_sources()
+        if (self.counts is not None and current.keys() == self.files.keys()
+                and all(self.files[name]['signature'] == sig for name, sig in current.items())):
+            return {'changed': 0, 'removed': 0, 'unchanged': len(current)}
+
+        self._load_items()
+        removed = [name for name in self.files if name not in current]
+        changed = [name for name, sig in current.items()
+                   if self.files.get(name, {}).get('signature') != sig]
+
+        reown = set()
+        for name in removed + changed:
+            reown |= self._retract(name)
+
+        for name in changed:
+            self._apply(name, current[name])
+
+        # 被撤销文件原本提供样本的ID，从剩余文件中重新取样
+        self._reown(reown - set(self.items))
+
+        stats = {
+            'changed': len(changed),
+            'removed': len(removed),
+            'unchanged': len(current) - len(changed)
+        }
+        # 旧版索引没有记录数量时也重写一次，之后未变化的刷新即可跳过汇总文件
+        if changed or removed or self.counts is None or not os.path.exists(self.summary_path):
+            self._write_outputs()
+        return stats
+
+    # 增量操作 ------------------------------------
+
+    def _retract(self, name):
+        """撤销文件的旧贡献，返回失去样本来源的ID"""
+        record = self.files.pop(name, None)
+        if not record:
+            return set()
+
+        orphaned = set()
+        for item_id, count in Counter(record['ids']).items():
+            owners = self.id_files[item_id]
+            was_owner = min(owners) == name
+            del owners[name]
+            if not owners:
+                del self.id_files[item_id]
+                self.items.pop(item_id, None)
+            elif was_owner:
+                self.items.pop(item_id, None)
+                orphaned.add(item_id)
+            self._update_dup(item_id)
+        return orphaned
+
+    def _apply(self, name, signature):
+        """应用文件的新内容"""
+        try:
+            data = JsonIO.load(os.path.join(self.source_dir, name))
+        except Exception as e:
+            print(f"跳过文件 {name}，原因: {str(e)}")
+            return
+
+        ids = []
+        for item in data.get('items', []):
+            if 'id' not in item:
+                continue
+            item_id = item['id']
+            owners = self.id_files[item_id]
+            first_in_file = name not in owners
+            owners[name] += 1
+            if first_in_file and min(owners) == name:
+                self.items[item_id] = item
+            ids.append(item_id)
+
+        for item_id in set(ids):
+            self._update_dup(item_id)
+
+        self.files[name] = {
+            'signature': signature,
+            'total_count': data.get('meta', {}).get('total_count', 0),
+            'ids': ids
+        }
+
+    def _reown(self, item_ids):
+        """为孤立ID从当前排序最前的文件中读取样本条目"""
+        by_file = defaultdict(set)
+        for item_id in item_ids:
+            if item_id in self.id_files:
+                by_file[min(self.id_files[item_id])].add(item_id)
+
+        for name, wanted in by_file.items():
+            for item in JsonIO.iter_array(os.path.join(self.source_dir, name), 'items'):
+                item_id = item.get('id')
+                if item_id in wanted and item_id not in self.items:
+                    self.items[item_id] = item
+
+    def _update_dup(self, item_id):
+        if sum(self.id_files.get(item_id, {}).values()) > 1:
+            self.dup_ids.add(item_id)
+        else:
+            self.dup_ids.discard(item_id)
+
+    # 输出 ------------------------------------
+
+    def _write_outputs(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        total_count = sum(r['total_count'] for r in self.files.values())
+        collected = len(self.items)
+
+        result = {
+            "meta": {
+                "generated_time": datetime.now().isoformat(),
+                "total_count": total_count,
+                "collected": collected,
+                "success_rate": f"{(collected / total_count * 100):.2f}%" if total_count else "0.00%",
+                "duplicate_count": len(self.dup_ids)
+            },
+            "items": [self.items[k] for k in sorted(self.items)]
+        }
+
+        duplicate_report = []
+        dup_names = set()
+        for item_id in sorted(self.dup_ids):
+            owners = self.id_files[item_id]
+            duplicate_report.append({
+                "id": item_id,
+                "count": sum(owners.values()),
+                "files": sorted(owners),
+                "sample_item": self.items.get(item_id)
+            })
+            dup_names.update(os.path.splitext(name)[0] for name in owners)
+
+        JsonIO.dump(result, self.summary_path)
+        JsonIO.dump(duplicate_report, self.report_path)
+        with open(self.duplicates_txt, 'w', encoding='utf-8') as f:
+            for name in sorted(dup_names):
+                f.write(name + "\n")
+        counts = {"collected": collected, "duplicates": len(self.dup_ids)}
+        JsonIO.dump({"files": self.files, "counts": counts}, self.index_path, pretty=False)
+
+    # 工具方法 ------------------------------------
+
+    def _scan_sources(self):
+        signatures = {}
+        if not os.path.isdir(self.source_dir):
+            return signatures
+        for name in os.listdir(self.source_dir):
+            if not name.lower().endswith('.json'):
+                continue
+            stat = os.stat(os.path.join(self.source_dir, name))
+            signatures[name] = [stat.st_mtime_ns, stat.st_size]
+        return signatures
+
+    def _load(self):
+        """加载索引；索引或汇总缺失则从空状态全量构建"""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.summary_path)):
+            return
+        # 汇总文件比索引新，说明被全量合并(merge_buffdata)覆盖过
+        if os.path.getmtime(self.summary_path) > os.path.getmtime(self.index_path):
+            return
+        try:
+            index = JsonIO.load(self.index_path)
+        except Exception as e:
+            print(f"汇总索引加载失败，将全量重建: {str(e)}")
+            return
+        self.files = index['files']
+        self.counts = index.get('counts')
+
+    def _load_items(self):
+        """有文件变化时才读取现有汇总并还原 ID -> 文件 映射；失败则从空状态全量构建"""
+        if self.loaded:
+            return
+        self.loaded = True
+        if not self.files:
+            return
+        try:
+            items = JsonIO.load(self.summary_path)['items']
+        except Exception as e:
+            print(f"汇总文件加载失败，将全量重建: {str(e)}")
+            self.files = {}
+            return
+
+        self.items = {item['id']: item for item in items}
+        for name, record in self.files.items():
+            for item_id in record['ids']:
+                self.id_files[item_id][name] += 1
+        self.dup_ids = {k for k, owners in self.id_files.items() if sum(owners.values()) > 1}
+
+
+@profiled('summary')
+def refresh_summary(source_dir='BuffData', output_dir='SummaryData'):
+    """增量刷新SummaryData与duplicates.txt"""
+    started = perf_counter()
+    summarizer = IncrementalSummarizer(source_dir, output_dir)
+    stats = summarizer.refresh()
+    record_stage('summary', items=summarizer.collected, duration=perf_counter() - started,
+                 duplicates=summarizer.duplicate_count, changed=stats['changed'])
+    print("\n汇总更新完成！")
+    print(f"变化文件数: {stats['changed']}（删除 {stats['removed']}，未变化 {stats['unchanged']}）")
+    print(f"成功收集: {summarizer.collected}")
+    print(f"发现重复: {summarizer.duplicate_count}")
+    return stats
+
+
+if __name__ == "__main__":
+    enable_from_argv()
+    if os.path.exists('BuffData'):
+        refresh_summary()
+    else:
+        print("错误：目录 BuffData 不存在")
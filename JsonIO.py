@@ -0,0 +1,192 @@
+"""统一的JSON读写：可选orjson加速、紧凑/缩进输出切换、临时文件+fsync+rename原子写入、流式读取
+
+紧凑输出是默认值；设置环境变量 BUFF_JSON_PRETTY=1 时全部输出恢复两空格缩进，便于人工查看。
+BUFF_JSON_FSYNC=0 时跳过fsync（仍然是原子替换，只是不保证掉电后落盘）。
+"""
+import os
+import re
+import json
+import tempfile
+
+try:
+    import orjson  # 可选加速，未安装时使用标准库
+except ImportError:
+    orjson = None
+
+PRETTY = os.environ.get('BUFF_JSON_PRETTY', '') not in ('', '0')
+FSYNC = os.environ.get('BUFF_JSON_FSYNC', '1') != '0'
+BACKEND = 'orjson' if orjson is not None else 'json'
+CHUNK_SIZE = 1 << 20
+
+# mkstemp 建立的文件权限为0600，提交前按umask恢复为普通文件权限（umask只能通过设置来读取，导入时读一次）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def dumps(obj, pretty=None):
+    """序列化为UTF-8字节（非ASCII字符原样输出，与 ensure_ascii=False 一致）"""
+    if pretty is None:
+        pretty = PRETTY
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def _mkstemp(path):
+    """在目标目录中新建唯一的临时文件（同一进程内多个线程写同一路径时互不覆盖），返回 (fd, 路径)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+    os.chmod(tmp_path, 0o666 & ~_UMASK)
+    return fd, tmp_path
+
+
+def _fsync_dir(path):
+    """rename本身也要落盘，否则掉电后可能仍看到旧文件"""
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def temp_path(path):
+    """为自行打开文件写入的写入器（pyarrow、二进制目录）分配临时文件，写完关闭后调用 replace_file"""
+    fd, tmp_path = _mkstemp(path)
+    os.close(fd)
+    return tmp_path
+
+
+def replace_file(tmp_path, path, fsync=None):
+    """fsync已关闭的临时文件后原子替换目标"""
+    fsync = FSYNC if fsync is None else fsync
+    if fsync:
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    if fsync:
+        _fsync_dir(path)
+
+
+def discard_file(tmp_path):
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
+
+
+class AtomicWriter:
+    """写入同目录临时文件，commit时fsync后rename覆盖目标；异常退出时目标文件保持原样"""
+
+    def __init__(self, path, fsync=None):
+        self.path = path
+        self.fsync = FSYNC if fsync is None else fsync
+        fd, self.tmp_path = _mkstemp(path)
+        self.f = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        self.f.write(data)
+
+    def commit(self):
+        self.finish()
+        self.publish()
+
+    def finish(self):
+        """写完并落盘临时文件，但不替换目标（多个文件全部写完后再逐个 publish）"""
+        self.f.flush()
+        if self.fsync:
+            os.fsync(self.f.fileno())
+        self.f.close()
+
+    def publish(self):
+        os.replace(self.tmp_path, self.path)
+        if self.fsync:
+            _fsync_dir(self.path)
+
+    def abort(self):
+        """丢弃临时文件；已commit时什么也不做"""
+        self.f.close()
+        discard_file(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+def dump(obj, path, pretty=None, fsync=None):
+    """原子写入JSON文件"""
+    data = dumps(obj, pretty)
+    with AtomicWriter(path, fsync=fsync) as f:
+        f.write(data)
+        f.write(b'\n')
+
+
+def iter_array(path, key=None, chunk_size=CHUNK_SIZE):
+    """流式逐个产出JSON数组元素，不把整个文件载入内存
+
+    key为None时读取顶层数组，否则读取顶层对象中该键对应的数组（如 FinalExtract 的 "data"、
+    BuffData 的 "items"）。数组之外的字段被跳过；键不存在时不产出任何元素。
+    """
+    decoder = json.JSONDecoder()
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key)) if key else re.compile(r'\[')
+
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ''
+        eof = False
+        pos = None
+        while pos is None:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            match = start.search(buf)
+            if match:
+                pos = match.end()
+            elif eof:
+                return
+            else:
+                buf = buf[-(len(key or '') + 64):]
+
+        while True:
+            # 跳过空白与分隔逗号
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            if pos < len(buf):
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    end = None
+                # 数字可能在块边界被截断（如 "100000." 被解析为 100000），元素后必须紧跟分隔符才算完整
+                if end is not None and (eof or (end < len(buf) and buf[end] in ' \t\r\n,]')):
+                    yield obj
+                    pos = end
+                    continue
+            if eof:
+                raise ValueError(f"{path}: JSON数组不完整")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
@@ -0,0 +1,310 @@
+import os
+import sys
+import glob
+import hashlib
+import argparse
+from fnmatch import fnmatch
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import JsonIO
+
+STATE_PATH = os.path.join('BuffStats', 'PipelineState.json')
+
+
+class Stage:
+    """流水线阶段：声明输入/输出（支持通配符）与执行函数"""
+
+    def __init__(self, name, action, inputs=(), outputs=(), optional=(), manual=False, description=''):
+        self.name = name
+        self.action = action
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.optional = set(optional)   # 允许不存在的输出（如无差异时不生成的文件）
+        self.manual = manual            # 需要联网/人工交互的采集阶段，不自动执行
+        self.description = description
+
+    def produces(self, pattern):
+        return any(out == pattern or fnmatch(pattern, out) for out in self.outputs)
+
+
+class PipelineDAG:
+    """Make风格的阶段调度：按输入内容哈希判断是否过期，独立阶段并行执行"""
+
+    def __init__(self, stages, state_path=STATE_PATH, check='hash'):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.check = check              # hash: 内容哈希  mtime: 修改时间+大小
+        self.state = self._load_state()
+
+    # 依赖关系 ------------------------------------
+
+    def dependencies(self, stage):
+        return [other.name for other in self.stages.values()
+                if other is not stage and any(other.produces(p) for p in stage.inputs)]
+
+    def resolve(self, target):
+        """目标可以是阶段名或输出文件路径"""
+        if target in self.stages:
+            return target
+        normalized = target.replace('\\', '/')
+        for stage in self.stages.values():
+            if stage.produces(normalized):
+                return stage.name
+        raise KeyError(f"未知目标: {target}")
+
+    def closure(self, targets):
+        """目标及其全部上游阶段（拓扑顺序）"""
+        ordered = []
+        visiting = set()
+
+        def visit(name):
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"阶段存在循环依赖: {name}")
+            visiting.add(name)
+            for dep in self.dependencies(self.stages[name]):
+                visit(dep)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for target in targets:
+            visit(self.resolve(target))
+        return ordered
+
+    # 过期检查 ------------------------------------
+
+    def fingerprint(self, stage):
+        """输入文件签名的摘要"""
+        digest = hashlib.sha1()
+        for pattern in stage.inputs:
+            for path in sorted(glob.glob(pattern)):
+                digest.update(path.encode('utf-8'))
+                digest.update(self._file_signature(path).encode('utf-8'))
+        return digest.hexdigest()
+
+    def is_stale(self, stage):
+        for pattern in stage.outputs:
+            if pattern not in stage.optional and not glob.glob(pattern):
+                return True
+        recorded = self.state['stages'].get(stage.name)
+        return recorded is None or recorded['fingerprint'] != self.fingerprint(stage)
+
+    def _file_signature(self, path):
+        stat = os.stat(path)
+        if self.check == 'mtime':
+            return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+        # 内容哈希按 mtime+size 缓存，未修改的文件不重复计算
+        cached = self.state['files'].get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        self.state['files'][path] = [stat.st_mtime_ns, stat.st_size, sha1.hexdigest()]
+        return sha1.hexdigest()
+
+    # 执行 ------------------------------------
+
+    def run(self, targets, jobs=4, force=False, dry_run=False):
+        """只执行目标所需的过期阶段，返回各阶段结果"""
+        order = self.closure(targets)
+        deps = {name: [d for d in self.dependencies(self.stages[name]) if d in order] for name in order}
+        results = {}
+        pending = list(order)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            while pending or running:
+                for name in list(pending):
+                    if any(d not in results for d in deps[name]):
+                        continue
+                    pending.remove(name)
+                    if any(results[d] == 'failed' for d in deps[name]):
+                        results[name] = 'failed'
+                        print(f"✖ {name}: 上游阶段失败，跳过")
+                        continue
+
+                    # 上游执行完后再检查，输出内容未变则下游无需重跑
+                    stage = self.stages[name]
+                    upstream_planned = dry_run and any(results[d] == 'done' for d in deps[name])
+                    if not (force or upstream_planned or self.is_stale(stage)):
+                        results[name] = 'up-to-date'
+                        print(f"✔ {name}: 已是最新")
+                        continue
+                    if stage.manual:
+                        missing = [p for p in stage.outputs if not glob.glob(p)]
+                        results[name] = 'failed' if missing else 'manual'
+                        print(f"⚠ {name}: 需要手动执行{stage.description}"
+                              + (f"（缺少 {', '.join(missing)}）" if missing else "，沿用现有输出"))
+                        continue
+                    if dry_run:
+                        results[name] = 'done'
+                        print(f"▶ {name}: 将执行")
+                        continue
+                    print(f"▶ {name}: 开始执行")
+                    running[pool.submit(self._execute, stage)] = name
+
+                if not running:
+                    if pending:
+                        continue
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    ok, elapsed = future.result()
+                    results[name] = 'done' if ok else 'failed'
+                    print(f"{'✔' if ok else '✖'} {name}: {'完成' if ok else '失败'}（{elapsed:.2f}s）")
+
+        if not dry_run:
+            self._save_state()
+        return results
+
+    def _execute(self, stage):
+        start = perf_counter()
+        try:
+            result = stage.action()
+            ok = result is not False
+        except Exception as e:
+            print(f"阶段 {stage.name} 异常: {str(e)}")
+            ok = False
+        if ok:
+            self.state['stages'][stage.name] = {'fingerprint': self.fingerprint(stage)}
+        return ok, perf_counter() - start
+
+    # 状态文件 ------------------------------------
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            try:
+                state = JsonIO.load(self.state_path)
+                state.setdefault('stages', {})
+                state.setdefault('files', {})
+                return state
+            except Exception as e:
+                print(f"流水线状态加载失败，将全部视为过期: {str(e)}")
+        return {'stages': {}, 'files': {}}
+
+    def _save_state(self):
+        JsonIO.dump(self.state, self.state_path, pretty=False)
+
+
+# --------------------------
+# 默认阶段图
+# --------------------------
+
+def _fetch_categories():
+    from BUFF_SCRIPT import build_category_file
+    return build_category_file()['valid']
+
+
+def _collect_api():
+    from BUFF_GET_ALL_ITEMS_DETAILS import main
+    main()
+
+
+def _refresh_summary():
+    from IncrementalSummary import refresh_summary
+    refresh_summary("BuffData", "SummaryData")
+
+
+def _collect_html():
+    from GET_ITEMS_DetailsByHtml import main
+    main()
+
+
+def _html_summary():
+    from Buff_MetaDataByHtml import process_summary
+    process_summary()
+
+
+def _merge_final():
+    from TwoBuffDataExtract import IncrementalMerger
+    IncrementalMerger().process_all_categories()
+
+
+def _count_final():
+    from RecordFinalExtractCount import count_goods_ids
+    count_goods_ids()
+
+
+def _collect_actual():
+    from ActualTimeCategoryCount import main
+    main()
+
+
+def _compare_counts():
+    from Find_Count_Not_Equal_Category import compare_category_counts
+    compare_category_counts()
+
+
+def _goods_id():
+    from GOODS_ID import process_final_extract
+    return process_final_extract()
+
+
+def build_default_pipeline(check='hash'):
+    """BUFF_SCRIPT各阶段的声明式依赖图"""
+    return PipelineDAG([
+        Stage('categories', _fetch_categories,
+              outputs=['category_mapping.json'],
+              manual=True, description='分类获取（菜单1）'),
+        Stage('collect_api', _collect_api,
+              inputs=['category_mapping.json'], outputs=['BuffData/*.json'],
+              manual=True, description='API采集（菜单2）'),
+        Stage('summary', _refresh_summary,
+              inputs=['BuffData/*.json'],
+              outputs=['SummaryData/summary.json', 'SummaryData/duplicates.json', 'duplicates.txt']),
+        Stage('collect_html', _collect_html,
+              inputs=['duplicates.txt'], outputs=['BuffDataByExtractHTML/*.json'],
+              manual=True, description='HTML采集（菜单3）'),
+        Stage('html_summary', _html_summary,
+              inputs=['BuffDataByExtractHTML/*.json'],
+              outputs=['SummaryDataByHtml/summary.json', 'SummaryDataByHtml/duplicates.json']),
+        # 合并时用 SummaryData/summary.json 补全hashname（HashnameIndex），汇总更新后需重新合并
+        Stage('merge_final', _merge_final,
+              inputs=['BuffData/*.json', 'BuffDataByExtractHTML/*.json', 'SummaryData/summary.json'],
+              outputs=['FinalExtract/*.json']),
+        Stage('count_final', _count_final,
+              inputs=['FinalExtract/*.json'], outputs=['BuffStats/FinalCount.json']),
+        Stage('collect_actual', _collect_actual,
+              inputs=['category_mapping.json'], outputs=['BuffStats/ActualCategoryCount.json'],
+              manual=True, description='实时统计（菜单5）'),
+        Stage('compare_counts', _compare_counts,
+              inputs=['BuffStats/ActualCategoryCount.json', 'BuffStats/FinalCount.json'],
+              outputs=['diff_categories_count.txt'], optional=['diff_categories_count.txt']),
+        Stage('goods_id', _goods_id,
+              inputs=['FinalExtract/*.json'], outputs=['id.json', 'id.bin']),
+    ], check=check)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按需重建流水线目标（只执行过期阶段）")
+    parser.add_argument('targets', nargs='*', default=['id.json'], help="阶段名或输出文件，默认 id.json")
+    parser.add_argument('-j', '--jobs', type=int, default=4, help="并行阶段数")
+    parser.add_argument('--force', action='store_true', help="忽略过期检查强制执行")
+    parser.add_argument('--dry-run', action='store_true', help="只显示将执行的阶段")
+    parser.add_argument('--check', choices=['hash', 'mtime'], default='hash', help="过期判断方式")
+    parser.add_argument('--list', action='store_true', help="列出所有阶段")
+    args = parser.parse_args()
+
+    dag = build_default_pipeline(check=args.check)
+    if args.list:
+        for stage in dag.stages.values():
+            deps = ', '.join(dag.dependencies(stage)) or '-'
+            print(f"{stage.name:<15} 依赖: {deps:<30} 输出: {', '.join(stage.outputs)}")
+        return 0
+
+    try:
+        results = dag.run(args.targets, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    except (KeyError, ValueError) as e:
+        print(str(e))
+        return 2
+    return 1 if 'failed' in results.values() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
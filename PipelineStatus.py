@@ -0,0 +1,64 @@
+import os
+import threading
+from datetime import datetime
+import JsonIO
+
+STATUS_PATH = os.path.join('BuffStats', 'StageStatus.json')
+
+# 阶段 -> 状态界面显示名（按流水线顺序）
+STAGES = {
+    'categories': '分类文件',
+    'api_collect': '原始数据',
+    'summary': '汇总数据',
+    'html_collect': 'HTML数据',
+    'html_summary': 'HTML分析',
+    'merge': '合并数据',
+    'final_count': '最终统计',
+    'actual_count': '实时统计',
+    'diff': '差异分析',
+    'ids': 'ID列表'
+}
+
+_lock = threading.Lock()
+
+
+def load_status(status_path=STATUS_PATH):
+    """读取阶段状态清单，不存在或损坏时返回None"""
+    if not os.path.exists(status_path):
+        return None
+    try:
+        return JsonIO.load(status_path)
+    except Exception:
+        return None
+
+
+def record_stage(stage, items=None, duration=None, ok=True, status_path=STATUS_PATH, **extra):
+    """阶段结束时记录条目数、完成时间与耗时；记录失败不影响阶段本身"""
+    entry = {
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'ok': ok,
+        'items': items,
+        'duration': round(duration, 2) if duration is not None else None
+    }
+    entry.update(extra)
+    try:
+        with _lock:
+            status = load_status(status_path) or {}
+            status[stage] = entry
+            JsonIO.dump(status, status_path, pretty=True, fsync=False)
+    except Exception as e:
+        print(f"阶段状态记录失败（{stage}）: {str(e)}")
+
+
+def describe(entry):
+    """状态界面的一行描述：完成时间、条目数、耗时"""
+    if not entry.get('ok', True):
+        text = f"上次失败 {entry['finished_at'].replace('T', ' ')}"
+    else:
+        text = f"已完成 {entry['finished_at'].replace('T', ' ')}"
+    details = []
+    if entry.get('items') is not None:
+        details.append(f"{entry['items']} 条")
+    if entry.get('duration') is not None:
+        details.append(f"耗时 {entry['duration']}s")
+    return text + (f"（{'，'.join(details)}）" if details else "")
@@ -0,0 +1,282 @@
+"""流水线各阶段的性能剖析：cProfile/pstats、可选tracemalloc峰值内存、可选py-spy采样火焰图
+
+默认关闭（关闭时装饰器只多一次判断），开启方式任选其一：
+  - 环境变量 BUFF_PROFILE=1；取值可用逗号组合 flame（py-spy火焰图）与 memory（tracemalloc），
+    如 BUFF_PROFILE=flame,memory；
+  - 各阶段脚本的命令行参数 --profile / --profile-flame / --profile-memory；
+  - BuffCLI --profile [--profile-flame] [--profile-memory] <子命令>。
+
+tracemalloc 会拦截每次内存分配，使阶段耗时明显变长，因此只在 memory 模式开启；
+开启后 summary.json 中的耗时包含这部分开销（memory 字段为 true）。
+
+每个进程一个运行目录 Profiles/<时间戳>/，每个阶段输出：
+  <stage>.prof          pstats二进制，可用 snakeviz 或 python -m pstats 查看
+  <stage>.txt           按累计耗时排序的前 TOP_N 个函数
+  <stage>.memory.txt    tracemalloc 峰值，以及阶段结束时占用最多的代码行（memory 模式）
+  <stage>.svg           py-spy 火焰图（flame 模式且已安装 py-spy，覆盖全部线程与子进程）
+  summary.json          各阶段耗时、CPU时间、峰值内存，以及嵌套阶段的调用统计
+
+嵌套按线程判断：同一线程内只剖析最外层（同一线程的cProfile不能叠加），内层阶段只累计调用次数与耗时；
+不同线程中并行执行的阶段（如DAG并行调度）各自剖析。cProfile只记录进入阶段的那个线程，
+线程池/进程池中的工作请用火焰图查看；CPU时间、tracemalloc 与 py-spy 都是进程级的，
+阶段并行时这三项包含同时运行的其他阶段。Python 3.12 起同一时刻只能有一个cProfile，
+并行阶段中后开始的只记录耗时。
+"""
+import os
+import sys
+import threading
+import functools
+import contextlib
+from time import perf_counter, process_time
+from datetime import datetime
+import JsonIO
+
+PROFILE_DIR = 'Profiles'
+TOP_N = 40
+PROFILE_FLAGS = ('--profile', '--profile-flame', '--profile-memory')
+
+_options = {option.strip() for option in os.environ.get('BUFF_PROFILE', '').lower().split(',')} - {'', '0'}
+_mode = None if not _options else ('flame' if 'flame' in _options else 'cpu')
+_memory = 'memory' in _options
+_lock = threading.Lock()
+_local = threading.local()   # 当前线程正在剖析的最外层阶段
+_tracing_users = 0           # 正在使用 tracemalloc 的阶段数（并行阶段共用）
+_tracing_started = False     # tracemalloc 是否由本模块启动
+_run = None
+
+
+def enable(flame=False, memory=False):
+    global _mode, _memory
+    _mode = 'flame' if flame else 'cpu'
+    _memory = memory
+
+
+def enabled():
+    return _mode is not None
+
+
+def enable_from_argv(argv=None):
+    """从命令行参数中取出 --profile / --profile-flame 并开启剖析（各阶段脚本的 __main__ 调用）"""
+    argv = sys.argv if argv is None else argv
+    if any(flag in argv for flag in PROFILE_FLAGS):
+        enable(flame='--profile-flame' in argv, memory='--profile-memory' in argv)
+    argv[:] = [arg for arg in argv if arg not in PROFILE_FLAGS]
+    return enabled()
+
+
+class ProfileRun:
+    """一个进程的剖析输出目录与汇总"""
+
+    def __init__(self, root=PROFILE_DIR):
+        base = datetime.now().strftime('%Y%m%d-%H%M%S')
+        run_id, n = base, 1
+        while os.path.exists(os.path.join(root, run_id)):
+            run_id, n = f"{base}-{n:03d}", n + 1
+        self.id = run_id
+        self.path = os.path.join(root, run_id)
+        os.makedirs(self.path)
+        self.summary = {'run': run_id, 'pid': os.getpid(), 'argv': sys.argv, 'mode': _mode, 'memory': _memory,
+                        'stages': [], 'nested': {}}
+        self.names = {}
+        self.lock = threading.Lock()
+
+    def stage_name(self, stage):
+        """同一阶段在一次运行中多次执行时依次加后缀 -2、-3"""
+        with self.lock:
+            count = self.names[stage] = self.names.get(stage, 0) + 1
+        return stage if count == 1 else f"{stage}-{count}"
+
+    def add_stage(self, entry):
+        with self.lock:
+            self.summary['stages'].append(entry)
+            self._save()
+
+    def add_nested(self, stage, seconds):
+        with self.lock:
+            nested = self.summary['nested'].setdefault(stage, {'calls': 0, 'wall_seconds': 0.0})
+            nested['calls'] += 1
+            nested['wall_seconds'] = round(nested['wall_seconds'] + seconds, 4)
+
+    def _save(self):
+        try:
+            JsonIO.dump(self.summary, os.path.join(self.path, 'summary.json'), pretty=True, fsync=False)
+        except Exception as e:
+            print(f"剖析汇总保存失败: {str(e)}")
+
+
+def get_run():
+    global _run
+    with _lock:
+        if _run is None:
+            _run = ProfileRun()
+            print(f"性能剖析输出目录: {_run.path}")
+        return _run
+
+
+def _start_flame(base):
+    """后台启动 py-spy 采样当前进程；未安装或启动失败时返回None"""
+    import shutil
+    import subprocess
+
+    exe = shutil.which('py-spy')
+    if not exe:
+        print("未安装 py-spy，跳过火焰图（pip install py-spy）")
+        return None
+    cmd = [exe, 'record', '--pid', str(os.getpid()), '--output', base + '.svg', '--format', 'flamegraph',
+           '--rate', '100', '--subprocesses', '--nonblocking']
+    log = open(base + '.py-spy.log', 'wb')
+    kwargs = {'stdout': log, 'stderr': subprocess.STDOUT}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+    try:
+        return subprocess.Popen(cmd, **kwargs), log
+    except OSError as e:
+        log.close()
+        print(f"py-spy 启动失败: {str(e)}")
+        return None
+
+
+def _stop_flame(flame):
+    """发送中断信号让 py-spy 写出火焰图"""
+    import signal
+
+    proc, log = flame
+    try:
+        proc.send_signal(signal.CTRL_BREAK_EVENT if os.name == 'nt' else signal.SIGINT)
+        proc.wait(timeout=30)
+    except Exception as e:
+        proc.kill()
+        print(f"py-spy 未正常结束: {str(e)}")
+    finally:
+        log.close()
+
+
+def _start_tracing():
+    """开始统计内存；第一个使用者负责启动（或重置已由外部启动的峰值）"""
+    global _tracing_users, _tracing_started
+    import tracemalloc
+
+    with _lock:
+        if _tracing_users == 0:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    """返回 (当前占用, 峰值, 快照)；最后一个使用者停止由本模块启动的 tracemalloc"""
+    global _tracing_users, _tracing_started
+    import tracemalloc
+
+    with _lock:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+    return current, peak, snapshot
+
+
+def _write_reports(base, profiler, memory):
+    import pstats
+
+    if profiler is not None:
+        profiler.dump_stats(base + '.prof')
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(TOP_N)
+    if memory is not None:
+        _write_memory_report(base, *memory)
+
+
+def _write_memory_report(base, current, peak, snapshot):
+    import tracemalloc
+
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')))
+    mb = 1024 * 1024
+    with open(base + '.memory.txt', 'w', encoding='utf-8') as f:
+        f.write(f"峰值内存: {peak / mb:.1f} MB\n")
+        f.write(f"阶段结束时仍占用: {current / mb:.1f} MB\n\n")
+        f.write(f"阶段结束时占用最多的 {TOP_N} 行:\n")
+        for stat in snapshot.statistics('lineno')[:TOP_N]:
+            f.write(f"{stat}\n")
+
+
+@contextlib.contextmanager
+def profile_stage(stage):
+    """剖析一个阶段；未开启时什么也不做"""
+    if _mode is None:
+        yield
+        return
+
+    if getattr(_local, 'active', None) is not None:
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            get_run().add_nested(stage, perf_counter() - started)
+        return
+
+    import cProfile
+
+    _local.active = stage
+    try:
+        run = get_run()
+        name = run.stage_name(stage)
+        base = os.path.join(run.path, name)
+        flame = _start_flame(base) if _mode == 'flame' else None
+        memory = _memory
+        if memory:
+            _start_tracing()
+
+        entry = {'stage': stage, 'name': name, 'started_at': datetime.now().isoformat(timespec='seconds'),
+                 'thread': threading.current_thread().name, 'error': None}
+        profiler = cProfile.Profile()
+        wall, cpu = perf_counter(), process_time()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+：其他线程的阶段正在剖析
+            profiler = None
+        try:
+            yield
+        except BaseException as e:
+            entry['error'] = type(e).__name__
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            entry['wall_seconds'] = round(perf_counter() - wall, 4)
+            entry['cpu_seconds'] = round(process_time() - cpu, 4)
+            traced = _stop_tracing() if memory else None
+            if flame:
+                _stop_flame(flame)
+            entry['peak_mb'] = round(traced[1] / 1024 / 1024, 2) if traced else None
+            try:
+                _write_reports(base, profiler, traced)
+                entry['files'] = sorted(f for f in os.listdir(run.path) if f.startswith(name + '.'))
+            except Exception as e:
+                print(f"剖析结果写入失败: {str(e)}")
+            run.add_stage(entry)
+            peak_text = f"，峰值内存 {entry['peak_mb']:.1f} MB（耗时含tracemalloc开销）" if traced else ""
+            print(f"[剖析] {name}: {entry['wall_seconds']:.2f}s（CPU {entry['cpu_seconds']:.2f}s）"
+                  f"{peak_text} -> {base}.*")
+    finally:
+        _local.active = None
+
+
+def profiled(stage):
+    """阶段函数装饰器：开启剖析时为该阶段输出cProfile/内存报告"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _mode is None:
+                return func(*args, **kwargs)
+            with profile_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
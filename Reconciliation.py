@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import datetime
+from GoodsCatalog import GoodsCatalog, CATALOG_PATH, parse_goods_id
+import JsonIO
+
+REPORT_PATH = os.path.join('BuffStats', 'Reconcile.json')
+DIFF_FILE = 'diff_categories_count.txt'
+
+
+def to_ranges(ids):
+    """整数ID压缩为连续区间 [[起, 止], ...]"""
+    ranges = []
+    for goods_id in sorted(ids):
+        if ranges and goods_id == ranges[-1][1] + 1:
+            ranges[-1][1] = goods_id
+        else:
+            ranges.append([goods_id, goods_id])
+    return ranges
+
+
+def load_local_ids(category, final_dir='FinalExtract'):
+    """FinalExtract中某分类的ID集合，优先读取目录库"""
+    if os.path.exists(CATALOG_PATH):
+        with GoodsCatalog() as catalog:
+            if catalog.has_category(category):
+                return {int(g) for g in catalog.goods_ids(category)}   # 目录库中只有数字ID
+
+    path = os.path.join(final_dir, f"{category}.json")
+    if not os.path.exists(path):
+        return set()
+    ids = {parse_goods_id(item.get('goods_id')) for item in JsonIO.iter_array(path, 'data')}
+    ids.discard(None)
+    return ids
+
+
+class Reconciler:
+    """按分类比对线上ID集合与FinalExtract，给出缺失/多余的ID区间及所在页码
+
+    mode:
+      first  - 只检查前 pages 页（新上架商品通常在前几页）
+      sample - 首页 + 随机抽取 pages 页
+      full   - 全部页面，可确认多余ID
+    """
+
+    def __init__(self, collector=None, mode='first', pages=1, seed=None):
+        if collector is None:
+            from BUFF_GET_ALL_ITEMS_DETAILS import BuffCollector
+            collector = BuffCollector()
+        self.collector = collector
+        self.mode = mode
+        self.pages = max(1, pages)
+        self.rng = random.Random(seed)
+
+    def reconcile_category(self, category):
+        first = self.collector.fetch_page(category, 1)
+        if first is None:
+            return {'error': '首页请求失败'}
+
+        total_page = first.get('total_page', 1) or 1
+        live = {}   # ID -> 页码
+        checked = [1]
+        for item in first.get('items', []):
+            live[int(item['id'])] = 1
+
+        for page in self._plan_pages(total_page):
+            data = self.collector.fetch_page(category, page)
+            if data is None:
+                continue
+            checked.append(page)
+            for item in data.get('items', []):
+                live.setdefault(int(item['id']), page)
+
+        complete = len(checked) >= total_page
+        local = load_local_ids(category)
+        missing = set(live) - local
+        live_total = first.get('total_count', 0)
+
+        report = {
+            'live_total': live_total,
+            'local_total': len(local),
+            'total_page': total_page,
+            'pages_checked': checked,
+            'complete': complete,
+            'missing': {
+                'count': len(missing),
+                'ranges': to_ranges(missing),
+                'pages': sorted({live[g] for g in missing})
+            }
+        }
+        # 只有全量比对时才能确认本地多余的ID；抽样时以数量差提示
+        if complete:
+            extra = local - set(live)
+            report['extra'] = {'count': len(extra), 'ranges': to_ranges(extra)}
+        else:
+            report['unverified_delta'] = live_total - len(local) - len(missing)
+        report['in_sync'] = not missing and (report.get('extra', {}).get('count', 0) == 0
+                                             if complete else report['unverified_delta'] == 0)
+        return report
+
+    def reconcile(self, categories):
+        results = {}
+        for idx, category in enumerate(categories, 1):
+            print(f"对账 ({idx}/{len(categories)}): {category}")
+            results[category] = self.reconcile_category(category)
+            self._print_result(category, results[category])
+        return results
+
+    def _plan_pages(self, total_page):
+        rest = list(range(2, total_page + 1))
+        if self.mode == 'full':
+            return rest
+        if self.mode == 'sample':
+            return sorted(self.rng.sample(rest, min(self.pages, len(rest))))
+        return rest[:self.pages - 1]
+
+    @staticmethod
+    def _print_result(category, result):
+        if 'error' in result:
+            print(f"  ✖ {category}: {result['error']}")
+        elif result['in_sync']:
+            print(f"  ✔ {category}: 一致（检查 {len(result['pages_checked'])}/{result['total_page']} 页）")
+        else:
+            extra = result.get('extra', {}).get('count', '?')
+            print(f"  ⚠ {category}: 缺失 {result['missing']['count']} 个，多余 {extra} 个，"
+                  f"需补采页码 {result['missing']['pages'] or '-'}")
+
+
+def save_report(results, mode, report_path=REPORT_PATH):
+    JsonIO.dump({
+        'generated_at': datetime.now().isoformat(),
+        'mode': mode,
+        'categories': results
+    }, report_path, pretty=True)
+    print(f"对账结果已保存到 {report_path}")
+
+
+def collect_missing_pages(report_path=REPORT_PATH, collector=None):
+    """按对账报告只补采缺失ID所在页面；需要全量重采的分类返回列表"""
+    with open(report_path, 'r', encoding='utf-8') as f:
+        results = json.load(f)['categories']
+    if collector is None:
+        from BUFF_GET_ALL_ITEMS_DETAILS import BuffCollector
+        collector = BuffCollector()
+
+    recrawl = []
+    for category, result in results.items():
+        if 'error' in result or result['in_sync']:
+            continue
+        if result['missing']['pages']:
+            print(f"\n补采 {category}: 页码 {result['missing']['pages']}")
+            collector.process_pages(category, result['missing']['pages'])
+        # 本地多余ID或抽样未覆盖的差异只能通过整类重采确认
+        if result.get('extra', {}).get('count') or result.get('unverified_delta'):
+            recrawl.append(category)
+    return recrawl
+
+
+def _default_categories():
+    if os.path.exists(DIFF_FILE):
+        with open(DIFF_FILE, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    with open('category_mapping.json', 'r', encoding='utf-8') as f:
+        return [sub['value'] for cat in json.load(f) for sub in cat['sub_categories']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按分类对账线上ID与FinalExtract，输出缺失/多余ID区间与页码")
+    parser.add_argument('categories', nargs='*', help=f"分类名，默认读取 {DIFF_FILE}，不存在则为全部分类")
+    parser.add_argument('--mode', choices=['first', 'sample', 'full'], default='first', help="页面检查方式")
+    parser.add_argument('--pages', type=int, default=1, help="first/sample 模式检查的页数")
+    parser.add_argument('--seed', type=int, help="sample 模式的随机种子")
+    parser.add_argument('--collect', action='store_true', help="对账后只补采缺失页")
+    args = parser.parse_args()
+
+    categories = args.categories or _default_categories()
+    results = Reconciler(mode=args.mode, pages=args.pages, seed=args.seed).reconcile(categories)
+    save_report(results, args.mode)
+
+    if args.collect:
+        recrawl = collect_missing_pages()
+        if recrawl:
+            print(f"\n以下分类仍需整类重采: {', '.join(recrawl)}")
+    return 0 if all(r.get('in_sync') for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,31 @@
 import os
-import json
+from time import perf_counter
 from datetime import datetime
+from FinalManifest import FinalManifest, stream_count
+from PipelineStatus import record_stage
+import JsonIO
+from Profiling import profiled, enable_from_argv
 
 
-def count_goods_ids():
-    # 初始化统计字典
+def _count_from_files(folder_path, manifest=None):
+    """统计FinalExtract各分类数量：清单签名一致的直接取记录值，其余流式计数
+
+    返回 (分类计数, 总数, 流式计数的文件数)
+    """
+    manifest = manifest or FinalManifest()
     result = {}
     total = 0
-
-    # 设置输出文件夹
-    output_folder = "BuffStats"
-    os.makedirs(output_folder, exist_ok=True)  # 确保文件夹存在
-
-    # 遍历目标文件夹
-    folder_path = "FinalExtract"
+    streamed = 0
     for filename in os.listdir(folder_path):
         if filename.endswith(".json"):
             file_path = os.path.join(folder_path, filename)
 
             try:
-                # 读取JSON文件
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                # 获取商品ID数量
-                count = len(data.get("data", []))
+                # 清单未覆盖或文件已变化时，只扫描 "goods_id" 键，不解析条目内容
+                count = manifest.lookup(file_path)
+                if count is None:
+                    count = stream_count(file_path)
+                    streamed += 1
 
                 # 使用文件名作为分类名（去掉扩展名）
                 category = os.path.splitext(filename)[0]
@@ -34,6 +35,23 @@ def count_goods_ids():
             except Exception as e:
                 print(f"处理文件 {filename} 时出错: {str(e)}")
                 continue
+    return result, total, streamed
+
+
+@profiled('final_count')
+def count_goods_ids():
+    # 初始化统计字典
+    result = {}
+    total = 0
+
+    # 设置输出文件夹
+    output_folder = "BuffStats"
+    os.makedirs(output_folder, exist_ok=True)  # 确保文件夹存在
+
+    started = perf_counter()
+    result, total, streamed = _count_from_files("FinalExtract")
+    if streamed:
+        print(f"清单未覆盖 {streamed} 个分类文件，已流式计数")
 
     # 添加汇总数据和更新日期
     result["Sum"] = total
@@ -41,10 +59,11 @@ def count_goods_ids():
 
     # 写入结果文件到BuffStats文件夹
     output_path = os.path.join(output_folder, "FinalCount.json")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    JsonIO.dump(result, output_path, pretty=True)
+    record_stage('final_count', items=total, duration=perf_counter() - started, categories=len(result) - 2)
 
 
 if __name__ == "__main__":
+    enable_from_argv()
     count_goods_ids()
     print("统计完成，结果已保存到 BuffStats/FinalCount.json")
\ No newline at end of file
@@ -0,0 +1,310 @@
+import os
+import sys
+import glob
+import gzip
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import JsonIO
+
+SNAPSHOT_DIR = 'Snapshots'
+DEFAULT_SOURCES = ('BuffData', 'BuffDataByExtractHTML', 'category_mapping.json')
+RETENTION = {'keep_last': 200, 'keep_daily': 90}
+ZSTD_LEVEL = 10
+
+
+def _codec():
+    """优先zstd，未安装时回退gzip（对象扩展名区分编码，两者可混存）"""
+    try:
+        import zstandard
+        return '.zst', zstandard
+    except ImportError:
+        return '.gz', None
+
+
+class SnapshotStore:
+    """原始采集数据的不可变快照：文件按内容哈希压缩存储一次，每次快照只记录清单
+
+    Snapshots/
+      objects/ab/<sha256>.zst   压缩后的文件内容（未变化的分类文件在各快照间共享）
+      runs/<快照ID>.json         清单：相对路径 -> 哈希、大小
+      hashes.json               路径 -> [mtime_ns, size, sha256]，避免重复计算未修改文件的哈希
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, level=ZSTD_LEVEL):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.runs_dir = os.path.join(root, 'runs')
+        self.hash_cache_path = os.path.join(root, 'hashes.json')
+        self.level = level
+        self.ext, self.zstd = _codec()
+        self.hash_cache = JsonIO.load(self.hash_cache_path) if os.path.exists(self.hash_cache_path) else {}
+
+    # 对象存储 ------------------------------------
+
+    def _object_path(self, digest, ext=None):
+        return os.path.join(self.objects_dir, digest[:2], digest + (ext or self.ext))
+
+    def _find_object(self, digest):
+        for ext in ('.zst', '.gz'):
+            path = self._object_path(digest, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _compress(self, data):
+        if self.zstd is not None:
+            return self.zstd.ZstdCompressor(level=self.level).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _decompress(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if path.endswith('.zst'):
+            import zstandard
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _hash_file(self, path):
+        stat = os.stat(path)
+        cached = self.hash_cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2], stat.st_size
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        self.hash_cache[path] = [stat.st_mtime_ns, stat.st_size, sha.hexdigest()]
+        return sha.hexdigest(), stat.st_size
+
+    def _store(self, path, digest):
+        """对象不存在时压缩写入，返回新增的压缩字节数"""
+        if self._find_object(digest):
+            return 0
+        with open(path, 'rb') as f:
+            compressed = self._compress(f.read())
+        with JsonIO.AtomicWriter(self._object_path(digest)) as out:
+            out.write(compressed)
+        return len(compressed)
+
+    # 快照 ------------------------------------
+
+    @staticmethod
+    def _source_files(sources):
+        files = []
+        for source in sources:
+            if os.path.isdir(source):
+                files.extend(sorted(glob.glob(os.path.join(source, '*.json'))))
+            elif os.path.isfile(source):
+                files.append(source)
+        return [f.replace('\\', '/') for f in files]
+
+    def create(self, label=None, sources=DEFAULT_SOURCES, jobs=4):
+        """为当前数据创建快照；内容与最近一次快照完全相同时不重复记录，返回该快照清单"""
+        files = self._source_files(sources)
+        if not files:
+            print("没有可快照的采集数据")
+            return None
+
+        entries = {}
+        for path in files:
+            digest, size = self._hash_file(path)
+            entries[path] = {'sha256': digest, 'size': size}
+
+        latest = self.latest()
+        if latest and latest['files'] == entries:
+            JsonIO.dump(self.hash_cache, self.hash_cache_path, pretty=False, fsync=False)
+            print(f"数据与快照 {latest['id']} 相同，未创建新快照")
+            return latest
+
+        # 新内容并行压缩（zstd/gzip压缩时释放GIL）；内容相同的文件只提交一次，避免多个线程写同一对象
+        by_digest = {entry['sha256']: path for path, entry in entries.items()}
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            stored = sum(pool.map(lambda item: self._store(item[1], item[0]), by_digest.items()))
+
+        manifest = {
+            'id': self._new_id(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'label': label,
+            'sources': list(sources),
+            'files': entries,
+            'stats': {
+                'files': len(entries),
+                'raw_bytes': sum(e['size'] for e in entries.values()),
+                'new_objects_bytes': stored
+            }
+        }
+        JsonIO.dump(manifest, os.path.join(self.runs_dir, f"{manifest['id']}.json"), pretty=True)
+        JsonIO.dump(self.hash_cache, self.hash_cache_path, pretty=False, fsync=False)
+        print(f"已创建快照 {manifest['id']}：{len(entries)} 个文件，"
+              f"原始 {manifest['stats']['raw_bytes'] / 1024 / 1024:.1f} MB，新增存储 {stored / 1024 / 1024:.2f} MB")
+        return manifest
+
+    def _new_id(self):
+        base = datetime.now().strftime('%Y%m%d-%H%M%S')
+        run_id, n = base, 1
+        while os.path.exists(os.path.join(self.runs_dir, f"{run_id}.json")):
+            n += 1
+            run_id = f"{base}-{n:03d}"   # 补零保证同一秒内的快照按字典序排列
+        return run_id
+
+    def list(self):
+        """全部快照清单，按创建时间升序"""
+        if not os.path.isdir(self.runs_dir):
+            return []
+        return [JsonIO.load(path) for path in sorted(glob.glob(os.path.join(self.runs_dir, '*.json')))]
+
+    def get(self, run_id):
+        path = os.path.join(self.runs_dir, f"{run_id}.json")
+        if not os.path.exists(path):
+            raise KeyError(f"快照不存在: {run_id}")
+        return JsonIO.load(path)
+
+    def latest(self):
+        runs = sorted(glob.glob(os.path.join(self.runs_dir, '*.json')))
+        return JsonIO.load(runs[-1]) if runs else None
+
+    def restore(self, run_id, clean=True, jobs=8):
+        """恢复快照到工作目录；内容已一致的文件跳过，clean时删除快照中不存在的分类文件"""
+        manifest = self.get(run_id)
+        pending = []
+        for path, entry in manifest['files'].items():
+            if os.path.exists(path) and self._hash_file(path)[0] == entry['sha256']:
+                continue
+            pending.append((path, entry))
+
+        def restore_file(item):
+            path, entry = item
+            obj = self._find_object(entry['sha256'])
+            if obj is None:
+                raise FileNotFoundError(f"快照对象缺失: {entry['sha256']}（{path}）")
+            with JsonIO.AtomicWriter(path, fsync=False) as out:
+                out.write(self._decompress(obj))
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            list(pool.map(restore_file, pending))
+
+        removed = []
+        if clean:
+            for source in manifest['sources']:
+                if os.path.isdir(source):
+                    for path in self._source_files([source]):
+                        if path not in manifest['files']:
+                            os.remove(path)
+                            removed.append(path)
+        print(f"已恢复快照 {run_id}：写入 {len(pending)} 个文件，"
+              f"{len(manifest['files']) - len(pending)} 个未变化，删除 {len(removed)} 个")
+        return {'written': len(pending), 'unchanged': len(manifest['files']) - len(pending), 'removed': len(removed)}
+
+    def diff(self, old_id, new_id):
+        """两次快照之间新增、删除、内容变化的文件"""
+        old, new = self.get(old_id)['files'], self.get(new_id)['files']
+        return {
+            'added': sorted(set(new) - set(old)),
+            'removed': sorted(set(old) - set(new)),
+            'changed': sorted(p for p in set(old) & set(new) if old[p]['sha256'] != new[p]['sha256'])
+        }
+
+    # 保留策略 ------------------------------------
+
+    def prune(self, keep_last=RETENTION['keep_last'], keep_daily=RETENTION['keep_daily'], dry_run=False):
+        """保留最近 keep_last 个快照，以及最近 keep_daily 天内每天的最后一个快照；
+        删除其余清单后回收不再被引用的对象。"""
+        runs = self.list()
+        keep = {r['id'] for r in runs[-keep_last:]} if keep_last else set()
+        cutoff = (datetime.now() - timedelta(days=keep_daily)).date().isoformat()
+        daily = {}
+        for run in runs:
+            day = run['created_at'][:10]
+            if keep_daily and day >= cutoff:
+                daily[day] = run['id']
+        keep.update(daily.values())
+
+        expired = [r for r in runs if r['id'] not in keep]
+        referenced = {e['sha256'] for r in runs if r['id'] in keep for e in r['files'].values()}
+        orphaned = []
+        for path in glob.glob(os.path.join(self.objects_dir, '*', '*')):
+            if os.path.basename(path).split('.')[0] not in referenced:
+                orphaned.append(path)
+
+        freed = sum(os.path.getsize(p) for p in orphaned)
+        if not dry_run:
+            for run in expired:
+                os.remove(os.path.join(self.runs_dir, f"{run['id']}.json"))
+            for path in orphaned:
+                os.remove(path)
+                try:
+                    os.rmdir(os.path.dirname(path))   # 只有目录为空时才会成功
+                except OSError:
+                    pass
+        if expired or orphaned:
+            print(f"{'将' if dry_run else '已'}删除 {len(expired)} 个过期快照、{len(orphaned)} 个对象，"
+                  f"释放 {freed / 1024 / 1024:.2f} MB")
+        return {'expired': [r['id'] for r in expired], 'objects': len(orphaned), 'freed_bytes': freed}
+
+    def usage(self):
+        """对象实际占用与各快照原始数据总量"""
+        stored = sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.objects_dir, '*', '*')))
+        runs = self.list()
+        return {'snapshots': len(runs), 'stored_bytes': stored,
+                'logical_bytes': sum(r['stats']['raw_bytes'] for r in runs)}
+
+
+def snapshot_collection(label, sources=DEFAULT_SOURCES):
+    """采集结束后调用：创建快照并按保留策略清理；失败只提示，不影响采集结果"""
+    try:
+        store = SnapshotStore()
+        manifest = store.create(label=label, sources=sources)
+        store.prune()
+        return manifest
+    except Exception as e:
+        print(f"快照创建失败: {str(e)}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="原始采集数据的压缩快照（内容寻址去重）")
+    sub = parser.add_subparsers(dest='action', required=True)
+    p = sub.add_parser('create', help="为当前数据创建快照")
+    p.add_argument('--label')
+    sub.add_parser('list', help="列出快照")
+    p = sub.add_parser('restore', help="恢复快照到工作目录")
+    p.add_argument('run_id')
+    p.add_argument('--keep-extra', action='store_true', help="保留快照中不存在的分类文件")
+    p = sub.add_parser('diff', help="比较两次快照")
+    p.add_argument('old_id')
+    p.add_argument('new_id')
+    p = sub.add_parser('prune', help="按保留策略清理")
+    p.add_argument('--keep-last', type=int, default=RETENTION['keep_last'])
+    p.add_argument('--keep-daily', type=int, default=RETENTION['keep_daily'])
+    p.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    store = SnapshotStore()
+    try:
+        if args.action == 'create':
+            return 0 if store.create(label=args.label) else 1
+        if args.action == 'list':
+            for run in store.list():
+                print(f"{run['id']}  {run['created_at']}  {run['label'] or '-':<12} "
+                      f"{run['stats']['files']:4d} 个文件  {run['stats']['raw_bytes'] / 1024 / 1024:8.1f} MB")
+            usage = store.usage()
+            print(f"共 {usage['snapshots']} 个快照，原始数据合计 {usage['logical_bytes'] / 1024 / 1024:.1f} MB，"
+                  f"实际占用 {usage['stored_bytes'] / 1024 / 1024:.1f} MB")
+        elif args.action == 'restore':
+            store.restore(args.run_id, clean=not args.keep_extra)
+        elif args.action == 'diff':
+            for key, label in (('added', '新增'), ('removed', '删除'), ('changed', '变化')):
+                paths = store.diff(args.old_id, args.new_id)[key]
+                print(f"{label} {len(paths)} 个" + (f": {', '.join(paths)}" if paths else ""))
+        elif args.action == 'prune':
+            store.prune(args.keep_last, args.keep_daily, dry_run=args.dry_run)
+    except (KeyError, FileNotFoundError) as e:
+        print(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
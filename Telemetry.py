@@ -0,0 +1,305 @@
+"""请求级遥测：延迟直方图、状态码计数、传输字节、重试次数、限速等待时间，导出为Prometheus文本格式
+
+所有指标按 script（脚本）、client（采集器）、account（账号）、category（分类）打标签，进程内共享一个注册表。
+输出方式：
+  - 每个脚本一个文本文件 BuffStats/metrics.<script>.prom（原子替换，可直接交给 node_exporter 的
+    textfile collector），采集过程中每 FLUSH_INTERVAL 秒及进程退出时写入，未记录任何请求的进程不写；
+    脚本名默认取入口文件名，可用环境变量 BUFF_METRICS_JOB 指定（同一脚本并发运行时应各自指定）；
+  - 设置环境变量 BUFF_METRICS_PORT 时在该端口提供 /metrics 供Prometheus直接抓取。
+"""
+import os
+import re
+import sys
+import glob
+import time
+import bisect
+import atexit
+import argparse
+import threading
+import contextlib
+from JsonIO import AtomicWriter
+
+METRICS_DIR = 'BuffStats'
+FLUSH_INTERVAL = 15
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+
+REQUEST_LABELS = ('client', 'account', 'category', 'endpoint')
+METRICS = {
+    'buff_request_duration_seconds': ('histogram', "请求延迟（秒）", REQUEST_LABELS),
+    'buff_requests_total': ('counter', "请求次数，code为HTTP状态码或异常类型", REQUEST_LABELS + ('code',)),
+    'buff_response_bytes_total': ('counter', "响应体字节数", REQUEST_LABELS),
+    'buff_request_retries_total': ('counter', "重试次数", ('client', 'account', 'category', 'reason')),
+    'buff_wait_seconds_total': ('counter', "限速/退避等待时间（秒）", ('client', 'account', 'category', 'reason')),
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def script_name():
+    """指标文件名与 script 标签：BUFF_METRICS_JOB，否则为入口脚本名（BUFF_GET_ALL_ITEMS_DETAILS.py -> BUFF_GET_ALL_ITEMS_DETAILS）"""
+    name = os.environ.get('BUFF_METRICS_JOB') or os.path.splitext(os.path.basename(sys.argv[0] if sys.argv else ''))[0]
+    return re.sub(r'[^A-Za-z0-9_-]', '_', name) or 'python'
+
+
+def metrics_path(script):
+    return os.path.join(METRICS_DIR, f"metrics.{script}.prom")
+
+
+class Telemetry:
+    """线程安全的指标注册表（各采集器的工作线程共用）"""
+
+    def __init__(self, path=None, flush_interval=FLUSH_INTERVAL, script=None):
+        self.script = script or script_name()
+        self.path = path or metrics_path(self.script)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.counters = {name: {} for name, (kind, _, _) in METRICS.items() if kind == 'counter'}
+        self.histograms = {}   # 标签 -> [各桶计数..., +Inf计数, 总和]
+        self.last_flush = time.monotonic()
+        self.server = None
+
+    # --------------------------
+    # 记录
+    # --------------------------
+
+    @contextlib.contextmanager
+    def request(self, client, account, category, endpoint):
+        """计时一次请求；调用方在 call 中填写 code（状态码）与 bytes，抛出异常时 code 记为异常类型"""
+        call = {'code': None, 'bytes': 0}
+        started = time.perf_counter()
+        try:
+            yield call
+        except Exception as e:
+            if call['code'] is None:
+                call['code'] = type(e).__name__
+            raise
+        finally:
+            self.observe(client, account, category, endpoint, time.perf_counter() - started,
+                         call['code'] if call['code'] is not None else 'unknown', call['bytes'])
+
+    def observe(self, client, account, category, endpoint, seconds, code, nbytes=0):
+        """记录一次已完成的请求；seconds 为None时只计数不计入延迟直方图"""
+        key = (client, account, category, endpoint)
+        with self.lock:
+            self._inc('buff_requests_total', key + (str(code),))
+            if nbytes:
+                self._inc('buff_response_bytes_total', key, nbytes)
+            if seconds is not None:
+                hist = self.histograms.get(key)
+                if hist is None:
+                    hist = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+                hist[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+                hist[-1] += seconds
+        self._maybe_flush()
+
+    def retry(self, client, account, category, reason):
+        with self.lock:
+            self._inc('buff_request_retries_total', (client, account, category, reason))
+
+    def wait(self, seconds, client, account, category, reason='interval'):
+        """按限速间隔休眠并记录等待时间"""
+        if seconds <= 0:
+            return
+        time.sleep(seconds)
+        with self.lock:
+            self._inc('buff_wait_seconds_total', (client, account, category, reason), float(seconds))
+
+    def _inc(self, name, key, amount=1):
+        series = self.counters[name]
+        series[key] = series.get(key, 0) + amount
+
+    def recorded(self):
+        """是否记录过任何指标"""
+        with self.lock:
+            return bool(self.histograms) or any(self.counters.values())
+
+    # --------------------------
+    # 导出
+    # --------------------------
+
+    def render(self):
+        """Prometheus文本格式（0.0.4）"""
+        lines = []
+        with self.lock:
+            for name, (kind, help_text, label_names) in METRICS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                label_names = ('script',) + label_names
+                if kind == 'counter':
+                    for key, value in sorted(self.counters[name].items()):
+                        lines.append(f"{name}{_labels(label_names, (self.script,) + key)} {_number(value)}")
+                    continue
+                for key, hist in sorted(self.histograms.items()):
+                    key = (self.script,) + key
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), hist[:-1]):
+                        cumulative += count
+                        le = 'le="%s"' % bound
+                        lines.append(f"{name}_bucket{_labels(label_names, key, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(label_names, key)} {_number(hist[-1])}")
+                    lines.append(f"{name}_count{_labels(label_names, key)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """原子写入文本文件（textfile collector 不会读到写了一半的文件）"""
+        try:
+            with AtomicWriter(self.path, fsync=False) as f:
+                f.write(self.render().encode('utf-8'))
+            self.last_flush = time.monotonic()
+        except Exception as e:
+            print(f"指标文件写入失败: {str(e)}")
+
+    def _maybe_flush(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def serve(self, port, host='0.0.0.0', background=True):
+        """提供 /metrics 端点，默认在后台线程运行"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = telemetry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        print(f"指标端点: http://{host}:{port}/metrics")
+        if background:
+            threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+        else:
+            self.server.serve_forever()
+        return self.server
+
+    def summary(self):
+        """按采集器汇总（BuffCLI 的JSON摘要用）：请求数、状态码、平均/P95延迟、字节数、重试与等待时间"""
+        clients = {}
+
+        def entry(client):
+            return clients.setdefault(client, {'requests': 0, 'codes': {}, 'latency_sum': 0.0, 'buckets': None,
+                                               'bytes': 0, 'retries': 0, 'wait_seconds': 0.0})
+
+        with self.lock:
+            for (client, _, _, _, code), count in self.counters['buff_requests_total'].items():
+                e = entry(client)
+                e['requests'] += count
+                e['codes'][code] = e['codes'].get(code, 0) + count
+            for (client, *_), value in self.counters['buff_response_bytes_total'].items():
+                entry(client)['bytes'] += value
+            for (client, *_), value in self.counters['buff_request_retries_total'].items():
+                entry(client)['retries'] += value
+            for (client, *_), value in self.counters['buff_wait_seconds_total'].items():
+                entry(client)['wait_seconds'] += value
+            for (client, *_), hist in self.histograms.items():
+                e = entry(client)
+                e['latency_sum'] += hist[-1]
+                e['buckets'] = [a + b for a, b in zip(e['buckets'] or [0] * (len(hist) - 1), hist[:-1])]
+
+        for e in clients.values():
+            buckets = e.pop('buckets') or []
+            timed = sum(buckets)
+            e['latency_mean'] = round(e['latency_sum'] / timed, 3) if timed else None
+            e['latency_p95_le'] = None
+            running = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                running += count
+                if running >= timed * 0.95:
+                    e['latency_p95_le'] = bound
+                    break
+            e['latency_sum'] = round(e['latency_sum'], 3)
+            e['wait_seconds'] = round(e['wait_seconds'], 3)
+        return clients
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def _flush_at_exit():
+    """退出时写文件；没有记录过请求的进程（如只导入了采集模块）不写，避免清理后重新建出 BuffStats"""
+    if _telemetry is not None and _telemetry.recorded():
+        _telemetry.flush()
+
+
+def get_telemetry():
+    """进程内共享的指标注册表；首次使用时注册退出时写文件，并按 BUFF_METRICS_PORT 启动端点"""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+            atexit.register(_flush_at_exit)
+            port = os.environ.get('BUFF_METRICS_PORT')
+            if port:
+                try:
+                    _telemetry.serve(int(port))
+                except (OSError, ValueError) as e:
+                    print(f"指标端点启动失败: {str(e)}")
+        return _telemetry
+
+
+def merge_metric_files(paths):
+    """合并多个进程的指标文件：同名指标的 HELP/TYPE 只保留一份，样本按指标归组"""
+    families = {}
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            continue
+        family = None
+        for line in lines:
+            if line.startswith(('# HELP ', '# TYPE ')):
+                headers, _ = family = families.setdefault(line.split()[2], ([], []))
+                if not any(header.split()[1] == line.split()[1] for header in headers):
+                    headers.append(line)
+            elif line.strip() and not line.startswith('#'):
+                if family is None:
+                    family = families.setdefault(re.split(r'[{\s]', line, 1)[0], ([], []))
+                family[1].append(line)
+    return ''.join('\n'.join(headers + samples) + '\n' for headers, samples in families.values())
+
+
+def main():
+    """把其他进程写出的 metrics.*.prom 合并后通过HTTP提供给Prometheus（未部署node_exporter时使用）"""
+    parser = argparse.ArgumentParser(description="通过HTTP提供 BuffStats/metrics.*.prom")
+    parser.add_argument('--port', type=int, default=9108)
+    parser.add_argument('--dir', default=METRICS_DIR)
+    args = parser.parse_args()
+
+    class FileTelemetry(Telemetry):
+        def render(self):
+            return merge_metric_files(sorted(glob.glob(os.path.join(args.dir, 'metrics.*.prom'))))
+
+    try:
+        FileTelemetry(script='files').serve(args.port, background=False)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
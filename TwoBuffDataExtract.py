@@ -1,13 +1,34 @@
 import os
-import json
 import sys
 from datetime import datetime
 from time import perf_counter
 from colorama import init, Fore, Back, Style
 from RecordFinalExtractCount import count_goods_ids  # 导入统计函数
+from GoodsCatalog import GoodsCatalog, parse_goods_id
+from FinalManifest import FinalManifest
+from HashnameIndex import HashnameIndex
+from ConflictIndex import check_conflicts
+from ChangeFeed import ChangeFeed, NAME_FIELDS
+from PipelineStatus import record_stage
+import JsonIO
+from Profiling import profiled, enable_from_argv
 
 init(autoreset=True)  # 初始化颜色输出
 
+
+def _normalized_items(items, key, category, source):
+    """入库前统一商品ID：按目录库规则转为整数再转回字符串（'012' -> '12'），
+    缺失或非数字ID（如 'None'）在此跳过并提示，产出 (goods_id, 条目)"""
+    skipped = 0
+    for item in items:
+        goods_id = parse_goods_id(item.get(key))
+        if goods_id is None:
+            skipped += 1
+            continue
+        yield str(goods_id), item
+    if skipped:
+        print(f"{category}: {source} 中跳过 {skipped} 个无效商品ID")
+
 class IncrementalMerger:
     def __init__(self):
         self.source_dirs = {
@@ -16,6 +37,11 @@ class IncrementalMerger:
         }
         self.final_dir = 'FinalExtract'
         os.makedirs(self.final_dir, exist_ok=True)
+        self.catalog = GoodsCatalog()
+        self.manifest = FinalManifest()
+        self.hashname_index = HashnameIndex()
+        self.hashname_index.refresh()
+        self.change_feed = ChangeFeed()
         self.colors = {
             'header': Fore.CYAN + Style.BRIGHT,
             'success': Fore.GREEN,
@@ -39,6 +65,8 @@ class IncrementalMerger:
                 self.process_file_categories()
             elif choice == 3:
                 self.process_single_category()
+            elif choice == 4:
+                self.backfill_hashnames_via_api()
             else:
                 break
 
@@ -48,6 +76,7 @@ class IncrementalMerger:
             "合并所有分类",
             "通过文件合并",
             "选择单个分类",
+            "补全缺失hashname（API）",
             "退出程序"
         ])
 
@@ -70,7 +99,7 @@ class IncrementalMerger:
         """处理全部分类"""
         categories = self._get_all_categories()
         print(f"\n即将合并 {len(categories)} 个分类...")
-        self.process_categories(categories)
+        return self.process_categories(categories)
 
     def process_file_categories(self):
         """处理文件分类"""
@@ -117,6 +146,7 @@ class IncrementalMerger:
             except ValueError:
                 print("请输入数字")
 
+    @profiled('merge')
     def process_categories(self, categories):
         """处理分类列表（无进度条版本）"""
         total = len(categories)
@@ -125,15 +155,21 @@ class IncrementalMerger:
             'added': 0,
             'skipped': 0,
             'errors': 0,
-            'total_items': 0
+            'total_items': 0,
+            'renamed': 0,
+            'removed': 0
         }
 
         print(f"\n{self.colors['progress']}开始处理 {total} 个分类...")
 
+        renamed_ids = set()
         for idx, category in enumerate(categories, 1):
             try:
                 result = self.merge_category(category)
+                renamed_ids.update(result['renamed_ids'])
                 stats['total_items'] += result['total']
+                stats['renamed'] += result['changes'].get('renamed', 0)
+                stats['removed'] += result['changes'].get('removed', 0)
 
                 if result['added'] > 0:
                     stats['added'] += result['added']
@@ -147,6 +183,8 @@ class IncrementalMerger:
                 stats['errors'] += 1
                 print(f"{self.colors['error']}✖ [{idx}/{total}] {category.ljust(40)} 错误：{str(e)}")
 
+        self._export_renamed(renamed_ids)
+
         # 显示统计信息
         elapsed = perf_counter() - start_time
         print(f"\n{self.colors['stats']}合并完成！")
@@ -154,30 +192,98 @@ class IncrementalMerger:
         print(f"{self.colors['stats']}├─ 新增条目: {stats['added']}")
         print(f"{self.colors['stats']}├─ 跳过分类: {stats['skipped']}")
         print(f"{self.colors['stats']}├─ 错误分类: {stats['errors']}")
+        if stats['renamed'] or stats['removed']:
+            print(f"{self.colors['stats']}├─ 名称变更: {stats['renamed']}，下架: {stats['removed']}（见 {self.change_feed.feed_path}）")
         print(f"{self.colors['stats']}└─ 总条目数: {stats['total_items']}")
+        record_stage('merge', items=stats['total_items'], duration=elapsed, ok=stats['errors'] == 0,
+                     categories=total, added=stats['added'], renamed=stats['renamed'], removed=stats['removed'])
 
         # 执行最终统计
         self.execute_final_count()
+        self.execute_conflict_check()
+
+        stats['categories'] = total
+        stats['elapsed'] = round(elapsed, 2)
+        return stats
 
     def merge_category(self, category):
         """合并单个分类（返回统计结果）"""
         final_data = self._load_final_data(category)
-        original_count = len(final_data)
+        original_ids = set(final_data)
 
-        # 合并数据源
-        final_data = self._merge_buff_data(category, final_data)
-        final_data = self._merge_extract_data(category, final_data)
+        # 合并数据源（live 收集本次数据源中出现的条目，用于变更日志）
+        live = {'items': {}, 'total_count': None}
+        final_data = self._merge_buff_data(category, final_data, live)
+        final_data = self._merge_extract_data(category, final_data, live)
+        self._backfill_hashnames(final_data)
+        renamed = self._apply_renames(final_data, live['items'], original_ids)
 
         # 保存结果
-        new_additions = len(final_data) - original_count
+        added = [item for goods_id, item in final_data.items() if goods_id not in original_ids]
         self._save_final_data(category, final_data)
 
+        # API采集的条目数达到线上总数才视为完整采集，此时缺失的ID才能判定为下架
+        # （HTML补采的条目不计入，否则API漏页时HTML条目会凑满总数，把漏采的商品误判为下架）
+        api_count = sum(1 for item in live['items'].values() if item['source'] == 'BuffData')
+        complete = live['total_count'] is not None and api_count >= live['total_count']
+        changes = self.change_feed.record(category, added, renamed,
+                                          live_ids=live['items'] if complete else None,
+                                          final_ids=final_data.keys())
+
         return {
-            'added': new_additions,
+            'added': len(added),
             'total': len(final_data),
-            'category': category
+            'category': category,
+            'changes': changes,
+            'renamed_ids': [entry['goods_id'] for entry in renamed]
         }
 
+    def _export_renamed(self, renamed_ids):
+        """重新导出包含更名商品的全部分类
+
+        名称保存在目录库的全局商品表中，先于更名导出的其他分类的FinalExtract文件仍是旧名称，
+        冲突检查会据此误报。
+        """
+        if not renamed_ids:
+            return
+        affected = self.catalog.categories_of(renamed_ids)
+        for category in affected:
+            self._export_category(category)
+        print(f"{self.colors['stats']}已重新导出 {len(affected)} 个包含更名商品的分类")
+
+    @staticmethod
+    def _apply_renames(final_data, live_items, original_ids):
+        """以API数据为准更新已有条目的hashname/shortname，返回变更记录"""
+        renamed = []
+        for goods_id, current in live_items.items():
+            if goods_id not in original_ids or current.get('source') != 'BuffData':
+                continue
+            item = final_data[goods_id]
+            updates = {field: current[field] for field in NAME_FIELDS
+                       if current.get(field) and item.get(field) and current[field] != item[field]}
+            if updates:
+                renamed.append({'goods_id': goods_id,
+                                'old': {field: item[field] for field in updates},
+                                'new': updates})
+                item.update(updates)
+        return renamed
+
+    def backfill_hashnames_via_api(self):
+        """索引中找不到的hashname通过API逐个查询补全（限速，每次最多 API_LOOKUP_LIMIT 个）"""
+        missing = [goods_id for goods_id, _ in self.catalog.missing_hashname()]
+        print(f"\n目录库中缺失hashname的商品：{len(missing)} 个")
+        if not missing:
+            return
+
+        local = {g: self.hashname_index.get(g) for g in missing if self.hashname_index.get(g)}
+        remote = self.hashname_index.lookup_missing_per_id([g for g in missing if g not in local])
+        local.update(remote)
+
+        categories = self.catalog.set_hashnames(local)
+        for category in categories:
+            self._export_category(category)
+        print(f"{self.colors['success']}已补全 {len(local)} 个hashname，更新 {len(categories)} 个分类文件")
+
     def execute_final_count(self):
         """执行最终的统计函数"""
         print(f"\n{self.colors['progress']}正在更新统计数据...")
@@ -187,6 +293,15 @@ class IncrementalMerger:
         except Exception as e:
             print(f"{self.colors['error']}统计时发生错误：{str(e)}")
 
+    def execute_conflict_check(self):
+        """合并后增量检查跨数据源的hashname/shortname冲突"""
+        try:
+            conflicts = check_conflicts()
+            color = self.colors['warning'] if conflicts else self.colors['success']
+            print(f"{color}跨数据源冲突商品：{len(conflicts)} 个")
+        except Exception as e:
+            print(f"{self.colors['error']}冲突检查时发生错误：{str(e)}")
+
     # 以下是工具方法 ------------------------------------
 
     def _get_all_categories(self):
@@ -198,72 +313,82 @@ class IncrementalMerger:
         return sorted(cats)
 
     def _load_final_data(self, category):
-        """加载最终数据"""
+        """加载最终数据（优先读取目录库）"""
+        if self.catalog.has_category(category):
+            return self.catalog.load_category(category)
+
         final_path = os.path.join(self.final_dir, f"{category}.json")
         if os.path.exists(final_path):
-            with open(final_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return {item['goods_id']: item for item in data['data']}
+            items = _normalized_items(JsonIO.iter_array(final_path, 'data'), 'goods_id', category, final_path)
+            return {goods_id: dict(item, goods_id=goods_id) for goods_id, item in items}
         return {}
 
-    def _merge_buff_data(self, category, final_data):
+    def _merge_buff_data(self, category, final_data, live=None):
         """合并Buff数据"""
         buff_path = os.path.join(self.source_dirs['buff'], f"{category}.json")
         if not os.path.exists(buff_path):
             return final_data
 
-        with open(buff_path, 'r', encoding='utf-8') as f:
-            for item in json.load(f).get('items', []):
-                goods_id = str(item['id'])
-                if goods_id not in final_data:
-                    final_data[goods_id] = {
-                        'goods_id': goods_id,
-                        'hashname': item.get('hashname'),
-                        'shortname': item.get('shortname'),
-                        'source': 'BuffData',
-                        'created_at': datetime.now().isoformat()
-                    }
+        data = JsonIO.load(buff_path)
+        if live is not None:
+            live['total_count'] = data.get('meta', {}).get('total_count')
+        for goods_id, item in _normalized_items(data.get('items', []), 'id', category, buff_path):
+            if live is not None:
+                live['items'][goods_id] = {'hashname': item.get('hashname'), 'shortname': item.get('shortname'),
+                                           'source': 'BuffData'}
+            if goods_id not in final_data:
+                final_data[goods_id] = {
+                    'goods_id': goods_id,
+                    'hashname': item.get('hashname'),
+                    'shortname': item.get('shortname'),
+                    'source': 'BuffData',
+                    'created_at': datetime.now().isoformat()
+                }
         return final_data
 
-    def _merge_extract_data(self, category, final_data):
+    def _merge_extract_data(self, category, final_data, live=None):
         """合并Extract数据"""
         extract_path = os.path.join(self.source_dirs['extract'], f"{category}.json")
         if not os.path.exists(extract_path):
             return final_data
 
-        with open(extract_path, 'r', encoding='utf-8') as f:
-            for item in json.load(f).get('data', []):
-                goods_id = str(item.get('goods_id'))
-                if goods_id not in final_data:
-                    final_data[goods_id] = {
-                        'goods_id': goods_id,
-                        'shortname': item.get('shortname'),
-                        'source': 'ExtractHTML',
-                        'created_at': datetime.now().isoformat()
-                    }
+        items = JsonIO.load(extract_path).get('data', [])
+        for goods_id, item in _normalized_items(items, 'goods_id', category, extract_path):
+            if live is not None:
+                live['items'].setdefault(goods_id, {'shortname': item.get('shortname'), 'source': 'ExtractHTML'})
+            if goods_id not in final_data:
+                entry = {'goods_id': goods_id}
+                hashname = self.hashname_index.get(goods_id)
+                if hashname:
+                    entry['hashname'] = hashname
+                entry.update({
+                    'shortname': item.get('shortname'),
+                    'source': 'ExtractHTML',
+                    'created_at': datetime.now().isoformat()
+                })
+                final_data[goods_id] = entry
         return final_data
 
-    def _save_final_data(self, category, data):
-        """保存最终数据"""
-        output_path = os.path.join(self.final_dir, f"{category}.json")
-        output = {
-            "meta": {
-                "category": category,
-                "stats": {
-                    "total_items": len(data),
-                    "buff_items": sum(1 for v in data.values() if v['source'] == 'BuffData'),
-                    "extract_items": sum(1 for v in data.values() if v['source'] == 'ExtractHTML')
-                },
-                "last_updated": datetime.now().isoformat()
-            },
-            "data": list(data.values())
-        }
+    def _backfill_hashnames(self, final_data):
+        """用全局索引补全已有条目缺失的hashname"""
+        for goods_id, item in final_data.items():
+            if not item.get('hashname'):
+                hashname = self.hashname_index.get(goods_id)
+                if hashname:
+                    item['hashname'] = hashname
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+    def _save_final_data(self, category, data):
+        """保存最终数据（写入目录库并导出JSON）"""
+        self.catalog.upsert_category(category, data)
+        self._export_category(category)
 
+    def _export_category(self, category):
+        """导出分类JSON并以实际写出的条目数更新FinalExtract清单"""
+        path, total_items = self.catalog.export_category(category, self.final_dir)
+        self.manifest.record(category, path, total_items)
 
 if __name__ == "__main__":
+    enable_from_argv()
     try:
         # Windows系统编码设置
         if sys.platform.startswith('win'):
@@ -0,0 +1,73 @@
+"""id.json 与 id.bin 加载/查询耗时基准（合成商品数据）
+
+用法: python benchmarks/bench_binary_catalog.py [条目数 ...]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CatalogExport import open_writer
+from BinaryCatalog import BinaryCatalog
+
+
+def make_catalog(workdir, total, n_categories=129):
+    rng = random.Random(7)
+    categories = [f"category_{i:03d}" for i in range(n_categories)]
+    meta = {"total_items": total, "categories": {name: 0 for name in categories}}
+    writers = [open_writer('json', os.path.join(workdir, 'id.json'), meta),
+               open_writer('bin', os.path.join(workdir, 'id.bin'), meta)]
+    for goods_id in range(1, total + 1):
+        cats = sorted(rng.sample(categories, rng.choice((1, 1, 1, 2))))
+        for writer in writers:
+            writer.write(goods_id, f"饰品 | 皮肤 {goods_id}", cats, hashname=f"Item | Skin {goods_id}")
+    for writer in writers:
+        writer.close()
+
+
+def bench_json(path, queries):
+    start = time.perf_counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        index = {item['goods_id']: item for item in json.load(f)['data']}
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    for goods_id in queries:
+        index.get(str(goods_id))
+    return loaded, time.perf_counter() - start
+
+
+def bench_bin(path, queries):
+    start = time.perf_counter()
+    catalog = BinaryCatalog(path)
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    for goods_id in queries:
+        catalog.get(goods_id)
+    elapsed = time.perf_counter() - start
+    catalog.close()
+    return loaded, elapsed
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [100_000, 1_000_000]
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix="bench_binary_catalog_")
+        try:
+            make_catalog(workdir, size)
+            queries = [random.randrange(1, size + 1) for _ in range(100_000)]
+            for name, func, filename in (("json", bench_json, 'id.json'), ("bin", bench_bin, 'id.bin')):
+                path = os.path.join(workdir, filename)
+                loaded, elapsed = func(path, queries)
+                print(f"{size:>9} 条 | {name:<4} | 文件 {os.path.getsize(path) / 1024 / 1024:7.1f} MB"
+                      f" | 加载 {loaded * 1000:9.2f} ms | 10万次查询 {elapsed:6.2f}s")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""分类树解析基准：BeautifulSoup整页解析 vs 只解析 #j_h1z1-selType 子树（合成市场页面）
+
+用法: python benchmarks/bench_category_parse.py [页面MB数] [--position head|tail]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CategoryTree import parse_category_tree, CONTAINER_ID
+
+
+def make_page(size_mb, position):
+    """13个主分类 × 10个子分类的容器，前后填充商品列表使页面达到指定大小"""
+    items = []
+    for main in range(13):
+        lis = ''.join(f'<li value="weapon_{main}_{sub}"><span>武器&nbsp;{main}-{sub}</span></li>'
+                      for sub in range(10))
+        items.append(f'<div class="item w-SelType"><p>主分类{main}</p><ul class="cols">{lis}</ul></div>')
+    container = f'<div class="w-Select-Multi" id="{CONTAINER_ID}">{"".join(items)}</div>'
+
+    row = ('<li class="card"><a href="/goods/1"><img src="a.png"><h3>AK-47 | 红线 (久经沙场)</h3>'
+           '<p><strong class="f_Strong">¥ 120.5</strong><span class="l_Right">在售 1024</span></p></a></li>\n')
+    filler = row * (size_mb * 1024 * 1024 // len(row.encode('utf-8')))
+    body = (container + filler) if position == 'head' else (filler + container)
+    return f'<!DOCTYPE html><html><head><title>BUFF</title></head><body>{body}</body></html>'
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bs4_parse(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'lxml')
+    container = soup.find('div', {'id': CONTAINER_ID})
+    return [{
+        "main_category": div.p.text.strip(),
+        "sub_categories": [{"name": li.text.strip().replace('\xa0', ' '), "value": li.get('value', '')}
+                           for li in div.find_all('li')]
+    } for div in container.find_all('div', class_='item')]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('size_mb', nargs='?', type=int, default=5)
+    parser.add_argument('--position', choices=['head', 'tail'], default='tail', help="分类容器在页面中的位置")
+    args = parser.parse_args()
+
+    html = make_page(args.size_mb, args.position)
+    chunks = [html[i:i + 64 * 1024] for i in range(0, len(html), 64 * 1024)]
+    print(f"页面大小: {len(html.encode('utf-8')) / 1024 / 1024:.1f} MB，容器位置: {args.position}")
+
+    t_stream, result = timed(lambda: parse_category_tree(iter(chunks)))
+    print(f"子树流式解析   : {t_stream * 1000:8.1f} ms（{len(result)} 个主分类）")
+
+    try:
+        t_bs4, expected = timed(lambda: bs4_parse(html), repeat=1)
+    except ImportError:
+        print("BeautifulSoup : 未安装，跳过对比")
+        return 0
+    print(f"BeautifulSoup : {t_bs4 * 1000:8.1f} ms")
+    print(f"加速比: {t_bs4 / t_stream:.1f}x，结果一致: {result == expected}")
+    return 0 if result == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
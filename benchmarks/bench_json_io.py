@@ -0,0 +1,126 @@
+"""整条离线流水线的JSON读写基准：旧写法（标准库 indent=2 直接覆盖）vs JsonIO 各后端/模式
+
+每种模式在独立的临时目录中依次执行 汇总 -> HTML分析 -> 合并 -> 最终统计 -> ID列表。
+用法: python benchmarks/bench_json_io.py [条目数] [--categories N]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JsonIO
+
+
+def make_sources(root, total_items, categories):
+    """BuffData（API格式）与 BuffDataByExtractHTML（HTML提取格式），约5%跨分类重复"""
+    rng = random.Random(7)
+    per_category = total_items // categories
+    os.makedirs(os.path.join(root, 'BuffData'))
+    os.makedirs(os.path.join(root, 'BuffDataByExtractHTML'))
+    next_id = 100000
+    for c in range(categories):
+        name = f"weapon_{c:03d}"
+        items = []
+        for _ in range(per_category):
+            if rng.random() < 0.05:
+                goods_id = rng.randrange(100000, next_id + 1)
+            else:
+                next_id += 1
+                goods_id = next_id
+            items.append({"id": goods_id, "hashname": f"Weapon {c} | Skin {goods_id} (Field-Tested)",
+                          "shortname": f"武器 {c} | 皮肤 {goods_id}"})
+        with open(os.path.join(root, 'BuffData', f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump({"meta": {"collection_time": "2025-01-01T00:00:00", "total_count": len(items),
+                                "collected": len(items), "success_rate": "100.00%"}, "items": items},
+                      f, ensure_ascii=False, indent=2)
+        html_items = [{"goods_id": str(i["id"]), "shortname": i["shortname"]} for i in items[::3]]
+        with open(os.path.join(root, 'BuffDataByExtractHTML', f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump({"meta": {"category": name, "total_pages": 1, "total_items": len(html_items)},
+                       "data": html_items}, f, ensure_ascii=False, indent=2)
+
+
+def run_pipeline():
+    from IncrementalSummary import refresh_summary
+    from Buff_MetaDataByHtml import process_summary
+    from TwoBuffDataExtract import IncrementalMerger
+    from GOODS_ID import process_final_extract
+
+    timings = {}
+    for name, func in (
+        ('summary', lambda: refresh_summary("BuffData", "SummaryData")),
+        ('html_summary', process_summary),
+        ('merge', lambda: IncrementalMerger().process_all_categories()),   # 含最终统计
+        ('ids', lambda: process_final_extract(formats=("json",))),
+    ):
+        start = time.perf_counter()
+        func()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+@contextlib.contextmanager
+def json_mode(backend, pretty, fsync):
+    saved = JsonIO.orjson, JsonIO.PRETTY, JsonIO.FSYNC
+    JsonIO.orjson = saved[0] if backend == 'orjson' else None
+    JsonIO.PRETTY, JsonIO.FSYNC = pretty, fsync
+    try:
+        yield
+    finally:
+        JsonIO.orjson, JsonIO.PRETTY, JsonIO.FSYNC = saved
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('items', nargs='?', type=int, default=200000)
+    parser.add_argument('--categories', type=int, default=129)
+    args = parser.parse_args()
+
+    modes = [('旧写法对照(json, indent=2, 无fsync)', 'json', True, False),
+             ('json 紧凑 + 原子写入', 'json', False, True),
+             ('json 紧凑 + 原子写入(无fsync)', 'json', False, False)]
+    if JsonIO.orjson is not None:
+        modes += [('orjson 紧凑 + 原子写入', 'orjson', False, True),
+                  ('orjson 紧凑 + 原子写入(无fsync)', 'orjson', False, False)]
+    else:
+        print("未安装 orjson，仅对比标准库后端")
+
+    source = tempfile.mkdtemp(prefix='bench_json_src_')
+    make_sources(source, args.items, args.categories)
+    print(f"合成数据: {args.items} 条，{args.categories} 个分类")
+
+    cwd = os.getcwd()
+    baseline = None
+    try:
+        for label, backend, pretty, fsync in modes:
+            work = tempfile.mkdtemp(prefix='bench_json_run_')
+            shutil.copytree(os.path.join(source, 'BuffData'), os.path.join(work, 'BuffData'))
+            shutil.copytree(os.path.join(source, 'BuffDataByExtractHTML'),
+                            os.path.join(work, 'BuffDataByExtractHTML'))
+            os.chdir(work)
+            try:
+                with json_mode(backend, pretty, fsync), contextlib.redirect_stdout(io.StringIO()):
+                    timings = run_pipeline()
+                size = sum(os.path.getsize(os.path.join(d, f)) for d in ('FinalExtract', 'SummaryData')
+                           for f in os.listdir(d))
+            finally:
+                os.chdir(cwd)
+                shutil.rmtree(work, ignore_errors=True)
+            total = sum(timings.values())
+            baseline = baseline or total
+            stages = ' '.join(f"{k}={v:.2f}s" for k, v in timings.items())
+            print(f"{label:<34} 总计 {total:6.2f}s（{baseline / total:4.2f}x）输出 {size / 1024 / 1024:6.1f} MB | {stages}")
+    finally:
+        shutil.rmtree(source, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
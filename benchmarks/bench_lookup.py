@@ -0,0 +1,89 @@
+"""GoodsLookup 查询吞吐与延迟基准（合成商品数据）
+
+用法: python benchmarks/bench_lookup.py [商品数] [--http]
+"""
+import os
+import sys
+import json
+import time
+import random
+import threading
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http.server import ThreadingHTTPServer
+from GoodsLookup import GoodsLookup, make_handler
+
+WEAPONS = ["AK-47", "M4A4", "AWP", "USP-S", "格洛克 18 型", "沙漠之鹰", "蝴蝶刀", "爪子刀"]
+SKINS = ["红线", "二西莫夫", "龙王", "野火", "霓虹革命", "血腥运动", "渐变之色", "多普勒", "传承", "皇后"]
+WEARS = ["崭新出厂", "略有磨损", "久经沙场", "破损不堪", "战痕累累"]
+WEARS_EN = ["Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred"]
+
+
+def make_records(total):
+    rng = random.Random(7)
+    records = []
+    for goods_id in range(total):
+        weapon, skin, wear = rng.choice(WEAPONS), rng.choice(SKINS), rng.randrange(len(WEARS))
+        records.append({
+            "goods_id": str(goods_id),
+            "hashname": f"{weapon} | Skin{goods_id} ({WEARS_EN[wear]})",
+            "shortname": f"{weapon} | {skin}{goods_id % 997} ({WEARS[wear]})",
+            "categories": [f"category_{goods_id % 129:03d}"]
+        })
+    return records
+
+
+def run(name, func, queries):
+    latencies = []
+    start = time.perf_counter()
+    for query in queries:
+        t = time.perf_counter()
+        func(query)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"{name:<14} | QPS {len(queries) / elapsed:>10.0f} | p50 {p50:8.1f}us | p99 {p99:8.1f}us")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    total = int(args[0]) if args else 100_000
+    records = make_records(total)
+
+    start = time.perf_counter()
+    lookup = GoodsLookup(records)
+    print(f"构建索引：{total} 个商品，耗时 {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(11)
+    sample = [records[rng.randrange(total)] for _ in range(20_000)]
+    run("exact id", lookup.get, [r["goods_id"] for r in sample])
+    run("exact hashname", lookup.by_hash, [r["hashname"] for r in sample])
+    run("exact short", lookup.by_short, [r["shortname"] for r in sample])
+    run("prefix", lookup.prefix, [r["shortname"][:8] for r in sample[:5000]])
+    # 模糊：去掉一个字符模拟输入错误
+    fuzzy = [s[:3] + s[4:] for s in (r["shortname"] for r in sample[:2000])]
+    run("fuzzy", lookup.fuzzy, fuzzy)
+
+    if '--http' in sys.argv:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(lookup))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        def fetch(path):
+            with urllib.request.urlopen(base + path) as resp:
+                return json.load(resp)
+
+        run("http hashname", fetch,
+            ["/hashname?q=" + urllib.parse.quote(r["hashname"]) for r in sample[:2000]])
+        run("http fuzzy", fetch,
+            ["/fuzzy?q=" + urllib.parse.quote(q) for q in fuzzy[:1000]])
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
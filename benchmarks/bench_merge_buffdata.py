@@ -0,0 +1,102 @@
+"""merge_buffdata 内存/耗时基准（10万 / 100万 合成条目）
+
+用法: python benchmarks/bench_merge_buffdata.py [条目数 ...]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import contextlib
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Buff_MetaData import merge_buffdata
+
+
+def legacy_merge_buffdata(source_dir, output_dir):
+    """旧版实现（set + defaultdict + lambda排序），仅用于对比"""
+    total_count = 0
+    collected_ids = set()
+    all_items = []
+    duplicates = defaultdict(list)
+    id_records = defaultdict(lambda: {'count': 0, 'files': set(), 'sample': None})
+    os.makedirs(output_dir, exist_ok=True)
+    for filename in os.listdir(source_dir):
+        with open(os.path.join(source_dir, filename), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        total_count += data.get('meta', {}).get('total_count', 0)
+        for item in data.get('items', []):
+            item_id = item['id']
+            if item_id in collected_ids:
+                id_records[item_id]['count'] += 1
+                id_records[item_id]['files'].add(filename)
+                duplicates[item_id].append(item)
+            else:
+                collected_ids.add(item_id)
+                id_records[item_id] = {'count': 1, 'files': {filename}, 'sample': item}
+                all_items.append(item)
+    result = {"meta": {"total_count": total_count}, "items": sorted(all_items, key=lambda x: x['id'])}
+    report = [{"id": k, "count": v['count'], "files": list(v['files']), "sample_item": v['sample']}
+              for k, v in id_records.items() if v['count'] > 1]
+    with open(os.path.join(output_dir, "summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(output_dir, "duplicates.json"), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def make_dataset(root, total_items, files=129, dup_ratio=0.05):
+    rng = random.Random(42)
+    per_file = total_items // files
+    unique_pool = int(total_items * (1 - dup_ratio))
+    next_id = 0
+    for i in range(files):
+        items = []
+        for _ in range(per_file):
+            if next_id < unique_pool and rng.random() > dup_ratio:
+                goods_id = next_id
+                next_id += 1
+            else:
+                goods_id = rng.randrange(max(next_id, 1))
+            items.append({"id": goods_id, "hashname": f"Item | Skin {goods_id}", "shortname": f"饰品{goods_id}"})
+        with open(os.path.join(root, f"category_{i:03d}.json"), 'w', encoding='utf-8') as f:
+            json.dump({"meta": {"total_count": len(items)}, "items": items}, f, ensure_ascii=False)
+
+
+def measure(func, source_dir, output_dir):
+    """分两次运行：计时不开tracemalloc（其开销会扭曲耗时），再单独测峰值内存"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func(source_dir, output_dir)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        func(source_dir, output_dir)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [100_000, 1_000_000]
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix="bench_merge_")
+        try:
+            source = os.path.join(workdir, "BuffData")
+            os.makedirs(source)
+            make_dataset(source, size)
+            for name, func in (("legacy", legacy_merge_buffdata), ("numpy", merge_buffdata)):
+                out = os.path.join(workdir, f"out_{name}")
+                elapsed, peak = measure(func, source, out)
+                print(f"{size:>9} 条 | {name:<6} | 耗时 {elapsed:7.2f}s | 峰值内存 {peak:8.1f} MB")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
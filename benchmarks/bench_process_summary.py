@@ -0,0 +1,99 @@
+"""process_summary 内存/耗时基准（合成HTML提取数据）
+
+用法: python benchmarks/bench_process_summary.py [条目数 ...]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import contextlib
+import tracemalloc
+from datetime import datetime
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Buff_MetaDataByHtml import process_summary
+
+
+def legacy_process_summary(input_dir, output_dir):
+    """旧版实现（all_items + item_registry + 两次循环），仅用于对比"""
+    os.makedirs(output_dir, exist_ok=True)
+    all_items = []
+    item_registry = defaultdict(list)
+    for filename in os.listdir(input_dir):
+        with open(os.path.join(input_dir, filename), 'r', encoding='utf-8') as f:
+            items = json.load(f)['data']
+        all_items.extend(items)
+        for item in items:
+            item_registry[item['goods_id']].append({"file": filename, "item": item})
+    seen_ids = {}
+    summary_data = []
+    for item in all_items:
+        if item['goods_id'] not in seen_ids:
+            seen_ids[item['goods_id']] = True
+            summary_data.append(item)
+    duplicates = [{"goods_id": k, "count": len(v), "files": [r['file'] for r in v], "sample_item": v[0]['item']}
+                  for k, v in item_registry.items() if len(v) > 1]
+    for filename, data in [('summary.json', summary_data), ('duplicates.json', duplicates)]:
+        with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump({"meta": {"generated_time": datetime.now().isoformat(), "total_items": len(data),
+                                "duplicate_count": len(duplicates)}, "data": data}, f, ensure_ascii=False, indent=2)
+
+
+def make_dataset(root, total_items, files=129, dup_ratio=0.05):
+    rng = random.Random(7)
+    per_file = total_items // files
+    next_id = 0
+    for i in range(files):
+        items = []
+        for _ in range(per_file):
+            if next_id and rng.random() < dup_ratio:
+                goods_id = rng.randrange(next_id)
+            else:
+                goods_id = next_id
+                next_id += 1
+            items.append({"goods_id": str(goods_id), "shortname": f"饰品 | 皮肤 {goods_id}"})
+        with open(os.path.join(root, f"category_{i:03d}.json"), 'w', encoding='utf-8') as f:
+            json.dump({"meta": {"category": f"category_{i:03d}", "total_items": len(items)}, "data": items},
+                      f, ensure_ascii=False)
+
+
+def measure(func, input_dir, output_dir):
+    """计时与峰值内存分开测量，避免tracemalloc开销影响耗时"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func(input_dir, output_dir)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        func(input_dir, output_dir)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [100_000, 1_000_000]
+    cwd = os.getcwd()
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix="bench_html_summary_")
+        os.chdir(workdir)   # 阶段状态等相对路径输出写入临时目录
+        try:
+            source = os.path.join(workdir, "BuffDataByExtractHTML")
+            os.makedirs(source)
+            make_dataset(source, size)
+            for name, func in (("legacy", legacy_process_summary), ("stream", process_summary)):
+                elapsed, peak = measure(func, source, os.path.join(workdir, f"out_{name}"))
+                print(f"{size:>9} 条 | {name:<6} | 耗时 {elapsed:7.2f}s | 峰值内存 {peak:8.1f} MB")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""快照存储基准：数百次采集的占用 vs 去重后的唯一数据量，以及快照创建/恢复耗时
+
+每次"采集"随机改写一小部分分类文件，其余保持不变。
+用法: python benchmarks/bench_snapshots.py [快照次数] [--files N] [--items N] [--change 比例]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Snapshots import SnapshotStore
+
+
+def write_category(path, rng, items):
+    data = [{"id": rng.randrange(10 ** 6), "hashname": f"Weapon | Skin {rng.randrange(10 ** 6)} (Field-Tested)",
+             "shortname": f"武器 | 皮肤 {rng.randrange(10 ** 6)}"} for _ in range(items)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"meta": {"total_count": items, "collected": items}, "items": data}, f, ensure_ascii=False, indent=2)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('runs', nargs='?', type=int, default=300)
+    parser.add_argument('--files', type=int, default=129)
+    parser.add_argument('--items', type=int, default=400, help="每个分类文件的条目数")
+    parser.add_argument('--change', type=float, default=0.03, help="每次采集改写的文件比例")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    workdir = tempfile.mkdtemp(prefix='bench_snapshots_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        os.makedirs('BuffData')
+        names = [os.path.join('BuffData', f"category_{i:03d}.json") for i in range(args.files)]
+        unique = sum(write_category(p, rng, args.items) for p in names)
+
+        store = SnapshotStore()
+        create_times = []
+        for run in range(args.runs):
+            if run:
+                for path in rng.sample(names, max(1, int(len(names) * args.change))):
+                    unique += write_category(path, rng, args.items)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                store.create(label=f"run{run}")
+            create_times.append(time.perf_counter() - start)
+
+        usage = store.usage()
+        first = store.list()[0]['id']
+        shutil.rmtree('BuffData')
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.restore(first)
+        restore_time = time.perf_counter() - start
+
+        mb = 1024 * 1024
+        print(f"{args.runs} 次快照，{args.files} 个分类文件，每次改写 {args.change:.0%}")
+        print(f"逻辑数据总量（全量副本）: {usage['logical_bytes'] / mb:9.1f} MB")
+        print(f"唯一文件内容（未压缩）  : {unique / mb:9.1f} MB")
+        print(f"快照实际占用            : {usage['stored_bytes'] / mb:9.1f} MB"
+              f"（全量副本的 {usage['stored_bytes'] / usage['logical_bytes']:.2%}）")
+        print(f"创建耗时: 首次 {create_times[0] * 1000:.0f} ms，之后平均 "
+              f"{sum(create_times[1:]) / max(1, len(create_times) - 1) * 1000:.0f} ms")
+        print(f"完整恢复最早的快照: {restore_time * 1000:.0f} ms")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
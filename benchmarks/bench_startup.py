@@ -0,0 +1,66 @@
+"""入口冷启动导入耗时基准（python -X importtime），超出预算或加载了重依赖时返回非0
+
+用法: python benchmarks/bench_startup.py [--budget-ms 毫秒] [--runs 次数]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 菜单渲染与状态查询不应加载的第三方依赖
+HEAVY_MODULES = ('bs4', 'lxml', 'requests', 'playwright', 'numpy', 'colorama', 'pyarrow', 'msgpack')
+
+SCENARIOS = {
+    'menu': "import BUFF_SCRIPT, Account_Freeze_Judgment; "
+            "Account_Freeze_Judgment.AccountStatusCache; BUFF_SCRIPT.system_status()",
+    'status': "import BuffCLI; BuffCLI.build_parser(); "
+              "import BUFF_SCRIPT; BUFF_SCRIPT.status_report()",
+    'cleanup': "import BUFF_SCRIPT; BUFF_SCRIPT.cleanup_system",
+}
+
+
+def measure(code):
+    """返回 (入口模块累计导入耗时ms, 已导入模块列表)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total_us = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        modules.append(name.strip())
+        # 顶层导入（只有一个前导空格）的累计值之和即为整体导入耗时
+        if not name.startswith('  '):
+            total_us += int(cumulative_us)
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入口冷启动导入耗时预算检查")
+    parser.add_argument('--budget-ms', type=float, default=100.0, help="每个场景的导入耗时预算")
+    parser.add_argument('--runs', type=int, default=5, help="每个场景运行次数（取最小值）")
+    args = parser.parse_args()
+
+    failed = False
+    for name, code in SCENARIOS.items():
+        timings = []
+        for _ in range(args.runs):
+            elapsed, modules = measure(code)
+            timings.append(elapsed)
+        best = min(timings)
+        heavy = sorted({m.split('.')[0] for m in modules if m.split('.')[0] in HEAVY_MODULES})
+        ok = best <= args.budget_ms and not heavy
+        failed |= not ok
+        print(f"{name:<8} | 导入 {best:7.1f} ms（预算 {args.budget_ms:.0f} ms）| 模块数 {len(modules):4d}"
+              f" | 重依赖 {', '.join(heavy) or '-'} | {'OK' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# 各模块均为仓库根目录下的平铺脚本
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """在临时目录中运行（各模块使用 BuffData/、BuffStats/ 等相对路径）"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,62 @@
+import pytest
+
+from BinaryCatalog import BinaryCatalog, BinaryCatalogWriter
+
+CATEGORIES = [f"cat{i}" for i in range(11)]   # 超过8个分类，位图占两字节
+ROWS = [
+    (3, "AK-47 | 红线", ["cat0", "cat10"], "AK-47 | Redline (Field-Tested)"),
+    (17, "", ["cat5"], None),
+    (2 ** 40, "大ID", CATEGORIES, "Big"),
+]
+
+
+def _meta(rows=ROWS):
+    return {"total_items": len(rows), "categories": {c: 1 for c in CATEGORIES}}
+
+
+def _write(path, rows=ROWS):
+    writer = BinaryCatalogWriter(str(path), _meta(rows))
+    for goods_id, shortname, categories, hashname in rows:
+        writer.write(goods_id, shortname, categories, hashname=hashname)
+    writer.close()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'id.bin'
+    _write(path)
+    with BinaryCatalog(str(path)) as catalog:
+        assert len(catalog) == len(ROWS)
+        assert catalog.meta == _meta()
+        assert catalog.categories == sorted(CATEGORIES)
+        for goods_id, shortname, categories, hashname in ROWS:
+            assert catalog.get(goods_id) == {
+                'goods_id': str(goods_id),
+                'hashname': hashname,
+                'shortname': shortname,
+                'categories': sorted(categories)
+            }
+        assert catalog.get(4) is None
+        assert 17 in catalog and '17' in catalog
+        assert [item['goods_id'] for item in catalog] == [str(r[0]) for r in ROWS]
+        assert list(catalog.category_ids('cat10')) == [3, 2 ** 40]
+
+
+def test_count_mismatch_keeps_existing_file(tmp_path):
+    path = tmp_path / 'id.bin'
+    _write(path)
+    before = path.read_bytes()
+
+    writer = BinaryCatalogWriter(str(path), _meta())
+    writer.write(*ROWS[0][:3], hashname=ROWS[0][3])
+    with pytest.raises(ValueError):
+        writer.close()
+    assert path.read_bytes() == before
+    assert [p.name for p in tmp_path.iterdir()] == ['id.bin']
+
+
+def test_requires_ascending_ids(tmp_path):
+    writer = BinaryCatalogWriter(str(tmp_path / 'id.bin'), _meta())
+    writer.write(17, "", ["cat0"])
+    with pytest.raises(ValueError):
+        writer.write(3, "", ["cat0"])
+    writer.abort()
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+import FinalManifest
+from FinalManifest import stream_count
+
+
+def _final_extract(items):
+    return json.dumps({"meta": {"category": "c", "stats": {"total_items": len(items)}}, "data": items},
+                      ensure_ascii=False, indent=2)
+
+
+ITEMS = [
+    {"goods_id": str(1000 + i), "shortname": f"商品 {i}", "source": "BuffData"} for i in range(50)
+] + [
+    # 字符串值中转义的 "goods_id": 不计入
+    {"goods_id": "9", "shortname": "名称含 \"goods_id\": 字样", "source": "ExtractHTML"},
+    {"goods_id": "10", "shortname": "结尾反斜杠\\", "source": "ExtractHTML"},
+]
+
+
+@pytest.mark.parametrize('chunk_size', [8, 9, 13, 64, 65, 100, 1 << 20])
+def test_stream_count_chunk_boundaries(tmp_path, monkeypatch, chunk_size):
+    """块边界落在键中间或重叠区时既不漏计也不重复计数"""
+    monkeypatch.setattr(FinalManifest, 'CHUNK_SIZE', chunk_size)
+    path = tmp_path / 'c.json'
+    path.write_text(_final_extract(ITEMS), encoding='utf-8')
+    assert stream_count(str(path)) == len(ITEMS)
+
+
+def test_stream_count_compact_and_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr(FinalManifest, 'CHUNK_SIZE', 16)
+    path = tmp_path / 'c.json'
+    path.write_text(json.dumps({"meta": {}, "data": ITEMS}, separators=(',', ':')), encoding='utf-8')
+    assert stream_count(str(path)) == len(ITEMS)
+    path.write_text(_final_extract([]), encoding='utf-8')
+    assert stream_count(str(path)) == 0
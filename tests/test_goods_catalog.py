@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import JsonIO
+from GoodsCatalog import GoodsCatalog
+
+
+def _item(goods_id, shortname=None, hashname=None, source='BuffData', created_at='2024-01-01T00:00:00'):
+    return {'goods_id': goods_id, 'hashname': hashname, 'shortname': shortname,
+            'source': source, 'created_at': created_at}
+
+
+def _items(*items):
+    return {str(item['goods_id']): item for item in items}
+
+
+@pytest.fixture
+def catalog(workdir):
+    catalog = GoodsCatalog(os.path.join('Catalog', 'test.db'))
+    yield catalog
+    catalog.close()
+
+
+def test_upsert_keeps_existing_values_on_null(catalog):
+    """COALESCE：新值为空时保留旧值，非空时覆盖"""
+    catalog.upsert_category('a', _items(_item('1', 'old', 'Hash One'), _item('2', 'two')))
+    catalog.upsert_category('a', _items(_item('1', 'new', None), _item('2', None, 'Hash Two')))
+
+    data = catalog.load_category('a')
+    assert data['1']['shortname'] == 'new'
+    assert data['1']['hashname'] == 'Hash One'
+    assert data['2']['shortname'] == 'two'
+    assert data['2']['hashname'] == 'Hash Two'
+    assert catalog.missing_hashname() == []
+
+
+def test_upsert_skips_invalid_ids(catalog, capsys):
+    items = _items(_item('5', 'five'), _item('None', 'bad'), _item('abc', 'bad'))
+    items['missing'] = _item(None, 'bad')
+    catalog.upsert_category('a', items)
+    assert catalog.goods_ids() == ['5']
+    assert catalog.category_counts() == {'a': 1}
+    assert '跳过 3 个无效商品ID' in capsys.readouterr().out
+
+
+def test_load_export_round_trip(catalog):
+    """导出的FinalExtract文件可原样导入新目录库"""
+    items = _items(_item('30', 'thirty', 'H30', 'ExtractHTML'), _item(4, 'four'), _item('007', 'seven', 'H7'))
+    catalog.upsert_category('a', items)
+    loaded = catalog.load_category('a')
+    assert list(loaded) == ['30', '4', '7']
+    assert loaded['4'] == {'goods_id': '4', 'shortname': 'four', 'source': 'BuffData',
+                           'created_at': '2024-01-01T00:00:00'}
+
+    path, count = catalog.export_category('a', 'Out')
+    exported = JsonIO.load(path)
+    assert count == exported['meta']['stats']['total_items'] == 3
+    assert exported['meta']['stats']['buff_items'] == 2
+    assert exported['meta']['stats']['extract_items'] == 1
+    assert exported['data'] == list(loaded.values())
+
+    with GoodsCatalog(os.path.join('Catalog', 'copy.db'), import_dir='Out') as copy:
+        assert copy.load_category('a') == loaded
+
+
+def test_duplicate_ids(catalog):
+    catalog.upsert_category('b', _items(_item('1'), _item('2'), _item('3')))
+    catalog.upsert_category('a', _items(_item('2'), _item('3')))
+    catalog.upsert_category('c', _items(_item('3'), _item('4')))
+    catalog.upsert_category('c', _items(_item('3')))
+
+    assert catalog.duplicate_ids() == [('2', ['a', 'b']), ('3', ['a', 'b', 'c'])]
+    assert catalog.distinct_goods_count() == 4
+    assert catalog.categories_of(['4', 'None']) == ['c']
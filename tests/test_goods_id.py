@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+
+import JsonIO
+from BinaryCatalog import BinaryCatalog, BinaryCatalogWriter
+from CatalogExport import iter_ndjson
+from GoodsCatalog import GoodsCatalog
+from GOODS_ID import process_final_extract
+
+
+def _items(*ids, source='BuffData'):
+    return {str(i): {'goods_id': str(i), 'shortname': f'商品{i}', 'hashname': f'H{i}', 'source': source}
+            for i in ids}
+
+
+def _setup():
+    with GoodsCatalog() as catalog:
+        catalog.upsert_category('rifle', _items(3, 10, 200))
+        catalog.upsert_category('ak', _items(10, 3))
+        catalog.upsert_category('knife', _items(7, 'None'))
+    # 未导入目录库的FinalExtract分类同样参与归并
+    JsonIO.dump({'meta': {'category': 'manual'},
+                 'data': [{'goods_id': '200', 'shortname': '商品200'}, {'goods_id': '1', 'shortname': '商品1'}]},
+                os.path.join('FinalExtract', 'manual.json'))
+
+
+def test_cross_category_dedupe(workdir):
+    _setup()
+    assert process_final_extract('id.json', formats=('json', 'ndjson', 'bin'))
+
+    data = JsonIO.load('id.json')
+    assert data['meta']['total_items'] == 5
+    assert data['meta']['total_memberships'] == 8
+    assert data['meta']['categories'] == {'ak': 2, 'knife': 1, 'manual': 2, 'rifle': 3}
+    expected = [('1', ['manual']), ('3', ['ak', 'rifle']), ('7', ['knife']),
+                ('10', ['ak', 'rifle']), ('200', ['manual', 'rifle'])]
+    assert [(item['goods_id'], item['categories']) for item in data['data']] == expected
+
+    assert [(str(item['goods_id']), item['categories']) for item in iter_ndjson('id.ndjson')] == expected
+    with BinaryCatalog('id.bin') as catalog:
+        assert [(item['goods_id'], item['categories']) for item in catalog] == expected
+        assert catalog.get(200)['hashname'] == 'H200'
+
+
+def test_failed_format_publishes_nothing(workdir, monkeypatch):
+    """任一格式在写完阶段失败时，其他格式也不替换已有文件"""
+    _setup()
+    assert process_final_extract('id.json', formats=('json', 'ndjson'))
+    before = {name: Path(name).read_bytes() for name in ('id.json', 'id.ndjson')}
+
+    with GoodsCatalog() as catalog:
+        catalog.upsert_category('rifle', _items(500))
+
+    def fail(self):
+        raise OSError("磁盘已满")
+    monkeypatch.setattr(BinaryCatalogWriter, 'finish', fail)
+    assert not process_final_extract('id.json', formats=('json', 'ndjson', 'bin'))
+
+    assert {name: Path(name).read_bytes() for name in before} == before
+    assert not os.path.exists('id.bin')
+    assert sorted(os.listdir('.')) == ['BuffStats', 'Catalog', 'FinalExtract', 'id.json', 'id.ndjson']
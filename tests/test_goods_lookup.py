@@ -0,0 +1,93 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from GoodsCatalog import GoodsCatalog
+from GoodsLookup import GoodsLookup, make_handler, MAX_LIMIT
+
+RECORDS = [
+    {'goods_id': 1, 'hashname': 'AK-47 | Redline (Field-Tested)', 'shortname': 'AK-47 | 红线'},
+    {'goods_id': 2, 'hashname': 'AK-47 | Redline (Minimal Wear)', 'shortname': 'AK-47 | 红线 (略有磨损)'},
+    {'goods_id': 3, 'hashname': 'AWP | Dragon Lore', 'shortname': 'AWP | 巨龙传说'},
+    {'goods_id': 4, 'hashname': 'sticker', 'shortname': 'Sticker'},
+]
+
+
+@pytest.fixture
+def lookup():
+    return GoodsLookup([dict(r) for r in RECORDS])
+
+
+def _ids(records):
+    return [str(r['goods_id']) for r in records]
+
+
+def test_exact(lookup):
+    assert lookup.get(3) is lookup.get('3')
+    assert lookup.by_hash('awp | dragon lore')['goods_id'] == 3
+    assert lookup.by_hash('missing') is None
+    assert _ids(lookup.by_short('ak-47|红线')) == ['1']
+
+
+def test_prefix(lookup):
+    assert _ids(lookup.prefix('AK-47 | ')) == ['1', '2']
+    assert _ids(lookup.prefix('ak-47|红线')) == ['1', '2']
+    assert _ids(lookup.prefix('AK', limit=1)) == ['1']
+    assert lookup.prefix('zzz') == []
+
+
+def test_fuzzy(lookup):
+    results = lookup.fuzzy('巨龙传说')
+    assert results[0]['goods_id'] == 3
+    assert 0 < results[0]['score'] <= 1
+    assert lookup.fuzzy('') == []
+
+
+def test_postings_once_per_record(lookup):
+    """hashname 与 shortname 相同的gram只记一次"""
+    assert lookup.postings['ck'] == ['4']
+    assert lookup.postings['ak'] == ['1', '2']
+
+
+def test_from_catalog(workdir):
+    with GoodsCatalog() as catalog:
+        catalog.upsert_category('rifle', {'1': {'goods_id': '1', 'hashname': 'H1', 'shortname': '步枪',
+                                                'source': 'BuffData'}})
+        catalog.upsert_category('ak', {'1': {'goods_id': '1', 'shortname': '步枪', 'source': 'ExtractHTML'}})
+    lookup = GoodsLookup.from_catalog()
+    assert lookup.get(1) == {'goods_id': '1', 'hashname': 'H1', 'shortname': '步枪', 'categories': ['ak', 'rifle']}
+    assert lookup.by_hash('h1')['goods_id'] == '1'
+
+
+@pytest.fixture
+def server(lookup):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(lookup))
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize('limit', ['0', '-1', str(MAX_LIMIT + 1), 'abc'])
+def test_http_rejects_bad_limit(server, limit):
+    status, body = _get(f'{server}/prefix?q=ak&limit={limit}')
+    assert status == 400
+    assert 'limit' in body['error']
+
+
+def test_http_queries(server):
+    assert _get(f'{server}/prefix?q=ak&limit={MAX_LIMIT}') == (200, [dict(RECORDS[0]), dict(RECORDS[1])])
+    assert _get(f'{server}/goods/3')[1]['hashname'] == 'AWP | Dragon Lore'
+    assert _get(f'{server}/goods/99')[0] == 404
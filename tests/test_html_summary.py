@@ -0,0 +1,28 @@
+import os
+
+import JsonIO
+from Buff_MetaDataByHtml import process_summary
+
+
+def _html(name, ids):
+    JsonIO.dump({'meta': {'category': name}, 'data': [{'goods_id': i, 'shortname': f'{name}-{i}'} for i in ids]},
+                os.path.join('BuffDataByExtractHTML', f'{name}.json'))
+
+
+def test_sorted_order_and_broken_file_skipped(workdir):
+    """按文件名顺序取首次出现的条目；中途解析失败的文件不留下任何条目或重复记录"""
+    os.makedirs('BuffDataByExtractHTML')
+    _html('b', ['1', '2'])
+    _html('a', ['2', '3'])
+    _html('c', ['3', '4', '5', '6'])
+    path = os.path.join('BuffDataByExtractHTML', 'c.json')
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text[:text.index('"5"')])
+
+    process_summary()
+    summary = JsonIO.load(os.path.join('SummaryDataByHtml', 'summary.json'))
+    duplicates = JsonIO.load(os.path.join('SummaryDataByHtml', 'duplicates.json'))
+    assert [(i['goods_id'], i['shortname']) for i in summary['data']] == [('2', 'a-2'), ('3', 'a-3'), ('1', 'b-1')]
+    assert [(d['goods_id'], d['files']) for d in duplicates['data']] == [('2', ['a.json', 'b.json'])]
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+import JsonIO
+from TwoBuffDataExtract import IncrementalMerger
+
+
+def _buff(category, items, total_count=None):
+    JsonIO.dump({'meta': {'total_count': total_count if total_count is not None else len(items)},
+                 'items': items}, os.path.join('BuffData', f'{category}.json'))
+
+
+def _html(category, items):
+    JsonIO.dump({'meta': {'category': category}, 'data': items},
+                os.path.join('BuffDataByExtractHTML', f'{category}.json'))
+
+
+@pytest.fixture
+def merger(workdir):
+    os.makedirs('BuffData')
+    os.makedirs('BuffDataByExtractHTML')
+    merger = IncrementalMerger()
+    yield merger
+    merger.catalog.close()
+
+
+def test_ids_normalized_at_ingest(merger):
+    """'012' 与 12 是同一商品；缺失或非数字ID在合并时跳过，不进入导出与变更日志"""
+    _buff('cat', [{'id': 12, 'hashname': 'H12', 'shortname': 's12'}, {'id': 'None', 'shortname': 'bad'}])
+    _html('cat', [{'goods_id': '012', 'shortname': 'html12'}, {'goods_id': '30', 'shortname': 's30'},
+                  {'shortname': '没有ID'}])
+
+    result = merger.merge_category('cat')
+    assert result['added'] == 2
+    assert result['total'] == 2
+
+    data = JsonIO.load(os.path.join('FinalExtract', 'cat.json'))
+    assert [item['goods_id'] for item in data['data']] == ['12', '30']
+    assert data['data'][0]['shortname'] == 's12'
+    assert merger.catalog.goods_ids('cat') == ['12', '30']
+
+
+def test_legacy_final_extract_ids_normalized(merger):
+    JsonIO.dump({'meta': {'category': 'old'}, 'data': [
+        {'goods_id': '007', 'shortname': 'seven', 'source': 'BuffData', 'created_at': 't'},
+        {'goods_id': 'None', 'shortname': 'bad', 'source': 'ExtractHTML', 'created_at': 't'},
+    ]}, os.path.join('FinalExtract', 'old.json'))
+    _buff('old', [{'id': 7, 'hashname': 'H7', 'shortname': 'seven'}])
+
+    result = merger.merge_category('old')
+    assert result['added'] == 0
+    assert merger.catalog.goods_ids('old') == ['7']
+
+
+def test_manifest_count_matches_exported_file(merger):
+    """FinalManifest 记录的是实际写出的条目数，FinalCount 据此统计"""
+    from FinalManifest import FinalManifest, stream_count
+    from RecordFinalExtractCount import count_goods_ids
+
+    _buff('cat', [{'id': 1, 'hashname': 'H1', 'shortname': 'a'}])
+    _html('cat', [{'goods_id': '2', 'shortname': 'b'}, {'shortname': '没有ID'}])
+    merger.merge_category('cat')
+
+    path = os.path.join('FinalExtract', 'cat.json')
+    exported = JsonIO.load(path)
+    assert exported['meta']['stats']['total_items'] == len(exported['data']) == 2
+    assert FinalManifest().lookup(path) == stream_count(path) == 2
+    count_goods_ids()
+    assert JsonIO.load(os.path.join('BuffStats', 'FinalCount.json'))['cat'] == 2
+
+
+def test_second_merge_adds_no_feed_events(merger):
+    """无效ID不会产生 added 事件，源数据未变时再次合并不写变更日志"""
+    _buff('cat', [{'id': 1, 'hashname': 'H1', 'shortname': 'a'}, {'id': 'None', 'shortname': 'bad'}])
+    _html('cat', [{'goods_id': '2', 'shortname': 'b'}, {'shortname': '没有ID'}, {'goods_id': 'abc'}])
+
+    merger.merge_category('cat')
+    with open(merger.change_feed.feed_path, encoding='utf-8') as f:
+        first = f.read()
+    events = [JsonIO.loads(line) for line in first.splitlines()]
+    assert sorted(e['goods_id'] for e in events if e['type'] == 'added') == ['1', '2']
+
+    assert merger.merge_category('cat')['changes'] == {}
+    with open(merger.change_feed.feed_path, encoding='utf-8') as f:
+        assert f.read() == first
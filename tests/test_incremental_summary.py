@@ -0,0 +1,97 @@
+import os
+import random
+import shutil
+
+import pytest
+
+import JsonIO
+from Buff_MetaData import merge_buffdata
+from IncrementalSummary import IncrementalSummarizer, refresh_summary
+
+_mtime = [1_700_000_000 * 10 ** 9]
+
+
+def _write_category(name, ids, total_count=None):
+    """写BuffData分类文件并推进mtime，保证签名一定变化"""
+    path = os.path.join('BuffData', f'{name}.json')
+    items = [{'id': goods_id, 'name': f'{name}-{goods_id}'} for goods_id in ids]
+    JsonIO.dump({'meta': {'total_count': total_count or len(ids)}, 'items': items}, path)
+    _mtime[0] += 10 ** 9
+    os.utime(path, ns=(_mtime[0], _mtime[0]))
+
+
+def _outputs(output_dir='SummaryData'):
+    summary = JsonIO.load(os.path.join(output_dir, 'summary.json'))
+    summary['meta'].pop('generated_time')
+    duplicates = JsonIO.load(os.path.join(output_dir, 'duplicates.json'))
+    with open('duplicates.txt', encoding='utf-8') as f:
+        return summary, duplicates, f.read()
+
+
+def _rebuilt():
+    """删除汇总后从零构建的结果"""
+    shutil.move('SummaryData', 'SummaryData.incremental')
+    refresh_summary()
+    rebuilt = _outputs()
+    shutil.rmtree('SummaryData')
+    shutil.move('SummaryData.incremental', 'SummaryData')
+    return rebuilt
+
+
+@pytest.fixture
+def buffdata(workdir):
+    rng = random.Random(7)
+    os.makedirs('BuffData')
+    for name in 'abcdef':
+        _write_category(name, [rng.randint(1, 300) for _ in range(60)], total_count=70)
+    return rng
+
+
+def test_incremental_matches_full_rebuild(buffdata):
+    rng = buffdata
+    refresh_summary()
+
+    # 修改、删除、新增文件，其中 a.json 是大量ID的样本来源
+    _write_category('a', [rng.randint(1, 300) for _ in range(40)])
+    os.remove(os.path.join('BuffData', 'c.json'))
+    _write_category('0new', [rng.randint(250, 400) for _ in range(30)])
+    stats = refresh_summary()
+    assert stats == {'changed': 2, 'removed': 1, 'unchanged': 4}
+    assert _outputs() == _rebuilt()
+
+    _write_category('b', [])
+    refresh_summary()
+    assert _outputs() == _rebuilt()
+
+
+def test_counts_match_merge_buffdata(buffdata):
+    """与全量合并的统计一致（样本条目的文件选择规则不同，只比较ID与重复统计）"""
+    refresh_summary()
+    merge_buffdata('BuffData', 'Full')
+    incremental, duplicates, _ = _outputs()
+    full = JsonIO.load(os.path.join('Full', 'summary.json'))
+    full_duplicates = JsonIO.load(os.path.join('Full', 'duplicates.json'))
+
+    for key in ('total_count', 'collected', 'duplicate_count'):
+        assert incremental['meta'][key] == full['meta'][key]
+    assert [item['id'] for item in incremental['items']] == [item['id'] for item in full['items']]
+    assert ({d['id']: (d['count'], sorted(d['files'])) for d in duplicates}
+            == {d['id']: (d['count'], sorted(d['files'])) for d in full_duplicates})
+
+
+def test_unchanged_refresh_skips_summary(buffdata, monkeypatch):
+    refresh_summary()
+    before = _outputs()
+    load = JsonIO.load
+
+    def guarded_load(path, *args, **kwargs):
+        assert not str(path).endswith('summary.json'), "未变化时不应解析 summary.json"
+        return load(path, *args, **kwargs)
+
+    monkeypatch.setattr(JsonIO, 'load', guarded_load)
+    summarizer = IncrementalSummarizer()
+    assert summarizer.refresh() == {'changed': 0, 'removed': 0, 'unchanged': 6}
+    assert summarizer.collected == before[0]['meta']['collected']
+    assert summarizer.duplicate_count == before[0]['meta']['duplicate_count']
+    monkeypatch.setattr(JsonIO, 'load', load)
+    assert _outputs() == before
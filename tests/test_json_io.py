@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import JsonIO
+
+ITEMS = [
+    {"goods_id": "100000", "shortname": "AK-47 | 红线", "price": 100000.25},
+    {"goods_id": "7", "shortname": "带\"引号\"与 ] , [ 的名称", "tags": [1, [2, 3], {"k": "]"}]},
+    12345678901234567890,
+    -0.5e-3,
+    None,
+    "末尾字符串",
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 16, 1 << 20])
+def test_iter_array_chunk_boundaries(tmp_path, chunk_size):
+    """任意块大小下，跨块截断的数字、字符串与嵌套结构都能完整解析"""
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps({"meta": {"items": [0]}, "data": ITEMS}, ensure_ascii=False, indent=2),
+                    encoding='utf-8')
+    assert list(JsonIO.iter_array(str(path), 'data', chunk_size=chunk_size)) == ITEMS
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 1 << 20])
+def test_iter_array_top_level_and_compact(tmp_path, chunk_size):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps(ITEMS, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+    assert list(JsonIO.iter_array(str(path), chunk_size=chunk_size)) == ITEMS
+
+
+def test_iter_array_missing_key_and_empty(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text('{"meta": {}, "data": []}', encoding='utf-8')
+    assert list(JsonIO.iter_array(str(path), 'data', chunk_size=3)) == []
+    assert list(JsonIO.iter_array(str(path), 'items', chunk_size=3)) == []
+
+
+def test_iter_array_truncated(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text('{"data": [{"a": 1}, {"b": 100', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(JsonIO.iter_array(str(path), 'data', chunk_size=4))
+
+
+def test_atomic_writer_abort_keeps_target(tmp_path):
+    path = tmp_path / 'out.json'
+    JsonIO.dump({"v": 1}, str(path))
+    writer = JsonIO.AtomicWriter(str(path))
+    writer.write(b'{"v": 2')
+    writer.abort()
+    assert JsonIO.load(str(path)) == {"v": 1}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['out.json']
@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import PipelineDAG as dag_module
+from PipelineDAG import PipelineDAG, Stage
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def pipeline(workdir):
+    """raw/*.txt -> merged.txt -> count.txt，记录每个阶段的执行次数"""
+    calls = []
+
+    def merge():
+        calls.append('merge')
+        parts = [open(os.path.join('raw', name), encoding='utf-8').read() for name in sorted(os.listdir('raw'))]
+        _write('merged.txt', ''.join(parts))
+
+    def count():
+        calls.append('count')
+        _write('count.txt', str(len(open('merged.txt', encoding='utf-8').read())))
+
+    def build(check='hash'):
+        return PipelineDAG([
+            Stage('merge', merge, inputs=['raw/*.txt'], outputs=['merged.txt']),
+            Stage('count', count, inputs=['merged.txt'], outputs=['count.txt']),
+        ], state_path=os.path.join('BuffStats', 'PipelineState.json'), check=check)
+
+    _write('raw/a.txt', 'aaa')
+    _write('raw/b.txt', 'bb')
+    return build, calls
+
+
+def test_first_run_then_up_to_date(pipeline):
+    build, calls = pipeline
+    assert build().run(['count']) == {'merge': 'done', 'count': 'done'}
+    assert build().run(['count']) == {'merge': 'up-to-date', 'count': 'up-to-date'}
+    assert calls == ['merge', 'count']
+
+
+def test_changed_input_reruns_downstream(pipeline):
+    build, calls = pipeline
+    build().run(['count'])
+    _write('raw/b.txt', 'bbbb')
+    assert build().run(['count']) == {'merge': 'done', 'count': 'done'}
+    _write('raw/c.txt', 'c')
+    assert build().run(['count'])['merge'] == 'done'
+
+
+def test_same_output_content_skips_downstream(pipeline):
+    """上游重跑但输出内容未变（hash模式）时下游仍是最新"""
+    build, calls = pipeline
+    build().run(['count'])
+    _write('raw/a.txt', 'aaa')   # 内容相同，mtime变化
+    os.utime('raw/a.txt', ns=(1, 1))
+    results = build().run(['count'])
+    assert results['merge'] == 'up-to-date'
+    assert results['count'] == 'up-to-date'
+
+    _write('raw/a.txt', 'bb')
+    _write('raw/b.txt', 'aaa')   # 文件内容交换，合并结果长度不变但内容变化
+    results = build().run(['count'])
+    assert results == {'merge': 'done', 'count': 'done'}
+
+
+def test_mtime_mode_touch_marks_stale(pipeline):
+    build, calls = pipeline
+    build('mtime').run(['count'])
+    os.utime('raw/a.txt', ns=(1, 1))
+    assert build('mtime').run(['count'])['merge'] == 'done'
+
+
+def test_missing_output_marks_stale(pipeline):
+    build, calls = pipeline
+    build().run(['count'])
+    os.remove('count.txt')
+    assert build().run(['count']) == {'merge': 'up-to-date', 'count': 'done'}
+
+
+def test_failed_stage_not_recorded(pipeline):
+    build, calls = pipeline
+    dag = build()
+    dag.stages['merge'].action = lambda: False
+    assert dag.run(['count']) == {'merge': 'failed', 'count': 'failed'}
+    assert build().run(['count']) == {'merge': 'done', 'count': 'done'}
+
+
+def test_default_pipeline_merge_depends_on_summary():
+    dag = dag_module.build_default_pipeline()
+    assert 'summary' in dag.dependencies(dag.stages['merge_final'])
+    order = dag.closure(['goods_id'])
+    assert order.index('summary') < order.index('merge_final') < order.index('goods_id')